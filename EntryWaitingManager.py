@@ -6,6 +6,7 @@ import threading
 import time
 import datetime
 from logger_utils import Colors, print_colored
+from market_snapshot import get_price_snapshot
 
 
 class EntryWaitingManager:
@@ -124,7 +125,7 @@ class EntryWaitingManager:
 
                 try:
                     # 获取当前价格
-                    ticker = self.trading_bot.client.futures_symbol_ticker(symbol=symbol)
+                    ticker = get_price_snapshot(self.trading_bot.client).ticker(symbol)
                     current_price = float(ticker['price'])
 
                     # 检查是否达到入场条件
@@ -294,7 +295,7 @@ def display_waiting_entries(self):
 
         # 获取当前价格
         try:
-            ticker = self.client.futures_symbol_ticker(symbol=symbol)
+            ticker = get_price_snapshot(self.client).ticker(symbol)
             current_price = float(ticker['price'])
         except:
             current_price = 0.0
@@ -5,8 +5,9 @@
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from logger_utils import Colors, print_colored
+from indicator_kernels import parabolic_sar_kernel
 
 
 def calculate_smi(df: pd.DataFrame, k_period: int = 14, d_period: int = 3, smooth_period: int = 3) -> pd.DataFrame:
@@ -164,8 +165,85 @@ def calculate_stochastic(df: pd.DataFrame, k_period: int = 14, d_period: int = 3
         return df
 
 
+def _parabolic_sar_reference(df: pd.DataFrame, initial_af: float, max_af: float,
+                             af_step: float) -> Tuple[np.ndarray, np.ndarray]:
+    """原版逐K线SAR实现，保留用于与内核结果的一致性校验"""
+    # 初始化SAR列
+    sar = np.zeros(len(df))
+    trend = np.zeros(len(df))  # 1表示上升趋势，-1表示下降趋势
+    extreme_point = np.zeros(len(df))
+    acceleration_factor = np.zeros(len(df))
+
+    # 初始化第一个点
+    # 简单起见，假设第一个点是上升趋势
+    trend[0] = 1
+    sar[0] = df['low'].iloc[0]
+    extreme_point[0] = df['high'].iloc[0]
+    acceleration_factor[0] = initial_af
+
+    # 计算后续点
+    for i in range(1, len(df)):
+        # 如果上一个周期是上升趋势
+        if trend[i - 1] == 1:
+            # SAR值计算
+            sar[i] = sar[i - 1] + acceleration_factor[i - 1] * (extreme_point[i - 1] - sar[i - 1])
+
+            # 确保SAR不高于前两个周期的最低价
+            if i >= 2:
+                sar[i] = min(sar[i], min(df['low'].iloc[i - 1], df['low'].iloc[i - 2]))
+
+            # 如果价格跌破SAR，转为下降趋势
+            if df['low'].iloc[i] < sar[i]:
+                trend[i] = -1
+                sar[i] = extreme_point[i - 1]
+                extreme_point[i] = df['low'].iloc[i]
+                acceleration_factor[i] = initial_af
+            else:
+                # 继续上升趋势
+                trend[i] = 1
+
+                # 更新极值点
+                if df['high'].iloc[i] > extreme_point[i - 1]:
+                    extreme_point[i] = df['high'].iloc[i]
+                    # 更新加速因子
+                    acceleration_factor[i] = min(max_af, acceleration_factor[i - 1] + af_step)
+                else:
+                    extreme_point[i] = extreme_point[i - 1]
+                    acceleration_factor[i] = acceleration_factor[i - 1]
+
+        # 如果上一个周期是下降趋势
+        else:
+            # SAR值计算
+            sar[i] = sar[i - 1] + acceleration_factor[i - 1] * (extreme_point[i - 1] - sar[i - 1])
+
+            # 确保SAR不低于前两个周期的最高价
+            if i >= 2:
+                sar[i] = max(sar[i], max(df['high'].iloc[i - 1], df['high'].iloc[i - 2]))
+
+            # 如果价格突破SAR，转为上升趋势
+            if df['high'].iloc[i] > sar[i]:
+                trend[i] = 1
+                sar[i] = extreme_point[i - 1]
+                extreme_point[i] = df['high'].iloc[i]
+                acceleration_factor[i] = initial_af
+            else:
+                # 继续下降趋势
+                trend[i] = -1
+
+                # 更新极值点
+                if df['low'].iloc[i] < extreme_point[i - 1]:
+                    extreme_point[i] = df['low'].iloc[i]
+                    # 更新加速因子
+                    acceleration_factor[i] = min(max_af, acceleration_factor[i - 1] + af_step)
+                else:
+                    extreme_point[i] = extreme_point[i - 1]
+                    acceleration_factor[i] = acceleration_factor[i - 1]
+
+    return sar, trend
+
+
 def calculate_parabolic_sar(df: pd.DataFrame, initial_af: float = 0.02, max_af: float = 0.2,
-                            af_step: float = 0.02) -> pd.DataFrame:
+                            af_step: float = 0.02, method: str = 'fast') -> pd.DataFrame:
     """
     计算抛物线转向指标 (Parabolic SAR)
 
@@ -174,6 +252,7 @@ def calculate_parabolic_sar(df: pd.DataFrame, initial_af: float = 0.02, max_af:
         initial_af: 初始加速因子，默认0.02
         max_af: 最大加速因子，默认0.2
         af_step: 加速因子步长，默认0.02
+        method: 'fast' 使用ndarray递推内核，'reference' 使用原版逐K线实现（用于一致性校验）
 
     返回:
         df: 添加了SAR指标的DataFrame
@@ -183,76 +262,14 @@ def calculate_parabolic_sar(df: pd.DataFrame, initial_af: float = 0.02, max_af:
             print_colored(f"⚠️ 数据长度 {len(df)} 不足以计算SAR", Colors.WARNING)
             return df
 
-        # 初始化SAR列
-        sar = np.zeros(len(df))
-        trend = np.zeros(len(df))  # 1表示上升趋势，-1表示下降趋势
-        extreme_point = np.zeros(len(df))
-        acceleration_factor = np.zeros(len(df))
-
-        # 初始化第一个点
-        # 简单起见，假设第一个点是上升趋势
-        trend[0] = 1
-        sar[0] = df['low'].iloc[0]
-        extreme_point[0] = df['high'].iloc[0]
-        acceleration_factor[0] = initial_af
-
-        # 计算后续点
-        for i in range(1, len(df)):
-            # 如果上一个周期是上升趋势
-            if trend[i - 1] == 1:
-                # SAR值计算
-                sar[i] = sar[i - 1] + acceleration_factor[i - 1] * (extreme_point[i - 1] - sar[i - 1])
-
-                # 确保SAR不高于前两个周期的最低价
-                if i >= 2:
-                    sar[i] = min(sar[i], min(df['low'].iloc[i - 1], df['low'].iloc[i - 2]))
-
-                # 如果价格跌破SAR，转为下降趋势
-                if df['low'].iloc[i] < sar[i]:
-                    trend[i] = -1
-                    sar[i] = extreme_point[i - 1]
-                    extreme_point[i] = df['low'].iloc[i]
-                    acceleration_factor[i] = initial_af
-                else:
-                    # 继续上升趋势
-                    trend[i] = 1
-
-                    # 更新极值点
-                    if df['high'].iloc[i] > extreme_point[i - 1]:
-                        extreme_point[i] = df['high'].iloc[i]
-                        # 更新加速因子
-                        acceleration_factor[i] = min(max_af, acceleration_factor[i - 1] + af_step)
-                    else:
-                        extreme_point[i] = extreme_point[i - 1]
-                        acceleration_factor[i] = acceleration_factor[i - 1]
-
-            # 如果上一个周期是下降趋势
-            else:
-                # SAR值计算
-                sar[i] = sar[i - 1] + acceleration_factor[i - 1] * (extreme_point[i - 1] - sar[i - 1])
-
-                # 确保SAR不低于前两个周期的最高价
-                if i >= 2:
-                    sar[i] = max(sar[i], max(df['high'].iloc[i - 1], df['high'].iloc[i - 2]))
-
-                # 如果价格突破SAR，转为上升趋势
-                if df['high'].iloc[i] > sar[i]:
-                    trend[i] = 1
-                    sar[i] = extreme_point[i - 1]
-                    extreme_point[i] = df['high'].iloc[i]
-                    acceleration_factor[i] = initial_af
-                else:
-                    # 继续下降趋势
-                    trend[i] = -1
-
-                    # 更新极值点
-                    if df['low'].iloc[i] < extreme_point[i - 1]:
-                        extreme_point[i] = df['low'].iloc[i]
-                        # 更新加速因子
-                        acceleration_factor[i] = min(max_af, acceleration_factor[i - 1] + af_step)
-                    else:
-                        extreme_point[i] = extreme_point[i - 1]
-                        acceleration_factor[i] = acceleration_factor[i - 1]
+        if method == 'reference':
+            sar, trend = _parabolic_sar_reference(df, initial_af, max_af, af_step)
+        else:
+            sar, trend = parabolic_sar_kernel(
+                np.ascontiguousarray(df['high'].values, dtype=np.float64),
+                np.ascontiguousarray(df['low'].values, dtype=np.float64),
+                initial_af, max_af, af_step
+            )
 
         # 添加到DataFrame
         df['SAR'] = sar
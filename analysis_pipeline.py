@@ -0,0 +1,169 @@
+"""
+并发分析流水线模块
+把逐个交易对的 获取数据 -> 计算指标/评分 -> 生成信号 流程改为并发执行：
+每个交易对在线程池中获取数据和完成后续的I/O步骤，其中的指标和质量评分计算提交到进程池，
+单个交易对失败不影响其他交易对，结果按输入顺序返回
+"""
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from config import CONFIG
+from indicators_module import calculate_optimized_indicators
+from logger_utils import Colors, print_colored
+from quality_module import calculate_quality_score
+
+
+class LogRecorder:
+    """
+    记录日志调用的日志对象，用于子进程中的计算：记录随结果返回主进程，再由 replay_log_records 写入机器人的日志对象
+    （只支持 debug/info/warning/error 四个方法，参数需要可以pickle）
+    """
+
+    def __init__(self):
+        self.records: List[Tuple[int, str, Optional[dict]]] = []
+
+    def _record(self, level: int, msg: Any, extra: Optional[dict] = None) -> None:
+        self.records.append((level, str(msg), dict(extra) if extra else None))
+
+    def debug(self, msg: Any, *args, extra: Optional[dict] = None, **kwargs) -> None:
+        self._record(logging.DEBUG, msg, extra)
+
+    def info(self, msg: Any, *args, extra: Optional[dict] = None, **kwargs) -> None:
+        self._record(logging.INFO, msg, extra)
+
+    def warning(self, msg: Any, *args, extra: Optional[dict] = None, **kwargs) -> None:
+        self._record(logging.WARNING, msg, extra)
+
+    def error(self, msg: Any, *args, extra: Optional[dict] = None, **kwargs) -> None:
+        self._record(logging.ERROR, msg, extra)
+
+
+def replay_log_records(records: Sequence[Tuple[int, str, Optional[dict]]], logger) -> None:
+    """把 LogRecorder 的记录按原顺序写入日志对象"""
+    if logger is None:
+        return
+    for level, msg, extra in records:
+        logger.log(level, msg, extra=extra)
+
+
+def compute_symbol_score(symbol: str, payload: Tuple[pd.DataFrame, Optional[float]],
+                         config: Optional[dict] = None) -> Tuple[pd.DataFrame, float, Dict[str, Any], list]:
+    """
+    计算指标和质量评分（纯计算，不访问客户端，可以在子进程中执行）
+
+    参数:
+        symbol: 交易对
+        payload: (原始K线DataFrame, 资金费率)
+        config: 配置字典
+
+    返回:
+        (添加了指标的DataFrame, 质量评分, 评分明细, 评分过程的日志记录)，日志记录用 replay_log_records 写入主进程的日志
+    """
+    df, funding_rate = payload
+    recorder = LogRecorder()
+    df = calculate_optimized_indicators(df.copy())
+    if df is None or df.empty:
+        recorder.error(f"{symbol}指标计算失败，无法计算质量评分")
+        return df, 0.0, {'error': 'indicators_failed'}, recorder.records
+    quality_score, metrics = calculate_quality_score(df, None, symbol, None, config, recorder,
+                                                     funding_rate=funding_rate)
+    return df, quality_score, metrics, recorder.records
+
+
+class AnalysisPipeline:
+    """
+    按交易对并发执行的三段式分析
+
+    fetch(symbol) 和 finalize(symbol, payload, computed) 在线程池中执行（网络等待时不占用CPU），
+    compute(symbol, payload) 提交到进程池（指标和评分计算不受GIL限制）；compute 必须是可被子进程导入的模块级函数
+    （或其 functools.partial），payload 和返回值必须可以pickle。processes 为0或进程池不可用时在线程中直接计算
+    """
+
+    def __init__(self, threads: int = 8, processes: int = 0):
+        """
+        参数:
+            threads: 线程池大小（同时处理的交易对数量）
+            processes: 进程池大小，0表示不使用进程池
+        """
+        self.threads = max(1, threads)
+        self.processes = processes
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.processes <= 0:
+            return None
+        with self._lock:
+            if self._process_pool is None:
+                # 主进程中有后台线程（持仓监控、事件循环），fork 可能复制持有中的锁，使用 spawn 启动子进程
+                self._process_pool = ProcessPoolExecutor(max_workers=self.processes,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+            return self._process_pool
+
+    def _compute(self, compute: Callable, symbol: str, payload: Any) -> Any:
+        pool = self._get_process_pool()
+        if pool is None:
+            return compute(symbol, payload)
+        try:
+            return pool.submit(compute, symbol, payload).result()
+        except BrokenProcessPool as e:
+            print_colored(f"⚠️ 分析进程池不可用，改为在线程中计算: {e}", Colors.WARNING)
+            self.shutdown()
+            self.processes = 0
+            return compute(symbol, payload)
+
+    def run(self, symbols: Sequence[str], fetch: Callable[[str], Any], compute: Optional[Callable],
+            finalize: Callable[[str, Any, Any], Any]) -> Tuple[List[Any], Dict[str, str]]:
+        """
+        并发分析交易对
+
+        参数:
+            symbols: 交易对列表
+            fetch: 获取数据，返回None表示跳过该交易对
+            compute: 进程池中执行的计算，None表示没有计算阶段
+            finalize: 生成最终结果，返回None表示该交易对没有结果
+
+        返回:
+            (与symbols顺序一致的结果列表（跳过或失败的位置为None）, {失败的交易对: 错误信息})
+        """
+        def analyze(symbol: str) -> Any:
+            payload = fetch(symbol)
+            if payload is None:
+                return None
+            computed = self._compute(compute, symbol, payload) if compute is not None else None
+            return finalize(symbol, payload, computed)
+
+        results: List[Any] = [None] * len(symbols)
+        errors: Dict[str, str] = {}
+        if not symbols:
+            return results, errors
+        with ThreadPoolExecutor(max_workers=min(self.threads, len(symbols)),
+                                thread_name_prefix="analysis") as executor:
+            futures = {executor.submit(analyze, symbol): index for index, symbol in enumerate(symbols)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    errors[symbols[index]] = str(e)
+        return results, errors
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        with self._lock:
+            if self._process_pool is not None:
+                self._process_pool.shutdown(wait=False, cancel_futures=True)
+                self._process_pool = None
+
+
+def create_analysis_pipeline(config: Optional[dict] = None) -> AnalysisPipeline:
+    """按配置创建分析流水线（ANALYSIS_THREADS / ANALYSIS_PROCESSES）"""
+    config = config or CONFIG
+    return AnalysisPipeline(config.get("ANALYSIS_THREADS", 8), config.get("ANALYSIS_PROCESSES", 2))
@@ -0,0 +1,409 @@
+"""
+API请求调度模块
+所有 Binance 客户端调用经由同一个调度器：按接口的请求权重做令牌桶限流，读取响应头中的已用权重与交易所计数对齐，
+等待中的请求按优先级（下单 > 持仓/账户 > 行情 > 扫描）排队，遇到429/418时按 Retry-After 暂停全部请求，
+取代各处固定的 time.sleep 和无限制的并发请求
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional
+
+from config import CONFIG
+from logger_utils import Colors, print_colored
+from single_flight import SingleFlight, get_single_flight
+
+DEFAULT_FUTURES_BASE_URL = "https://fapi.binance.com"
+
+# 优先级，数值越小越先执行
+PRIORITY_ORDER = 0
+PRIORITY_POSITION = 1
+PRIORITY_MARKET = 2
+PRIORITY_SCAN = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_ORDER: "order",
+    PRIORITY_POSITION: "position",
+    PRIORITY_MARKET: "market",
+    PRIORITY_SCAN: "scan"
+}
+
+
+def kline_request_weight(limit: int) -> int:
+    """futures_klines 的请求权重（按limit分档）"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    return 5 if limit <= 1000 else 10
+
+
+def _order_book_weight(params: Dict[str, Any]) -> int:
+    limit = int(params.get('limit', 500))
+    if limit <= 50:
+        return 2
+    if limit <= 100:
+        return 5
+    return 10 if limit <= 500 else 20
+
+
+# 接口 -> 请求权重（整数，或根据参数计算权重的函数），未列出的接口按1计算
+ENDPOINT_WEIGHTS: Dict[str, Any] = {
+    'futures_klines': lambda params: kline_request_weight(int(params.get('limit', 500))),
+    'futures_historical_klines': lambda params: kline_request_weight(int(params.get('limit', 500))),
+    'futures_order_book': _order_book_weight,
+    'futures_symbol_ticker': lambda params: 1 if params.get('symbol') else 2,
+    'futures_orderbook_ticker': lambda params: 1 if params.get('symbol') else 2,
+    'futures_ticker': lambda params: 1 if params.get('symbol') else 40,
+    'futures_mark_price': lambda params: 1 if params.get('symbol') else 10,
+    'futures_get_open_orders': lambda params: 1 if params.get('symbol') else 40,
+    'futures_account': 5,
+    'futures_account_balance': 5,
+    'futures_position_information': 5,
+    'futures_account_trades': 5,
+    'futures_get_all_orders': 5,
+    'futures_income_history': 30,
+    'futures_funding_rate': 1,
+    'futures_exchange_info': 1,
+    'futures_leverage_bracket': 1
+}
+
+# 接口 -> 默认优先级，未列出的接口为行情优先级；扫描等后台任务用 api_priority 临时降低优先级
+ENDPOINT_PRIORITIES: Dict[str, int] = {
+    'futures_create_order': PRIORITY_ORDER,
+    'futures_cancel_order': PRIORITY_ORDER,
+    'futures_cancel_all_open_orders': PRIORITY_ORDER,
+    'futures_change_leverage': PRIORITY_ORDER,
+    'futures_change_margin_type': PRIORITY_ORDER,
+    'futures_change_position_mode': PRIORITY_ORDER,
+    'futures_position_information': PRIORITY_POSITION,
+    'futures_account': PRIORITY_POSITION,
+    'futures_account_balance': PRIORITY_POSITION,
+    'futures_get_open_orders': PRIORITY_POSITION,
+    'futures_get_order': PRIORITY_POSITION,
+    'futures_account_trades': PRIORITY_POSITION
+}
+
+# 并发的相同请求只发送一次的接口：只包含行情数据，账户/持仓/订单类接口的结果可能因刚完成的下单而变化，不合并
+COALESCED_ENDPOINTS = {
+    'futures_klines',
+    'futures_historical_klines',
+    'futures_symbol_ticker',
+    'futures_orderbook_ticker',
+    'futures_ticker',
+    'futures_mark_price',
+    'futures_funding_rate',
+    'futures_order_book',
+    'futures_exchange_info',
+    'futures_time',
+    'get_server_time'
+}
+
+# 客户端上不经过调度的公开方法（不发起请求）
+_UNSCHEDULED = {'close_connection'}
+
+_local = threading.local()
+
+
+@contextmanager
+def api_priority(priority: int):
+    """
+    在当前线程内覆盖请求优先级，例如扫描线程:
+
+        with api_priority(PRIORITY_SCAN):
+            scanner.analyze_single_coin(symbol)
+
+    下单接口始终使用下单优先级，不受覆盖影响
+    """
+    previous = getattr(_local, 'priority', None)
+    _local.priority = priority
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def request_weight(method: str, params: Dict[str, Any]) -> int:
+    """接口调用的请求权重"""
+    weight = ENDPOINT_WEIGHTS.get(method, 1)
+    return weight(params) if callable(weight) else weight
+
+
+def request_priority(method: str) -> int:
+    """接口调用的优先级：下单接口固定为最高，其余使用线程内覆盖值或接口默认值"""
+    default = ENDPOINT_PRIORITIES.get(method, PRIORITY_MARKET)
+    if default == PRIORITY_ORDER:
+        return default
+    override = getattr(_local, 'priority', None)
+    return default if override is None else override
+
+
+class ApiScheduler:
+    """
+    请求权重调度器
+
+    两道限制共同保证不超过交易所的每分钟权重上限:
+    - 令牌桶: 以 上限/窗口 的速率补充令牌，容量为 burst_seconds 秒的额度，平滑突发请求
+    - 分钟计数: 与交易所相同的按分钟对齐的计数，本地累加并用响应头 X-MBX-USED-WEIGHT-1M 校正
+      （同一IP上的其他进程也会计入），本分钟余量不足时等到下一分钟
+    """
+
+    def __init__(self, weight_limit: int = 2400, headroom: float = 0.05, burst_seconds: float = 5.0,
+                 window: float = 60.0):
+        """
+        参数:
+            weight_limit: 交易所的每窗口权重上限
+            headroom: 预留比例，用于吸收时钟误差和未经调度的请求
+            burst_seconds: 令牌桶容量（按秒计的额度）
+            window: 限流窗口（秒）
+        """
+        self.weight_limit = weight_limit
+        self.window = window
+        self.limit = int(weight_limit * (1 - headroom))
+        self.rate = self.limit / window
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._window_id = int(time.time() // window)
+        self._window_used = 0
+        self._paused_until = 0.0
+        self._waiting = []  # (优先级, 序号) 小顶堆，只有堆顶的请求可以取令牌
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._stats: Dict[int, Dict[str, float]] = {}
+        self.requests = 0
+        self.weight_sent = 0
+        self.rate_limited = 0
+        self.server_used = None
+
+    def _priority_stats(self, priority: int) -> Dict[str, float]:
+        if priority not in self._stats:
+            self._stats[priority] = {"requests": 0, "weight": 0, "wait_s": 0.0, "max_wait_s": 0.0}
+        return self._stats[priority]
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        window_id = int(time.time() // self.window)
+        if window_id != self._window_id:
+            self._window_id = window_id
+            self._window_used = 0
+
+    def _delay(self, weight: int) -> float:
+        """堆顶请求还需要等待的秒数，0表示可以立即发送"""
+        delays = [self._paused_until - time.time()]
+        if self._tokens < weight:
+            delays.append((weight - self._tokens) / self.rate)
+        if self._window_used + weight > self.limit:
+            delays.append((self._window_id + 1) * self.window - time.time())
+        return max(delays)
+
+    def acquire(self, weight: int, priority: int = PRIORITY_MARKET) -> float:
+        """
+        占用请求权重，按优先级排队等待
+
+        参数:
+            weight: 请求权重
+            priority: 优先级，数值越小越先执行
+
+        返回:
+            等待的秒数
+        """
+        weight = max(1, min(weight, self.limit, int(self.capacity)))
+        started = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    self._refill()
+                    if self._waiting[0] == ticket:
+                        delay = self._delay(weight)
+                        if delay <= 0:
+                            heapq.heappop(self._waiting)
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                raise
+            finally:
+                # 堆顶变化后唤醒等待者，由新的堆顶继续取令牌
+                self._cond.notify_all()
+
+            self._tokens -= weight
+            self._window_used += weight
+            waited = time.monotonic() - started
+            stats = self._priority_stats(priority)
+            stats["requests"] += 1
+            stats["weight"] += weight
+            stats["wait_s"] += waited
+            stats["max_wait_s"] = max(stats["max_wait_s"], waited)
+            self.requests += 1
+            self.weight_sent += weight
+        return waited
+
+    def observe_headers(self, headers) -> None:
+        """用响应头中的已用权重校正本分钟计数（只采用与当前分钟相同的响应）"""
+        if not headers:
+            return
+        headers = {str(name).lower(): value for name, value in headers.items()}
+        used = headers.get('x-mbx-used-weight-1m')
+        if used is None:
+            return
+        try:
+            used = int(used)
+            window_id = int(parsedate_to_datetime(headers['date']).timestamp() // self.window) \
+                if headers.get('date') else int(time.time() // self.window)
+        except (TypeError, ValueError):
+            return
+        with self._cond:
+            self._refill()
+            self.server_used = used
+            if window_id == self._window_id and used > self._window_used:
+                self._window_used = used
+
+    def pause(self, seconds: float, reason: str = "") -> None:
+        """暂停所有请求（遇到429/418时调用）"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.time() + seconds)
+            self.rate_limited += 1
+            self._cond.notify_all()
+        print_colored(f"⛔ API请求暂停 {seconds:.0f}秒 {reason}", Colors.ERROR)
+
+    def stats(self) -> Dict[str, Any]:
+        """总请求数/权重、被限流次数、本分钟计数以及各优先级的请求数和等待时间"""
+        with self._cond:
+            self._refill()
+            return {
+                "requests": self.requests,
+                "weight": self.weight_sent,
+                "rate_limited": self.rate_limited,
+                "window_used": self._window_used,
+                "server_used": self.server_used,
+                "limit": self.limit,
+                "queued": len(self._waiting),
+                "priorities": {PRIORITY_NAMES.get(p, str(p)): dict(s) for p, s in self._stats.items()}
+            }
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """429/418错误的暂停秒数，其他错误返回None"""
+    status = getattr(error, 'status_code', None)
+    if status not in (418, 429):
+        return None
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return 120.0 if status == 418 else 60.0
+
+
+class ScheduledClient:
+    """
+    Binance 客户端代理，公开方法调用先经过调度器取得权重再发送，其他属性直接访问原客户端；
+    行情接口的并发相同请求合并为一次（被合并的调用不占用权重）
+
+    用法:
+        client = ScheduledClient(Client(api_key, api_secret))
+    """
+
+    def __init__(self, client, scheduler: Optional[ApiScheduler] = None, flight: Optional[SingleFlight] = None,
+                 coalesce: Optional[bool] = None):
+        self._client = client
+        self._scheduler = scheduler or get_api_scheduler()
+        self._flight = flight or get_single_flight()
+        self._coalesce = CONFIG.get("API_COALESCE_REQUESTS", True) if coalesce is None else coalesce
+
+    @property
+    def scheduler(self) -> ApiScheduler:
+        return self._scheduler
+
+    @property
+    def raw_client(self):
+        """未经调度的原客户端"""
+        return self._client
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if name.startswith('_') or name in _UNSCHEDULED or not callable(attr):
+            return attr
+        return self._wrap(name, attr)
+
+    def _wrap(self, name: str, method: Callable) -> Callable:
+        def send(*args, **kwargs):
+            self._scheduler.acquire(request_weight(name, kwargs), request_priority(name))
+            try:
+                result = method(*args, **kwargs)
+            except Exception as e:
+                delay = _retry_after(e)
+                if delay is not None:
+                    self._scheduler.pause(delay, f"({name}: HTTP {getattr(e, 'status_code', '')})")
+                raise
+            response = getattr(self._client, 'response', None)
+            self._scheduler.observe_headers(getattr(response, 'headers', None))
+            return result
+
+        if not self._coalesce or name not in COALESCED_ENDPOINTS:
+            send.__name__ = name
+            return send
+
+        def scheduled(*args, **kwargs):
+            try:
+                key = (args, tuple(sorted(kwargs.items())))
+                hash(key)
+            except TypeError:  # 参数不可哈希时不合并
+                return send(*args, **kwargs)
+            return self._flight.do(name, key, send, *args, **kwargs)
+
+        scheduled.__name__ = name
+        return scheduled
+
+
+def create_client(api_key: Optional[str] = None, api_secret: Optional[str] = None,
+                  base_url: Optional[str] = None) -> ScheduledClient:
+    """
+    创建经过共享调度器的 Binance 客户端
+
+    参数:
+        api_key: API密钥
+        api_secret: API密钥
+        base_url: REST地址，默认取 CONFIG["FUTURES_BASE_URL"]；不是币安地址时（例如本地模拟交易所），
+                  现货和期货接口都请求该地址
+
+    返回:
+        ScheduledClient
+    """
+    from binance.client import Client
+
+    base_url = (base_url or CONFIG.get("FUTURES_BASE_URL") or DEFAULT_FUTURES_BASE_URL).rstrip('/')
+    client_class = Client
+    if base_url != DEFAULT_FUTURES_BASE_URL:
+        # python-binance 在构造时按类属性拼接接口地址（并请求一次ping），需要在构造前替换
+        client_class = type("LocalClient", (Client,), {
+            "API_URL": base_url + "/api",
+            "FUTURES_URL": base_url + "/fapi",
+            "FUTURES_DATA_URL": base_url + "/futures/data"
+        })
+    return ScheduledClient(client_class(api_key, api_secret))
+
+
+_scheduler: Optional[ApiScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_api_scheduler() -> ApiScheduler:
+    """获取进程内共享的请求调度器（同一IP的权重上限由所有客户端共用）"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ApiScheduler(CONFIG.get("API_WEIGHT_LIMIT", 2400), CONFIG.get("API_WEIGHT_HEADROOM", 0.05))
+        return _scheduler
@@ -0,0 +1,264 @@
+"""
+异步行情客户端模块
+基于 asyncio 的 Binance 期货行情客户端：共享连接池、限制并发数、请求权重经过共享的请求调度器，
+一个事件循环内可以并发获取数百个交易对的K线；同时提供同步外观（SyncMarketClient），
+方法名和参数与 python-binance 的 Client 一致，现有的同步调用方可以直接使用
+
+安装了 aiohttp 时使用其连接池，否则在线程池中执行标准库 urllib 请求（同样受并发数限制）；
+base_url 可配置，便于指向本地的模拟交易所
+"""
+
+import asyncio
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from api_scheduler import ApiScheduler, COALESCED_ENDPOINTS, get_api_scheduler, request_priority, request_weight
+from config import CONFIG
+from logger_utils import Colors, print_colored
+from single_flight import get_single_flight
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+# 接口 -> REST路径（只包含不需要签名的行情接口）
+ENDPOINT_PATHS = {
+    'futures_klines': '/fapi/v1/klines',
+    'futures_symbol_ticker': '/fapi/v1/ticker/price',
+    'futures_orderbook_ticker': '/fapi/v1/ticker/bookTicker',
+    'futures_ticker': '/fapi/v1/ticker/24hr',
+    'futures_mark_price': '/fapi/v1/premiumIndex',
+    'futures_funding_rate': '/fapi/v1/fundingRate',
+    'futures_order_book': '/fapi/v1/depth',
+    'futures_exchange_info': '/fapi/v1/exchangeInfo',
+    'futures_time': '/fapi/v1/time',
+    'futures_ping': '/fapi/v1/ping'
+}
+
+
+class MarketDataError(Exception):
+    """行情请求失败（HTTP错误或交易所返回的错误）"""
+
+    def __init__(self, status_code: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.headers = headers or {}
+
+
+class AsyncMarketClient:
+    """异步行情客户端，所有方法都是协程，需要在同一个事件循环中使用"""
+
+    def __init__(self, base_url: Optional[str] = None, max_concurrency: int = 20, timeout: float = 10.0,
+                 scheduler: Optional[ApiScheduler] = None):
+        """
+        参数:
+            base_url: REST地址，默认取 CONFIG["FUTURES_BASE_URL"]
+            max_concurrency: 同时进行的最大请求数（也是连接池大小）
+            timeout: 单次请求超时（秒）
+            scheduler: 请求调度器，默认使用进程内共享的调度器
+        """
+        self.base_url = (base_url or CONFIG.get("FUTURES_BASE_URL", "https://fapi.binance.com")).rstrip('/')
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.scheduler = scheduler or get_api_scheduler()
+        self._session = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # 调度器等待和 urllib 请求都是阻塞的，使用与并发数相同大小的专用线程池
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="market-client")
+        # 统计: 请求次数、失败次数
+        self.requests = 0
+        self.errors = 0
+
+    async def _ensure_started(self) -> None:
+        # 信号量和连接池必须在所属的事件循环中创建
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if AIOHTTP_AVAILABLE and self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+    def _url(self, method: str, params: Dict[str, Any]) -> str:
+        if method not in ENDPOINT_PATHS:
+            raise ValueError(f"异步客户端不支持的接口: {method}")
+        query = urllib.parse.urlencode({k: v for k, v in params.items() if v is not None})
+        return f"{self.base_url}{ENDPOINT_PATHS[method]}" + (f"?{query}" if query else "")
+
+    def _urllib_get(self, url: str):
+        """在线程池中执行的阻塞请求，返回 (状态码, 响应头, 响应体)"""
+        try:
+            with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                return response.status, dict(response.headers), response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers or {}), e.read()
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None,
+                      priority: Optional[int] = None) -> Any:
+        """
+        发送一次行情请求
+
+        参数:
+            method: 接口名（与 python-binance 的方法名相同，例如 futures_klines）
+            params: 请求参数
+            priority: 调度优先级，默认按接口确定
+
+        返回:
+            解析后的JSON；请求失败时抛出 MarketDataError
+        """
+        params = params or {}
+        url = self._url(method, params)
+        await self._ensure_started()
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            # 调度器的等待是阻塞的，放到线程池中执行，避免阻塞事件循环
+            await loop.run_in_executor(self._executor, self.scheduler.acquire, request_weight(method, params),
+                                       request_priority(method) if priority is None else priority)
+            self.requests += 1
+            if self._session is not None:
+                async with self._session.get(url) as response:
+                    status, headers, body = response.status, dict(response.headers), await response.read()
+            else:
+                status, headers, body = await loop.run_in_executor(self._executor, self._urllib_get, url)
+
+        self.scheduler.observe_headers(headers)
+        if status in (418, 429):
+            try:
+                delay = float(headers.get('Retry-After'))
+            except (TypeError, ValueError):
+                delay = 120.0 if status == 418 else 60.0
+            self.scheduler.pause(delay, f"({method}: HTTP {status})")
+        if status >= 400:
+            self.errors += 1
+            raise MarketDataError(status, body.decode('utf-8', 'replace')[:200], headers)
+        return json.loads(body)
+
+    async def gather(self, method: str, params_list: Sequence[Dict[str, Any]],
+                     priority: Optional[int] = None) -> List[Any]:
+        """并发发送多次同一接口的请求，返回与参数顺序一致的结果列表，失败的请求位置为异常对象"""
+        return await asyncio.gather(*(self.request(method, params, priority) for params in params_list),
+                                    return_exceptions=True)
+
+    async def futures_klines(self, **params) -> List[List[Any]]:
+        return await self.request('futures_klines', params)
+
+    async def futures_symbol_ticker(self, **params) -> Any:
+        return await self.request('futures_symbol_ticker', params)
+
+    async def futures_ticker(self, **params) -> Any:
+        return await self.request('futures_ticker', params)
+
+    async def futures_mark_price(self, **params) -> Any:
+        return await self.request('futures_mark_price', params)
+
+    async def futures_exchange_info(self) -> Dict[str, Any]:
+        return await self.request('futures_exchange_info')
+
+    async def close(self) -> None:
+        """关闭连接池"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        await self._ensure_started()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class SyncMarketClient:
+    """
+    异步行情客户端的同步外观
+
+    在后台线程中运行一个事件循环，阻塞方法把请求提交到该循环并等待结果；多个线程的请求共享同一个连接池和并发限制，
+    行情接口的并发相同请求先经过请求合并；klines_many 在一次调用中并发获取多个交易对的K线
+    """
+
+    def __init__(self, base_url: Optional[str] = None, max_concurrency: int = 20, timeout: float = 10.0,
+                 scheduler: Optional[ApiScheduler] = None):
+        self.client = AsyncMarketClient(base_url, max_concurrency, timeout, scheduler)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="market-client-loop", daemon=True)
+        self._thread.start()
+        self._flight = get_single_flight()
+
+    @property
+    def base_url(self) -> str:
+        return self.client.base_url
+
+    def run(self, coro, timeout: Optional[float] = None) -> Any:
+        """在后台事件循环中运行协程并等待结果"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def _call(self, method: str, params: Dict[str, Any]) -> Any:
+        priority = request_priority(method)  # 在调用线程中确定优先级（线程内覆盖只在调用线程有效）
+
+        def send():
+            return self.run(self.client.request(method, params, priority))
+
+        if method not in COALESCED_ENDPOINTS:
+            return send()
+        return self._flight.do(method, tuple(sorted(params.items())), send)
+
+    def futures_klines(self, **params) -> List[List[Any]]:
+        return self._call('futures_klines', params)
+
+    def futures_symbol_ticker(self, **params) -> Any:
+        return self._call('futures_symbol_ticker', params)
+
+    def futures_ticker(self, **params) -> Any:
+        return self._call('futures_ticker', params)
+
+    def futures_mark_price(self, **params) -> Any:
+        return self._call('futures_mark_price', params)
+
+    def futures_exchange_info(self) -> Dict[str, Any]:
+        return self._call('futures_exchange_info', {})
+
+    def klines_many(self, params_list: Sequence[Dict[str, Any]]) -> List[Any]:
+        """
+        并发获取多组K线
+
+        参数:
+            params_list: futures_klines 的参数字典列表
+
+        返回:
+            与参数顺序一致的K线列表，失败的位置为异常对象
+        """
+        if not params_list:
+            return []
+        priority = request_priority('futures_klines')
+        return self.run(self.client.gather('futures_klines', params_list, priority))
+
+    def close(self) -> None:
+        """关闭连接池并停止后台事件循环"""
+        try:
+            self.run(self.client.close(), timeout=self.client.timeout)
+        except Exception as e:
+            print_colored(f"⚠️ 关闭异步行情客户端失败: {e}", Colors.WARNING)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_market_client: Optional[SyncMarketClient] = None
+_market_client_lock = threading.Lock()
+
+
+def get_market_client() -> SyncMarketClient:
+    """获取进程内共享的行情客户端（同步外观）"""
+    global _market_client
+    with _market_client_lock:
+        if _market_client is None:
+            _market_client = SyncMarketClient(CONFIG.get("FUTURES_BASE_URL"), CONFIG.get("ASYNC_MAX_CONCURRENCY", 20))
+        return _market_client
@@ -59,7 +59,7 @@ def get_pair_data(symbol):
         print(f"DataFrame is empty for {symbol}")
         return jsonify({"error": "Failed to fetch simulated data"}), 500
 
-    df = calculate_optimized_indicators(df)
+    df = calculate_optimized_indicators(df, columns=['RSI', 'MACD', 'VWAP'])
     if df.empty:
         print(f"Indicators calculation failed for {symbol}")
         return jsonify({"error": "Failed to calculate indicators"}), 500
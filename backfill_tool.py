@@ -0,0 +1,297 @@
+"""
+历史K线回填工具
+按 startTime 分页下载多个交易对的长周期历史K线，多线程并行并按分钟请求权重限流，
+下载结果先写入暂存目录，完成后并入本地K线存储（candle_store），进度写入检查点文件，中断后重新运行会从断点继续
+
+默认并入机器人使用的 CANDLE_STORE_DIR，在POSIX系统上可以在机器人运行时执行：合并时持有该目录的排他锁并用替换的方式
+重写文件，完成后递增 generation 文件，机器人下次读取时重新打开（见 candle_store）；
+Windows上无法替换机器人正在映射的文件，需要先停止机器人或用 --root 指定单独的目录
+
+指定 --archive 时，每个任务并入本地存储后再把比归档更新的已收盘K线追加到压缩归档（candle_archive，
+CONFIG["CANDLE_ARCHIVE_DIR"]）；归档只能按时间顺序追加，早于归档起点的历史需要先回填再首次归档
+
+命令行用法:
+    python backfill_tool.py --symbols BTCUSDT ETHUSDT --intervals 1m 15m --days 90 --workers 4
+    python backfill_tool.py --symbols BTCUSDT --intervals 1h --days 365 --archive
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence
+
+from api_scheduler import kline_request_weight
+from candle_archive import CandleArchive, get_candle_archive
+from candle_store import CandleStore, get_candle_store, interval_to_ms, klines_to_columns
+from config import CONFIG
+from logger_utils import Colors, print_colored
+
+DAY_MS = 86_400_000
+
+
+class WeightBudget:
+    """按滑动时间窗口限制请求权重，超出预算时阻塞到窗口内有足够余量"""
+
+    def __init__(self, max_weight: int = 1200, window: float = 60.0):
+        self.max_weight = max_weight
+        self.window = window
+        self._spent = deque()  # (时间戳, 权重)
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        while self._spent and now - self._spent[0][0] >= self.window:
+            self._used -= self._spent.popleft()[1]
+
+    def acquire(self, weight: int) -> None:
+        """占用weight权重，预算不足时等待"""
+        weight = min(weight, self.max_weight)
+        while True:
+            with self._lock:
+                now = time.time()
+                self._prune(now)
+                if self._used + weight <= self.max_weight:
+                    self._spent.append((now, weight))
+                    self._used += weight
+                    return
+                wait = self._spent[0][0] + self.window - now
+            time.sleep(max(wait, 0.01))
+
+    @property
+    def used(self) -> int:
+        """当前窗口内已用权重"""
+        with self._lock:
+            self._prune(time.time())
+            return self._used
+
+
+class HistoricalBackfill:
+    """多交易对历史K线回填"""
+
+    def __init__(self, client, store: Optional[CandleStore] = None, checkpoint_path: Optional[str] = None,
+                 max_workers: int = 4, weight_budget: int = 1200, page_limit: int = 1000, max_retries: int = 5,
+                 archive: Optional[CandleArchive] = None):
+        """
+        参数:
+            client: Binance客户端（K线是公开数据，不需要API密钥）
+            store: 目标K线存储，默认使用共享的本地K线存储
+            checkpoint_path: 检查点文件，默认在存储根目录下
+            max_workers: 并行下载的线程数
+            weight_budget: 每分钟请求权重上限（交易所限制为2400，需要给实盘留出余量）
+            page_limit: 每页K线数量，1000根时单位权重下载的K线最多
+            max_retries: 单页请求失败的重试次数
+            archive: 压缩归档，指定时每个任务完成后把本地存储中的新K线追加到归档
+        """
+        self.client = client
+        self.store = store or get_candle_store(client)
+        self.staging = CandleStore(client, root=os.path.join(self.store.root, ".backfill"))
+        self.checkpoint_path = checkpoint_path or os.path.join(self.store.root, "backfill_checkpoint.json")
+        self.max_workers = max_workers
+        self.budget = WeightBudget(weight_budget)
+        self.page_limit = page_limit
+        self.max_retries = max_retries
+        self.archive = archive
+        self._checkpoint = self._load_checkpoint()
+        self._checkpoint_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.weight = 0
+        self.downloaded_bars = 0
+
+    # ------------------------------------------------------------------ 检查点
+
+    def _load_checkpoint(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print_colored(f"⚠️ 回填检查点读取失败，重新开始: {e}", Colors.WARNING)
+            return {}
+
+    def _save_job(self, key: str, state: Dict[str, Any]) -> None:
+        """更新一个任务的进度并原子地写入检查点文件"""
+        with self._checkpoint_lock:
+            self._checkpoint[key] = dict(state)
+            os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+            tmp_path = self.checkpoint_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._checkpoint, f, indent=2)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    # ------------------------------------------------------------------ 下载
+
+    def _fetch_page(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> List[List[Any]]:
+        """请求一页K线，失败时指数退避重试"""
+        weight = kline_request_weight(self.page_limit)
+        for attempt in range(self.max_retries + 1):
+            self.budget.acquire(weight)
+            try:
+                klines = self.client.futures_klines(symbol=symbol, interval=interval, startTime=start_ms,
+                                                    endTime=end_ms, limit=self.page_limit) or []
+                with self._stats_lock:
+                    self.requests += 1
+                    self.weight += weight
+                    self.downloaded_bars += len(klines)
+                return klines
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(2 ** attempt, 30)
+                print_colored(f"⚠️ {symbol} {interval} 请求失败，{delay}秒后重试: {e}", Colors.WARNING)
+                time.sleep(delay)
+        return []
+
+    def _archive_job(self, symbol: str, interval: str, state: Dict[str, Any]) -> None:
+        """把本地存储中比归档更新的已收盘K线追加到压缩归档（重复运行不会重复写入）"""
+        if self.archive is not None:
+            state["archived"] = self.archive.import_store(self.store, symbol, interval)
+
+    def _run_job(self, symbol: str, interval: str, start_ms: int, end_ms: int) -> Dict[str, Any]:
+        """下载一个 (交易对, 时间框架) 的 [start_ms, end_ms) 区间并并入本地存储"""
+        key = f"{symbol}_{interval}"
+        step = interval_to_ms(interval)
+        state = self._checkpoint.get(key)
+        if state is not None and state.get("start") == start_ms:
+            if state.get("done"):
+                self._archive_job(symbol, interval, state)
+                return state
+            # 从断点继续，沿用中断前的结束时间
+            end_ms = state["end"]
+        else:
+            self.staging.remove(symbol, interval)
+            state = {"symbol": symbol, "interval": interval, "start": start_ms, "end": end_ms,
+                     "cursor": start_ms, "bars": 0, "done": False}
+            self._save_job(key, state)
+
+        # 暂存数据可能比检查点更新（写入后、保存检查点前中断）
+        staged = self.staging.get_arrays(symbol, interval, limit=1, include_open=False, sync=False)
+        cursor = max(state["cursor"], int(staged['time'][-1]) + step) if len(staged['time']) else state["cursor"]
+
+        while cursor < end_ms:
+            klines = self._fetch_page(symbol, interval, cursor, end_ms - 1)
+            if not klines:
+                break
+            columns = klines_to_columns(klines)
+            closed = columns['close_time'] < int(time.time() * 1000)
+            state["bars"] += self.staging.append_closed(
+                symbol, interval, {name: values[closed] for name, values in columns.items()})
+            cursor = int(klines[-1][0]) + step
+            state["cursor"] = cursor
+            self._save_job(key, state)
+            if len(klines) < self.page_limit:
+                break
+
+        count = self.staging.stored_count(symbol, interval)
+        if count:
+            staged = self.staging.get_arrays(symbol, interval, limit=count, include_open=False, sync=False)
+            state["merged"] = self.store.merge_closed(symbol, interval, staged)
+            staged = None  # 释放内存映射后再删除暂存文件
+        self.staging.remove(symbol, interval)
+        state["done"] = True
+        self._save_job(key, state)
+        self._archive_job(symbol, interval, state)
+        return state
+
+    def run(self, symbols: Sequence[str], intervals: Sequence[str] = ("1m",), days: int = 30,
+            start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Dict[str, Any]:
+        """
+        回填多个交易对的历史K线
+
+        参数:
+            symbols: 交易对列表
+            intervals: K线周期列表
+            days: 回填天数（未指定start_ms时使用，起点按UTC日对齐，便于中断后重新运行时匹配检查点）
+            start_ms: 起始时间（毫秒）
+            end_ms: 结束时间（毫秒，不含），默认为当前时间
+
+        返回:
+            report: 任务数、完成/失败数、下载的K线数、请求数、权重、耗时和每秒K线数
+        """
+        now_ms = int(time.time() * 1000)
+        if start_ms is None:
+            start_ms = (now_ms - days * DAY_MS) // DAY_MS * DAY_MS
+        end_ms = end_ms or now_ms
+
+        jobs = [(symbol, interval) for symbol in symbols for interval in intervals]
+        print_colored(f"📥 开始回填 {len(symbols)}个交易对 x {len(intervals)}个周期，"
+                      f"权重预算 {self.budget.max_weight}/分钟，线程数 {self.max_workers}", Colors.BLUE)
+
+        started = time.time()
+        bars_before = self.downloaded_bars
+        requests_before, weight_before = self.requests, self.weight
+        completed, failed = 0, []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._run_job, symbol, interval,
+                                start_ms - start_ms % interval_to_ms(interval), end_ms): (symbol, interval)
+                for symbol, interval in jobs
+            }
+            for future in as_completed(futures):
+                symbol, interval = futures[future]
+                try:
+                    state = future.result()
+                    completed += 1
+                    archived = f"，归档 {state['archived']}根" if "archived" in state else ""
+                    print_colored(f"✅ {symbol} {interval} 回填完成: {state.get('bars', 0)}根K线{archived} "
+                                  f"({completed}/{len(jobs)})", Colors.GREEN)
+                except Exception as e:
+                    failed.append(f"{symbol}_{interval}")
+                    print_colored(f"❌ {symbol} {interval} 回填失败: {e}", Colors.ERROR)
+
+        elapsed = time.time() - started
+        bars = self.downloaded_bars - bars_before
+        report = {
+            "jobs": len(jobs),
+            "completed": completed,
+            "failed": failed,
+            "bars": bars,
+            "requests": self.requests - requests_before,
+            "weight": self.weight - weight_before,
+            "elapsed_s": elapsed,
+            "candles_per_s": bars / elapsed if elapsed > 0 else 0.0
+        }
+        print_colored(
+            f"📊 回填结束: {completed}/{len(jobs)}个任务完成，下载 {bars}根K线，{report['requests']}次请求"
+            f"（权重 {report['weight']}），耗时 {elapsed:.1f}秒，{report['candles_per_s']:.0f}根/秒",
+            Colors.GREEN if not failed else Colors.WARNING
+        )
+        return report
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import datetime, timezone
+
+    from binance.client import Client
+
+    parser = argparse.ArgumentParser(description='历史K线回填工具')
+    parser.add_argument('--symbols', nargs='+', default=CONFIG.get("TRADE_PAIRS", []), help='交易对')
+    parser.add_argument('--intervals', nargs='+', default=["1m"], help='K线周期')
+    parser.add_argument('--days', type=int, default=30, help='回填天数')
+    parser.add_argument('--start', type=str, default=None, help='起始日期 YYYY-MM-DD（UTC），优先于--days')
+    parser.add_argument('--workers', type=int, default=CONFIG.get("BACKFILL_WORKERS", 4), help='并行线程数')
+    parser.add_argument('--weight-budget', type=int, default=CONFIG.get("BACKFILL_WEIGHT_BUDGET", 1200),
+                        help='每分钟请求权重上限')
+    parser.add_argument('--root', type=str, default=None,
+                        help='本地K线存储目录，默认为 CONFIG["CANDLE_STORE_DIR"]（与运行中的机器人共用，按目录加锁）')
+    parser.add_argument('--archive', action='store_true',
+                        help='回填后把新K线追加到压缩归档 CONFIG["CANDLE_ARCHIVE_DIR"]')
+    args = parser.parse_args()
+
+    start = None
+    if args.start:
+        start = int(datetime.strptime(args.start, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+    if os.name == 'nt' and not args.root:
+        print_colored("⚠️ Windows上合并时不能有其他进程（例如运行中的机器人）正在读取同一个K线存储目录", Colors.WARNING)
+
+    public_client = Client()
+    target = CandleStore(public_client, root=args.root) if args.root else get_candle_store(public_client)
+    HistoricalBackfill(public_client, target, max_workers=args.workers, weight_budget=args.weight_budget,
+                       archive=get_candle_archive() if args.archive else None).run(
+        args.symbols, args.intervals, days=args.days, start_ms=start)
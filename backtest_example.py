@@ -1,13 +1,25 @@
 import pandas as pd
 from indicators_module import calculate_optimized_indicators
+from candle_archive import get_candle_archive
 from config import CONFIG
 
 class Backtester:
-    def __init__(self, data_path):
-        self.data = pd.read_csv(data_path)
+    def __init__(self, data_path=None, data=None):
+        """
+        参数:
+            data_path: CSV数据文件
+            data: 已加载的K线DataFrame（优先于data_path）
+        """
+        self.data = data if data is not None else pd.read_csv(data_path)
         self.config = Config()
         self.signals = []
 
+    @classmethod
+    def from_archive(cls, symbol, interval="1m", start_ms=None, end_ms=None, archive=None):
+        """从K线压缩归档按时间范围加载数据，只解压范围内的数据块"""
+        archive = archive or get_candle_archive()
+        return cls(data=archive.read_frame(symbol, interval, start_ms, end_ms))
+
     def calculate_indicators(self):
         """计算所有配置的指标"""
         self.data = calculate_optimized_indicators(self.data)
@@ -0,0 +1,204 @@
+"""
+跨交易对批量指标模块
+把多个交易对的K线对齐成 (交易对数, K线数, OHLCV) 的三维数组，沿时间轴一次性向量化计算
+EMA/RSI/ATR/布林带/ADX/CCI/威廉指标，整个币池的扫描只需少量NumPy运算，
+公式与 calculate_optimized_indicators 保持一致（不做逐列的数据长度检查）
+
+K线数不同的交易对在开头用NaN补齐（右对齐到最新一根K线），补齐部分按缺失值处理，
+与在该交易对自身数据上单独计算的结果一致；数据中间的缺失值不做特殊处理
+"""
+
+import warnings
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicator_kernels import ema_rows
+
+EPS = float(np.finfo(float).eps)
+
+# 输入张量最后一维的字段顺序
+OHLCV_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+# 输出张量最后一维的指标顺序，列名与 calculate_optimized_indicators 一致
+BATCH_COLUMNS = [
+    'EMA5', 'EMA20', 'EMA24', 'EMA52', 'RSI', 'TR', 'ATR',
+    'BB_Middle', 'BB_Std', 'BB_Upper', 'BB_Lower',
+    'Plus_DI', 'Minus_DI', 'ADX', 'CCI', 'Williams_R'
+]
+
+
+def _shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """沿时间轴后移，开头补NaN（与 Series.shift 一致）"""
+    out = np.full(values.shape, np.nan)
+    out[:, periods:] = values[:, :-periods]
+    return out
+
+
+def _rolling_sum_count(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """滚动窗口内有效值的和与个数，基于累加和，跳过NaN"""
+    valid = ~np.isnan(values)
+    padded = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(np.where(valid, values, 0.0), axis=1, out=padded[:, 1:])
+    counts = np.zeros(padded.shape, dtype=np.int64)
+    np.cumsum(valid, axis=1, out=counts[:, 1:])
+
+    n = values.shape[1]
+    start = np.maximum(np.arange(1, n + 1) - window, 0)
+    end = np.arange(1, n + 1)
+    return padded[:, end] - padded[:, start], counts[:, end] - counts[:, start]
+
+
+def rolling_mean(values: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    """沿时间轴的滚动均值，窗口内有效值不少于min_periods时才输出"""
+    total, count = _rolling_sum_count(values, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(count >= min_periods, total / count, np.nan)
+
+
+def rolling_sum(values: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    """沿时间轴的滚动求和，窗口内有效值不少于min_periods时才输出"""
+    total, count = _rolling_sum_count(values, window)
+    return np.where(count >= min_periods, total, np.nan)
+
+
+def _windows(values: np.ndarray, window: int) -> np.ndarray:
+    """开头补 window-1 个NaN后取滑动窗口视图，形状为 (行数, K线数, window)"""
+    padded = np.concatenate((np.full((values.shape[0], window - 1), np.nan), values), axis=1)
+    return sliding_window_view(padded, window, axis=1)
+
+
+def rolling_std(values: np.ndarray, window: int, min_periods: int = 1) -> np.ndarray:
+    """沿时间轴的滚动样本标准差 (ddof=1)，有效值少于2个时为NaN"""
+    windows = _windows(values, window)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        std = np.nanstd(windows, axis=2, ddof=1)
+    _, count = _rolling_sum_count(values, window)
+    return np.where(count >= max(min_periods, 2), std, np.nan)
+
+
+def rolling_extreme(values: np.ndarray, window: int, mode: str = 'max', min_periods: int = None) -> np.ndarray:
+    """沿时间轴的滚动最大/最小值，min_periods默认等于窗口长度"""
+    if min_periods is None:
+        min_periods = window
+    windows = _windows(values, window)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        extreme = np.nanmax(windows, axis=2) if mode == 'max' else np.nanmin(windows, axis=2)
+    _, count = _rolling_sum_count(values, window)
+    return np.where(count >= min_periods, extreme, np.nan)
+
+
+def frames_to_tensor(frames: Dict[str, pd.DataFrame], bars: int = None) -> Tuple[List[str], np.ndarray]:
+    """
+    把多个交易对的K线DataFrame对齐为三维数组
+
+    参数:
+        frames: {交易对: 包含OHLCV列的DataFrame}
+        bars: 每个交易对保留的最新K线数量，None表示取最长的数据长度
+
+    返回:
+        symbols: 交易对顺序
+        prices: (交易对数, K线数, 5) 的OHLCV数组，较短的数据在开头补NaN
+    """
+    symbols = [symbol for symbol, df in frames.items() if df is not None and not df.empty]
+    if bars is None:
+        bars = max((len(frames[symbol]) for symbol in symbols), default=0)
+
+    prices = np.full((len(symbols), bars, len(OHLCV_FIELDS)), np.nan)
+    for i, symbol in enumerate(symbols):
+        values = frames[symbol][OHLCV_FIELDS].to_numpy(dtype=np.float64)[-bars:]
+        prices[i, bars - len(values):] = values
+    return symbols, prices
+
+
+def batch_indicators(prices: np.ndarray) -> np.ndarray:
+    """
+    对所有交易对一次性计算指标
+
+    参数:
+        prices: (交易对数, K线数, 5) 的OHLCV数组，字段顺序见OHLCV_FIELDS
+
+    返回:
+        indicators: (交易对数, K线数, len(BATCH_COLUMNS)) 的指标数组，指标顺序见BATCH_COLUMNS
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.ndim != 3 or prices.shape[2] != len(OHLCV_FIELDS):
+        raise ValueError(f"价格数组形状应为 (交易对数, K线数, {len(OHLCV_FIELDS)})，实际为 {prices.shape}")
+
+    high = np.ascontiguousarray(prices[:, :, 1])
+    low = np.ascontiguousarray(prices[:, :, 2])
+    close = np.ascontiguousarray(prices[:, :, 3])
+    out = np.full(prices.shape[:2] + (len(BATCH_COLUMNS),), np.nan)
+    if prices.shape[1] == 0:
+        return out
+    col = {name: j for j, name in enumerate(BATCH_COLUMNS)}
+
+    # EMA
+    for span in (5, 20, 24, 52):
+        out[:, :, col[f'EMA{span}']] = ema_rows(close, 2.0 / (span + 1))
+
+    # RSI
+    delta = close - _shift(close)
+    gain = rolling_mean(np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0)), 14)
+    loss = rolling_mean(np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0)), 14)
+    rs = gain / np.where(loss == 0, EPS, loss)
+    out[:, :, col['RSI']] = 100 - (100 / (1 + rs))
+
+    # TR / ATR
+    prev_close = _shift(close)
+    tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    out[:, :, col['TR']] = tr
+    out[:, :, col['ATR']] = rolling_mean(tr, 14)
+
+    # 布林带
+    bb_middle = rolling_mean(close, 20)
+    bb_std = rolling_std(close, 20)
+    out[:, :, col['BB_Middle']] = bb_middle
+    out[:, :, col['BB_Std']] = bb_std
+    out[:, :, col['BB_Upper']] = bb_middle + 2 * bb_std
+    out[:, :, col['BB_Lower']] = bb_middle - 2 * bb_std
+
+    # ADX
+    plus_dm = np.clip(high - _shift(high), 0, None)
+    minus_dm = np.clip(_shift(low) - low, 0, None)
+    tr14 = rolling_sum(tr, 14)
+    tr14 = np.where(tr14 == 0, EPS, tr14)
+    plus_di = 100 * (rolling_sum(plus_dm, 14) / tr14)
+    minus_di = 100 * (rolling_sum(minus_dm, 14) / tr14)
+    di_sum = plus_di + minus_di
+    dx = 100 * np.abs(plus_di - minus_di) / np.where(di_sum == 0, EPS, di_sum)
+    out[:, :, col['Plus_DI']] = plus_di
+    out[:, :, col['Minus_DI']] = minus_di
+    out[:, :, col['ADX']] = rolling_mean(dx, 14)
+
+    # CCI
+    typical_price = (high + low + close) / 3
+    deviation = typical_price - rolling_mean(typical_price, 20)
+    mean_dev = rolling_mean(np.abs(deviation), 20)
+    out[:, :, col['CCI']] = deviation / (0.015 * np.where(mean_dev == 0, EPS, mean_dev))
+
+    # 威廉指标
+    highest_high = rolling_extreme(high, 14, 'max')
+    lowest_low = rolling_extreme(low, 14, 'min')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[:, :, col['Williams_R']] = -100 * (highest_high - close) / (highest_high - lowest_low)
+
+    return out
+
+
+def latest_values(indicators: np.ndarray, symbols: Sequence[str]) -> pd.DataFrame:
+    """
+    取每个交易对最后一根K线的指标值
+
+    参数:
+        indicators: batch_indicators 的输出
+        symbols: 与第一维对应的交易对
+
+    返回:
+        df: 以交易对为索引、BATCH_COLUMNS为列的DataFrame
+    """
+    return pd.DataFrame(indicators[:, -1, :], index=list(symbols), columns=BATCH_COLUMNS)
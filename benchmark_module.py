@@ -0,0 +1,908 @@
+"""
+性能基准模块
+对比指标内核与原逐K线实现的耗时，直接运行本文件即可输出结果
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Sequence
+from logger_utils import Colors, print_colored
+from indicator_kernels import supertrend_kernel, NUMBA_AVAILABLE
+from indicators_module import TREND_COLUMNS, calculate_optimized_indicators, calculate_smma, get_smc_trend_and_duration
+from batch_indicators import BATCH_COLUMNS, batch_indicators, frames_to_tensor
+from candle_store import CandleStore, interval_to_ms
+from timeframe_resampler import TimeframeResampler
+from api_scheduler import ApiScheduler, ScheduledClient, kline_request_weight
+from single_flight import SingleFlight
+from async_client import SyncMarketClient
+from mock_exchange import MockExchange, MockExchangeServer
+from analysis_pipeline import AnalysisPipeline, compute_symbol_score
+from kline_parser import KLINE_COLUMNS, parse_klines
+from candle_archive import CandleArchive
+from advanced_indicators import calculate_parabolic_sar
+
+
+def make_synthetic_ohlcv(n_bars: int, seed: int = 42, start_price: float = 100.0) -> pd.DataFrame:
+    """
+    生成随机游走的合成K线数据
+
+    参数:
+        n_bars: K线数量
+        seed: 随机种子
+        start_price: 起始价格
+
+    返回:
+        df: 包含time/open/high/low/close/volume的DataFrame
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.004, n_bars)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.003, n_bars)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+    volume = rng.lognormal(8, 0.5, n_bars)
+    return pd.DataFrame({
+        'time': pd.date_range('2024-01-01', periods=n_bars, freq='15min'),
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume
+    })
+
+
+def _time_call(func: Callable, repeat: int) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _legacy_supertrend(df: pd.DataFrame, multiplier: float = 3.0):
+    """原版逐K线 .iloc 实现，仅用于基准对比"""
+    high, low, close, atr = df['high'], df['low'], df['close'], df['ATR']
+    upperband = ((high + low) / 2) + (multiplier * atr)
+    lowerband = ((high + low) / 2) - (multiplier * atr)
+    supertrend = pd.Series(0.0, index=df.index)
+    direction = pd.Series(1, index=df.index)
+    supertrend.iloc[0] = lowerband.iloc[0]
+    for i in range(1, len(df)):
+        if close.iloc[i] > upperband.iloc[i - 1]:
+            supertrend.iloc[i] = lowerband.iloc[i]
+            direction.iloc[i] = 1
+        elif close.iloc[i] < lowerband.iloc[i - 1]:
+            supertrend.iloc[i] = upperband.iloc[i]
+            direction.iloc[i] = -1
+        else:
+            if direction.iloc[i - 1] == 1:
+                supertrend.iloc[i] = max(lowerband.iloc[i], supertrend.iloc[i - 1])
+                direction.iloc[i] = 1
+            else:
+                supertrend.iloc[i] = min(upperband.iloc[i], supertrend.iloc[i - 1])
+                direction.iloc[i] = -1
+
+    stability = pd.Series(1.0, index=df.index)
+    for i in range(3, len(df)):
+        is_stable = True
+        for j in range(1, 3):
+            if direction.iloc[i - j] != direction.iloc[i]:
+                is_stable = False
+                break
+        stability.iloc[i] = 1.0 if is_stable else 0.5
+
+    changes = []
+    last_direction = direction.iloc[0]
+    for i in range(1, len(direction)):
+        if direction.iloc[i] != last_direction:
+            changes.append(i)
+            last_direction = direction.iloc[i]
+    return supertrend, direction, stability, changes
+
+
+def benchmark_supertrend(sizes: Sequence[int] = (200, 2000, 50000), repeat: int = 3) -> List[Dict[str, float]]:
+    """
+    超级趋势内核与原版实现的耗时对比，并校验输出一致
+
+    参数:
+        sizes: 测试的K线数量
+        repeat: 每组重复次数
+
+    返回:
+        results: 每个规模的耗时与加速比
+    """
+    results = []
+    print_colored(f"超级趋势基准 (numba: {'启用' if NUMBA_AVAILABLE else '未安装'})", Colors.BLUE + Colors.BOLD)
+
+    # 预热，排除JIT编译时间
+    warm = make_synthetic_ohlcv(50)
+    warm['ATR'] = (warm['high'] - warm['low']).rolling(14, min_periods=1).mean()
+    supertrend_kernel(warm['high'].values, warm['low'].values, warm['close'].values, warm['ATR'].values)
+
+    for n in sizes:
+        df = make_synthetic_ohlcv(n)
+        df['ATR'] = (df['high'] - df['low']).rolling(14, min_periods=1).mean()
+        arrays = (df['high'].values, df['low'].values, df['close'].values, df['ATR'].values)
+
+        kernel_time = _time_call(lambda: supertrend_kernel(*arrays), repeat)
+        # 原版实现在大规模数据上极慢，只运行一次
+        legacy_repeat = 1 if n > 5000 else repeat
+        legacy_time = _time_call(lambda: _legacy_supertrend(df), legacy_repeat)
+
+        st, direction, stability, changes = supertrend_kernel(*arrays)
+        ref_st, ref_dir, ref_stab, ref_changes = _legacy_supertrend(df)
+        matches = (np.allclose(st, ref_st.values, equal_nan=True) and
+                   np.array_equal(direction, ref_dir.values) and
+                   np.array_equal(stability, ref_stab.values) and
+                   list(changes) == ref_changes)
+
+        speedup = legacy_time / kernel_time if kernel_time > 0 else float('inf')
+        results.append({"bars": n, "legacy_s": legacy_time, "kernel_s": kernel_time,
+                        "speedup": speedup, "matches": matches})
+        print_colored(
+            f"{n:>6}根K线 - 原版: {legacy_time * 1000:.2f}ms, 内核: {kernel_time * 1000:.3f}ms, "
+            f"加速: {speedup:.0f}x, 输出一致: {matches}",
+            Colors.GREEN if matches else Colors.RED
+        )
+
+    return results
+
+
+def benchmark_recursions(sizes: Sequence[int] = (200, 2000, 50000), repeat: int = 3) -> List[Dict[str, float]]:
+    """
+    SMMA与抛物线SAR的快速实现和参考实现的耗时对比，并校验输出一致
+
+    参数:
+        sizes: 测试的K线数量
+        repeat: 每组重复次数
+
+    返回:
+        results: 每个规模、每个指标的耗时与加速比
+    """
+    results = []
+    print_colored("SMMA / 抛物线SAR 基准", Colors.BLUE + Colors.BOLD)
+    calculate_parabolic_sar(make_synthetic_ohlcv(50))  # 预热，排除JIT编译时间
+
+    cases = [
+        ("SMMA60", "SMMA60", lambda df, method: calculate_smma(df, period=60, method=method)),
+        ("SAR", "SAR", lambda df, method: calculate_parabolic_sar(df, method=method)),
+    ]
+    for n in sizes:
+        base = make_synthetic_ohlcv(n)
+        for name, column, func in cases:
+            legacy_repeat = 1 if n > 5000 else repeat
+            fast_df, ref_df = base.copy(), base.copy()
+            fast_time = _time_call(lambda: func(fast_df, 'fast'), repeat)
+            ref_time = _time_call(lambda: func(ref_df, 'reference'), legacy_repeat)
+            matches = np.allclose(fast_df[column].values, ref_df[column].values, rtol=1e-9, equal_nan=True)
+            speedup = ref_time / fast_time if fast_time > 0 else float('inf')
+            results.append({"indicator": name, "bars": n, "legacy_s": ref_time, "kernel_s": fast_time,
+                            "speedup": speedup, "matches": matches})
+            print_colored(
+                f"{name:>6} {n:>6}根K线 - 参考: {ref_time * 1000:.2f}ms, 快速: {fast_time * 1000:.3f}ms, "
+                f"加速: {speedup:.0f}x, 输出一致: {matches}",
+                Colors.GREEN if matches else Colors.RED
+            )
+
+    return results
+
+
+def _traced_peak(func: Callable) -> int:
+    """运行一次并返回tracemalloc记录的峰值分配字节数"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _attach_by_column(df: pd.DataFrame, arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """原版的拼接方式：先逐列初始化为NaN，再逐列赋值，仅用于基准对比"""
+    df = df.copy()
+    for name in arrays:
+        df[name] = np.nan
+    for name, values in arrays.items():
+        df[name] = values
+    return df
+
+
+def _attach_as_block(df: pd.DataFrame, arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """一次性拼接：指标写入一块F序矩阵后与原数据concat"""
+    block = np.empty((len(df), len(arrays)), order='F')
+    for j, values in enumerate(arrays.values()):
+        block[:, j] = values
+    return pd.concat([df, pd.DataFrame(block, index=df.index, columns=list(arrays), copy=False)], axis=1)
+
+
+def benchmark_indicator_block(sizes: Sequence[int] = (200, 2000, 50000), repeat: int = 3) -> List[Dict[str, float]]:
+    """
+    指标矩阵一次性拼接与逐列插入的对比：耗时、tracemalloc峰值分配和结果DataFrame的内部块数，
+    同时给出完整流水线在DataFrame模式和数组模式下的耗时
+
+    参数:
+        sizes: 测试的K线数量
+        repeat: 每组重复次数
+
+    返回:
+        results: 每个规模的耗时、峰值分配与块数
+    """
+    results = []
+    print_colored("指标矩阵拼接基准", Colors.BLUE + Colors.BOLD)
+
+    for n in sizes:
+        base = make_synthetic_ohlcv(n)
+        # 流水线会输出大量日志，基准中屏蔽
+        with contextlib.redirect_stdout(io.StringIO()):
+            arrays = calculate_optimized_indicators(base.copy(), return_arrays=True)
+            frame_time = _time_call(lambda: calculate_optimized_indicators(base.copy()), repeat)
+            arrays_time = _time_call(lambda: calculate_optimized_indicators(base.copy(), return_arrays=True), repeat)
+
+        column_time = _time_call(lambda: _attach_by_column(base, arrays), repeat)
+        block_time = _time_call(lambda: _attach_as_block(base, arrays), repeat)
+        column_peak = _traced_peak(lambda: _attach_by_column(base, arrays))
+        block_peak = _traced_peak(lambda: _attach_as_block(base, arrays))
+        column_blocks = len(_attach_by_column(base, arrays)._mgr.blocks)
+        block_blocks = len(_attach_as_block(base, arrays)._mgr.blocks)
+
+        results.append({"bars": n, "pipeline_frame_s": frame_time, "pipeline_arrays_s": arrays_time,
+                        "attach_column_s": column_time, "attach_block_s": block_time,
+                        "attach_column_peak_bytes": column_peak, "attach_block_peak_bytes": block_peak,
+                        "column_blocks": column_blocks, "block_blocks": block_blocks})
+        print_colored(
+            f"{n:>6}根K线 - 流水线: DataFrame {frame_time * 1000:.2f}ms / 数组 {arrays_time * 1000:.2f}ms | "
+            f"拼接{len(arrays)}列: 逐列 {column_time * 1000:.2f}ms, 峰值 {column_peak / 1024:.0f}KB, {column_blocks}块; "
+            f"整块 {block_time * 1000:.3f}ms, 峰值 {block_peak / 1024:.0f}KB, {block_blocks}块",
+            Colors.GREEN
+        )
+
+    return results
+
+
+def benchmark_trend_columns(frames: int = 200, repeat: int = 1) -> Dict[str, float]:
+    """
+    只计算 TREND_COLUMNS 与计算全部指标的耗时对比，并校验两者的 get_smc_trend_and_duration 结果完全一致
+
+    参数:
+        frames: 测试的K线段数量（长度和随机种子各不相同）
+        repeat: 重复次数
+
+    返回:
+        result: 两种方式的耗时和结果不一致的段数
+    """
+    print_colored("趋势列子集一致性基准", Colors.BLUE + Colors.BOLD)
+    samples = [make_synthetic_ohlcv(100 + i % 7 * 20, seed=i) for i in range(frames)]
+
+    def compute(columns):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return [calculate_optimized_indicators(df.copy(), columns=columns) for df in samples]
+
+    full_time = _time_call(lambda: compute(None), repeat)
+    trend_time = _time_call(lambda: compute(TREND_COLUMNS), repeat)
+    mismatched = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for full, subset in zip(compute(None), compute(TREND_COLUMNS)):
+            if get_smc_trend_and_duration(full) != get_smc_trend_and_duration(subset):
+                mismatched += 1
+
+    result = {"frames": frames, "full_s": full_time, "trend_s": trend_time, "mismatched": mismatched}
+    print_colored(
+        f"{frames}段K线 - 全部指标: {full_time:.2f}s, 趋势列: {trend_time:.2f}s, "
+        f"趋势结果不一致: {mismatched}/{frames}",
+        Colors.GREEN if mismatched == 0 else Colors.RED
+    )
+    return result
+
+
+def benchmark_batch_indicators(symbol_counts: Sequence[int] = (12, 100, 300), bars: int = 200,
+                               repeat: int = 3) -> List[Dict[str, float]]:
+    """
+    三维张量批量计算与逐交易对调用 calculate_optimized_indicators 的耗时对比，并校验输出一致
+
+    参数:
+        symbol_counts: 测试的交易对数量
+        bars: 每个交易对的K线数量
+        repeat: 每组重复次数
+
+    返回:
+        results: 每个规模的耗时与加速比
+    """
+    results = []
+    print_colored("跨交易对批量指标基准", Colors.BLUE + Colors.BOLD)
+    batch_indicators(np.ones((1, 60, 5)))  # 预热，排除JIT编译时间
+
+    for count in symbol_counts:
+        # 交易对的K线数量不完全相同，验证开头补齐的处理
+        frames = {f"SYM{i}USDT": make_synthetic_ohlcv(bars - (i % 3) * 10, seed=i) for i in range(count)}
+        symbols, prices = frames_to_tensor(frames)
+
+        def per_symbol():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return [calculate_optimized_indicators(frames[symbol].copy(), columns=BATCH_COLUMNS,
+                                                       return_arrays=True) for symbol in symbols]
+
+        loop_time = _time_call(per_symbol, repeat)
+        batch_time = _time_call(lambda: batch_indicators(prices), repeat)
+
+        expected = per_symbol()
+        tensor = batch_indicators(prices)
+        matches = True
+        for i, symbol in enumerate(symbols):
+            length = len(frames[symbol])
+            for j, name in enumerate(BATCH_COLUMNS):
+                if not np.allclose(tensor[i, -length:, j], expected[i][name], rtol=1e-8, atol=1e-8, equal_nan=True):
+                    matches = False
+
+        speedup = loop_time / batch_time if batch_time > 0 else float('inf')
+        results.append({"symbols": count, "bars": bars, "loop_s": loop_time, "batch_s": batch_time,
+                        "speedup": speedup, "matches": matches})
+        print_colored(
+            f"{count:>4}个交易对 x {bars}根K线 - 逐个: {loop_time * 1000:.1f}ms, 批量: {batch_time * 1000:.2f}ms, "
+            f"加速: {speedup:.0f}x, 输出一致: {matches}",
+            Colors.GREEN if matches else Colors.RED
+        )
+
+    return results
+
+
+class SyntheticKlineClient:
+    """按当前时间生成确定性K线的假客户端，模拟 futures_klines 的 startTime/endTime/limit 语义并统计流量"""
+
+    def __init__(self, history_bars: int = 5000):
+        self.history_bars = history_bars
+        self.requests = 0
+        self.bars_served = 0
+        self.weight = 0
+
+    def futures_klines(self, symbol: str, interval: str, limit: int = 500, startTime: int = None,
+                       endTime: int = None, **kwargs):
+        step = interval_to_ms(interval)
+        now_ms = int(time.time() * 1000)
+        current_open = now_ms - now_ms % step
+        first_open = current_open - self.history_bars * step
+        if startTime is not None:
+            opens = range(max(startTime + (-startTime) % step, first_open), current_open + 1, step)
+            opens = list(opens)[:limit]
+        else:
+            last = min(current_open, endTime - endTime % step) if endTime is not None else current_open
+            opens = list(range(max(last - (limit - 1) * step, first_open), last + 1, step))
+        self.requests += 1
+        self.bars_served += len(opens)
+        self.weight += kline_request_weight(limit)
+        klines = []
+        for open_time in opens:
+            price = 100 + np.sin(open_time / step / 50.0) * 5
+            klines.append([open_time, str(price), str(price * 1.002), str(price * 0.998), str(price * 1.001),
+                           "1000.0", open_time + step - 1, "100000.0", 100, "500.0", "50000.0", "0"])
+        return klines
+
+
+def benchmark_candle_sync(calls: int = 50, limit: int = 200, interval: str = "15m") -> Dict[str, float]:
+    """
+    本地K线存储与每次全量下载的K线流量对比（稳态下的重复读取）
+
+    参数:
+        calls: 重复读取次数
+        limit: 每次读取的K线数量
+        interval: K线周期
+
+    返回:
+        result: 两种方式下载的K线数量和流量降幅
+    """
+    print_colored("本地K线存储流量基准", Colors.BLUE + Colors.BOLD)
+    direct = SyntheticKlineClient()
+    for _ in range(calls):
+        direct.futures_klines(symbol="BTCUSDT", interval=interval, limit=limit)
+
+    stored = SyntheticKlineClient()
+    with tempfile.TemporaryDirectory() as root:
+        store = CandleStore(stored, root=root)
+        store.get_frame("BTCUSDT", interval, limit=limit)  # 首次同步（冷启动）
+        cold_bars = stored.bars_served
+        read_time = _time_call(lambda: store.get_frame("BTCUSDT", interval, limit=limit), calls)
+        steady_bars = stored.bars_served - cold_bars
+
+        # 模拟重启：新实例读取同一目录，不应重新下载历史
+        restarted = SyntheticKlineClient()
+        CandleStore(restarted, root=root).get_frame("BTCUSDT", interval, limit=limit)
+
+    reduction = 1 - steady_bars / direct.bars_served if direct.bars_served else 0.0
+    result = {"calls": calls, "direct_bars": direct.bars_served, "cold_start_bars": cold_bars,
+              "steady_bars": steady_bars, "restart_bars": restarted.bars_served,
+              "reduction": reduction, "read_s": read_time}
+    print_colored(
+        f"{calls}次读取{limit}根K线 - 全量下载: {direct.bars_served}根, 本地存储: 冷启动 {cold_bars}根 + "
+        f"稳态 {steady_bars}根 (降幅 {reduction:.1%}), 重启后 {restarted.bars_served}根, "
+        f"单次读取 {read_time * 1000:.2f}ms",
+        Colors.GREEN if reduction > 0.9 else Colors.RED
+    )
+    return result
+
+
+def _legacy_parse_klines(klines) -> pd.DataFrame:
+    """原各模块重复的K线转换流程: 12列DataFrame + pd.to_numeric + pd.to_datetime"""
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
+    df['time'] = pd.to_datetime(df['time'], unit='ms', errors='coerce')
+    return df
+
+
+def benchmark_kline_parsing(sizes: Sequence[int] = (200, 1500), repeat: int = 20) -> List[Dict[str, float]]:
+    """
+    共享K线解析器与原DataFrame转换流程的耗时对比，并校验OHLCV与时间一致
+
+    参数:
+        sizes: 每个K线数据包的行数
+        repeat: 每组重复次数
+
+    返回:
+        results: 每个规模的耗时与加速比
+    """
+    results = []
+    print_colored("K线数据解析基准", Colors.BLUE + Colors.BOLD)
+    client = SyntheticKlineClient(history_bars=max(sizes))
+    for size in sizes:
+        klines = client.futures_klines(symbol="BTCUSDT", interval="1m", limit=size)
+
+        legacy_time = _time_call(lambda: _legacy_parse_klines(klines), repeat)
+        parser_time = _time_call(lambda: parse_klines(klines), repeat)
+
+        legacy = _legacy_parse_klines(klines)
+        parsed = parse_klines(klines)
+        matches = bool(legacy['time'].equals(parsed['time']) and np.array_equal(
+            legacy[['open', 'high', 'low', 'close', 'volume']].to_numpy(),
+            parsed[['open', 'high', 'low', 'close', 'volume']].to_numpy()))
+
+        speedup = legacy_time / parser_time if parser_time > 0 else float('inf')
+        results.append({"rows": size, "legacy_s": legacy_time, "parser_s": parser_time,
+                        "speedup": speedup, "matches": matches})
+        print_colored(
+            f"{size:>5}行 - 原流程: {legacy_time * 1000:.3f}ms, 共享解析器: {parser_time * 1000:.3f}ms, "
+            f"加速: {speedup:.1f}x, 输出一致: {matches}",
+            Colors.GREEN if matches else Colors.RED
+        )
+
+    return results
+
+
+def benchmark_mtf_requests(symbol_count: int = 300) -> Dict[str, float]:
+    """
+    多时间框架刷新的请求数/权重对比: 每个周期单独同步 vs 由1m K线重采样
+
+    参数:
+        symbol_count: 交易对数量
+
+    返回:
+        result: 冷启动和稳态刷新一轮的请求数与权重
+    """
+    print_colored("多时间框架重采样请求基准", Colors.BLUE + Colors.BOLD)
+    limits = {"1m": 100, "5m": 100, "15m": 100, "1h": 200, "4h": 200}
+    symbols = [f"SYM{i}USDT" for i in range(symbol_count)]
+    result = {"symbols": symbol_count}
+
+    with tempfile.TemporaryDirectory() as root:
+        client = SyntheticKlineClient()
+        store = CandleStore(client, root=f"{root}/direct")
+        for phase in ("cold", "steady"):
+            requests, weight = client.requests, client.weight
+            for symbol in symbols:
+                for interval, limit in limits.items():
+                    store.get_arrays(symbol, interval, limit=limit)
+            result[f"per_interval_{phase}_requests"] = client.requests - requests
+            result[f"per_interval_{phase}_weight"] = client.weight - weight
+
+        client = SyntheticKlineClient()
+        resampler = TimeframeResampler(CandleStore(client, root=f"{root}/resampled"))
+        for phase in ("cold", "steady"):
+            requests, weight = client.requests, client.weight
+            for symbol in symbols:
+                resampler.sync(symbol, min_bars=limits["1m"])
+                for interval, limit in limits.items():
+                    resampler.get_arrays(symbol, interval, limit=limit, sync=False)
+            result[f"resampled_{phase}_requests"] = client.requests - requests
+            result[f"resampled_{phase}_weight"] = client.weight - weight
+
+    print_colored(
+        f"{symbol_count}个交易对 x 5个周期 - 逐周期同步: 冷启动 {result['per_interval_cold_requests']}次请求/"
+        f"权重{result['per_interval_cold_weight']}, 稳态 {result['per_interval_steady_requests']}次/"
+        f"权重{result['per_interval_steady_weight']}; 1m重采样: 冷启动 {result['resampled_cold_requests']}次/"
+        f"权重{result['resampled_cold_weight']}, 稳态 {result['resampled_steady_requests']}次/"
+        f"权重{result['resampled_steady_weight']}",
+        Colors.GREEN
+    )
+    return result
+
+
+def benchmark_candle_archive(rows: int = 525_600, repeat: int = 3) -> Dict[str, float]:
+    """
+    K线压缩归档与CSV（backtest_example.Backtester 的数据格式）的磁盘占用和读取速度对比
+
+    参数:
+        rows: 1m K线数量，默认一年
+        repeat: 读取重复次数
+
+    返回:
+        result: 各格式的字节数、全量读取和最近一天范围读取的耗时
+    """
+    print_colored("K线压缩归档基准", Colors.BLUE + Colors.BOLD)
+    df = make_synthetic_ohlcv(rows)
+    # 交易所价格/数量有固定精度
+    for col in ['open', 'high', 'low', 'close']:
+        df[col] = df[col].round(2)
+    df['volume'] = df['volume'].round(3)
+    df['time'] = pd.date_range('2024-01-01', periods=rows, freq='1min')
+    columns = {'time': df['time'].to_numpy().astype('datetime64[ms]').astype(np.int64)}
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        columns[col] = df[col].to_numpy()
+    day_start = int(columns['time'][-1440])
+
+    with tempfile.TemporaryDirectory() as root:
+        csv_path = os.path.join(root, "history.csv")
+        df.to_csv(csv_path, index=False)
+        archive = CandleArchive(root=os.path.join(root, "archive"))
+        write_time = _time_call(lambda: archive.append("BTCUSDT", "1m", columns), 1)
+
+        csv_bytes = os.path.getsize(csv_path)
+        archive_bytes = archive.info("BTCUSDT", "1m")["bytes"]
+        raw_bytes = sum(values.nbytes for values in columns.values())
+
+        csv_read = _time_call(lambda: pd.read_csv(csv_path), repeat)
+        archive_read = _time_call(lambda: archive.read("BTCUSDT", "1m"), repeat)
+
+        def csv_last_day():
+            frame = pd.read_csv(csv_path)
+            return frame[pd.to_datetime(frame['time']) >= pd.Timestamp(day_start, unit='ms')]
+
+        csv_range = _time_call(csv_last_day, repeat)
+        archive_range = _time_call(lambda: archive.read("BTCUSDT", "1m", start_ms=day_start), repeat)
+
+        restored = archive.read("BTCUSDT", "1m")
+        matches = all(np.array_equal(restored[name], values) for name, values in columns.items())
+
+    result = {"rows": rows, "csv_bytes": csv_bytes, "raw_bytes": raw_bytes, "archive_bytes": archive_bytes,
+              "write_s": write_time, "csv_read_s": csv_read, "archive_read_s": archive_read,
+              "csv_range_s": csv_range, "archive_range_s": archive_range, "lossless": matches}
+    print_colored(
+        f"{rows}根1m K线 - 磁盘: CSV {csv_bytes / 1e6:.1f}MB, 原始float64 {raw_bytes / 1e6:.1f}MB, "
+        f"归档 {archive_bytes / 1e6:.1f}MB ({csv_bytes / max(archive_bytes, 1):.1f}x); "
+        f"全量读取: CSV {csv_read * 1000:.0f}ms, 归档 {archive_read * 1000:.0f}ms; "
+        f"最近一天: CSV {csv_range * 1000:.0f}ms, 归档 {archive_range * 1000:.2f}ms; 无损: {matches}",
+        Colors.GREEN if matches else Colors.RED
+    )
+    return result
+
+
+def benchmark_api_scheduler(weight_limit: int = 600, window: float = 2.0, windows: int = 4,
+                            threads: int = 16) -> Dict[str, float]:
+    """
+    请求调度器的吞吐和限流正确性（缩短窗口模拟每分钟权重上限）
+
+    参数:
+        weight_limit: 每窗口权重上限
+        window: 窗口长度（秒）
+        windows: 运行的窗口数
+        threads: 并发发送请求的线程数（一半按下单优先级，一半按扫描优先级）
+
+    返回:
+        result: 每窗口最大用量、平均利用率和各优先级的平均等待时间
+    """
+    import random
+    import threading
+    from collections import Counter
+
+    from api_scheduler import PRIORITY_ORDER, PRIORITY_SCAN
+
+    print_colored("API请求调度基准", Colors.BLUE + Colors.BOLD)
+    scheduler = ApiScheduler(weight_limit, headroom=0.0, burst_seconds=window / 12, window=window)
+    used = Counter()
+    used_lock = threading.Lock()
+    deadline = time.time() + windows * window
+    first_window = int(time.time() // window)
+
+    def worker(index: int):
+        rng = random.Random(index)
+        priority = PRIORITY_ORDER if index % 2 == 0 else PRIORITY_SCAN
+        while time.time() < deadline:
+            weight = rng.choice((1, 1, 2, 5))
+            scheduler.acquire(weight, priority)
+            with used_lock:
+                used[int(time.time() // window)] += weight
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    # 只统计完整的窗口
+    full = [used[w] for w in range(first_window + 1, first_window + windows)]
+    stats = scheduler.stats()["priorities"]
+    result = {
+        "limit": scheduler.limit,
+        "max_window_weight": max(used.values()),
+        "utilization": sum(full) / (len(full) * scheduler.limit) if full else 0.0,
+        "order_wait_ms": stats["order"]["wait_s"] / max(stats["order"]["requests"], 1) * 1000,
+        "scan_wait_ms": stats["scan"]["wait_s"] / max(stats["scan"]["requests"], 1) * 1000
+    }
+    within = result["max_window_weight"] <= scheduler.limit
+    print_colored(
+        f"上限 {scheduler.limit}/窗口 - 最大窗口用量 {result['max_window_weight']}, "
+        f"利用率 {result['utilization']:.1%}, 平均等待: 下单 {result['order_wait_ms']:.1f}ms, "
+        f"扫描 {result['scan_wait_ms']:.1f}ms",
+        Colors.GREEN if within else Colors.RED
+    )
+    return result
+
+
+def benchmark_single_flight(threads: int = 12, symbols: int = 20, rounds: int = 5,
+                            latency: float = 0.02) -> Dict[str, float]:
+    """
+    并发相同行情请求的合并效果（多个线程同时读取同一组交易对的价格和K线）
+
+    参数:
+        threads: 并发线程数（模拟扫描线程、监控线程和入场等待线程）
+        symbols: 交易对数量
+        rounds: 每个线程读取的轮数
+        latency: 模拟的单次请求延迟（秒）
+
+    返回:
+        result: 调用次数、实际请求次数、合并比例和耗时
+    """
+    import threading
+
+    print_colored("并发请求合并基准", Colors.BLUE + Colors.BOLD)
+
+    class SlowClient:
+        def __init__(self):
+            self.requests = 0
+            self._lock = threading.Lock()
+
+        def _request(self):
+            with self._lock:
+                self.requests += 1
+            time.sleep(latency)
+
+        def futures_symbol_ticker(self, symbol: str):
+            self._request()
+            return {'symbol': symbol, 'price': '100.0'}
+
+        def futures_klines(self, symbol: str, interval: str, limit: int = 500):
+            self._request()
+            return []
+
+    names = [f"SYM{i}USDT" for i in range(symbols)]
+    result = {}
+    for label, coalesce in (("direct", False), ("coalesced", True)):
+        raw = SlowClient()
+        flight = SingleFlight()
+        client = ScheduledClient(raw, ApiScheduler(10 ** 9), flight, coalesce=coalesce)
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            barrier.wait()
+            for _ in range(rounds):
+                for name in names:
+                    client.futures_symbol_ticker(symbol=name)
+                    client.futures_klines(symbol=name, interval="15m", limit=100)
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        result[f"{label}_s"] = time.perf_counter() - started
+        result[f"{label}_requests"] = raw.requests
+        if coalesce:
+            stats = flight.stats()
+            result["calls"] = stats["calls"]
+            result["dedup_rate"] = stats["dedup_rate"]
+
+    print_colored(
+        f"{threads}线程 x {symbols}个交易对 x {rounds}轮 - 请求数: 直接 {result['direct_requests']}, "
+        f"合并 {result['coalesced_requests']} (合并比例 {result['dedup_rate']:.1%}); "
+        f"耗时: 直接 {result['direct_s']:.2f}s, 合并 {result['coalesced_s']:.2f}s",
+        Colors.GREEN
+    )
+    return result
+
+
+def benchmark_mock_exchange(symbols: int = 500, latency: float = 0.01, concurrency: int = 64) -> Dict[str, float]:
+    """
+    对本地模拟交易所测量一轮K线增量同步的耗时：逐个同步 vs 异步客户端并发同步
+
+    参数:
+        symbols: 交易对数量
+        latency: 模拟交易所的单次请求延迟（秒）
+        concurrency: 异步客户端的最大并发数
+
+    返回:
+        result: 两种方式的每轮耗时和每秒同步的交易对数
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    print_colored("模拟交易所同步吞吐基准", Colors.BLUE + Colors.BOLD)
+    exchange = MockExchange(symbols=[], symbol_count=symbols, latency=latency, weight_limit=10 ** 9)
+    with MockExchangeServer(exchange) as server, tempfile.TemporaryDirectory() as root:
+        client = SyncMarketClient(server.base_url, max_concurrency=concurrency,
+                                  scheduler=ApiScheduler(10 ** 9, headroom=0.0))
+        store = CandleStore(client, root=root)
+        names = exchange.symbols
+        with contextlib.redirect_stdout(io.StringIO()):
+            # 首次下载（不计时）
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(lambda name: store.sync(name, "1m", min_bars=200), names))
+            serial = _time_call(lambda: [store.sync(name, "1m", min_bars=200) for name in names], 1)
+            concurrent = _time_call(lambda: store.sync_many(names, "1m", min_bars=200, market_client=client), 1)
+        client.close()
+
+    result = {"symbols": symbols, "serial_s": serial, "async_s": concurrent,
+              "serial_symbols_per_s": symbols / serial, "async_symbols_per_s": symbols / concurrent,
+              "requests": exchange.stats()["requests"]}
+    print_colored(
+        f"{symbols}个交易对，延迟 {latency * 1000:.0f}ms - 逐个同步 {serial:.2f}s "
+        f"({result['serial_symbols_per_s']:.0f}个/秒), 并发同步 {concurrent:.2f}s "
+        f"({result['async_symbols_per_s']:.0f}个/秒), 加速 {serial / concurrent:.1f}x",
+        Colors.GREEN
+    )
+    return result
+
+
+def benchmark_mock_cycle(symbols: int = 500, latency: float = 0.01, concurrency: int = 64,
+                         workers: int = 10) -> Dict[str, float]:
+    """
+    对本地模拟交易所测量扫描器多时间框架分析的整轮耗时：并发预取1m K线，
+    再像 CryptoCurrencyScanner.run_scan_round 一样用线程池对每个交易对执行 MultiTimeframeCoordinator.generate_signal
+    （各周期聚合、指标计算和一致性分析）
+
+    首轮包含首次下载全部历史；第二轮清空多时间框架数据缓存后重跑，对应缓存过期后的常规扫描轮次（只增量同步）
+
+    参数:
+        symbols: 交易对数量
+        latency: 模拟交易所的单次请求延迟（秒）
+        concurrency: 行情客户端的最大并发数
+        workers: 分析线程数（与 run_scan_round 相同）
+
+    返回:
+        result: 两轮的预取/分析耗时、每秒分析的交易对数和请求数
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from data_cache import get_data_cache
+    from multi_timeframe_module import MultiTimeframeCoordinator
+
+    print_colored("模拟交易所多时间框架扫描轮次基准", Colors.BLUE + Colors.BOLD)
+    exchange = MockExchange(symbols=[], symbol_count=symbols, latency=latency, weight_limit=10 ** 9)
+    result: Dict[str, float] = {"symbols": symbols}
+    with MockExchangeServer(exchange) as server, tempfile.TemporaryDirectory() as root:
+        client = SyncMarketClient(server.base_url, max_concurrency=concurrency,
+                                  scheduler=ApiScheduler(10 ** 9, headroom=0.0))
+        resampler = TimeframeResampler(CandleStore(client, root=root))
+        names = exchange.symbols
+        with contextlib.redirect_stdout(io.StringIO()):
+            coordinator = MultiTimeframeCoordinator(client, resampler=resampler, market_client=client)
+
+        def analyze(symbol):
+            return coordinator.generate_signal(symbol, 5.0)[0]
+
+        for label in ("cold", "warm"):
+            for tf_name in coordinator.timeframes:
+                get_data_cache().invalidate(f"mtf_{tf_name}")
+            coordinator.coherence_cache.clear()
+            requests_before = exchange.stats()["requests"]
+            with contextlib.redirect_stdout(io.StringIO()):
+                prefetch = _time_call(lambda: coordinator.prefetch(names), 1)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    signals = []
+                    analysis = _time_call(lambda: signals.extend(executor.map(analyze, names)), 1)
+            total = prefetch + analysis
+            result[f"{label}_prefetch_s"] = prefetch
+            result[f"{label}_analysis_s"] = analysis
+            result[f"{label}_symbols_per_s"] = symbols / total
+            result[f"{label}_requests"] = exchange.stats()["requests"] - requests_before
+            print_colored(
+                f"{'首轮' if label == 'cold' else '常规轮次'}: {symbols}个交易对，预取 {prefetch:.2f}s + "
+                f"分析 {analysis:.2f}s = {total:.2f}s ({symbols / total:.1f}个/秒), "
+                f"请求 {result[f'{label}_requests']}次, 信号 {len(signals)}个",
+                Colors.GREEN
+            )
+        client.close()
+    return result
+
+
+def _quiet_compute_symbol_score(symbol: str, payload) -> tuple:
+    """屏蔽评分过程输出的 compute_symbol_score（模块级函数，可以提交到进程池）"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return compute_symbol_score(symbol, payload)
+
+
+def benchmark_analysis_pipeline(pair_counts: Sequence[int] = (12, 50, 200), bars: int = 200,
+                                io_latency: float = 0.05, threads: int = 8,
+                                processes: int = 2) -> List[Dict[str, float]]:
+    """
+    交易循环分析阶段的单轮耗时：逐个交易对串行 vs 并发流水线（线程池I/O + 进程池计算）
+
+    获取K线和生成信号（多时间框架、行情、价格预测）用 io_latency 秒的等待模拟网络请求，
+    指标和质量评分使用真实计算；同时校验两种方式的评分和顺序一致
+
+    参数:
+        pair_counts: 测试的交易对数量
+        bars: 每个交易对的K线数量
+        io_latency: 获取数据和生成信号阶段各自的模拟请求耗时（秒）
+        threads: 流水线线程数
+        processes: 流水线进程数
+
+    返回:
+        results: 每个规模的串行/并发耗时与加速比
+    """
+    results = []
+    print_colored("交易对并发分析基准", Colors.BLUE + Colors.BOLD)
+    frames = {f"SYM{i}USDT": make_synthetic_ohlcv(bars, seed=i) for i in range(max(pair_counts))}
+
+    def fetch(symbol):
+        time.sleep(io_latency)
+        return frames[symbol], 0.0001
+
+    def finalize(symbol, payload, computed):
+        time.sleep(io_latency)
+        return symbol, round(computed[1], 6)
+
+    def serial(symbols):
+        staged = []
+        for symbol in symbols:
+            payload = fetch(symbol)
+            staged.append(finalize(symbol, payload, _quiet_compute_symbol_score(symbol, payload)))
+        return staged
+
+    pipeline = AnalysisPipeline(threads=threads, processes=processes)
+    # 预热：启动子进程并完成导入，交易机器人中进程池是常驻的，启动开销不计入单轮耗时
+    pipeline.run(list(frames)[:processes * 2], fetch, _quiet_compute_symbol_score, finalize)
+
+    for count in pair_counts:
+        symbols = list(frames)[:count]
+        start = time.perf_counter()
+        expected = serial(symbols)
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        staged, errors = pipeline.run(symbols, fetch, _quiet_compute_symbol_score, finalize)
+        pipeline_time = time.perf_counter() - start
+
+        matches = staged == expected and not errors
+        speedup = serial_time / pipeline_time if pipeline_time > 0 else float('inf')
+        results.append({"pairs": count, "serial_s": serial_time, "pipeline_s": pipeline_time,
+                        "speedup": speedup, "matches": matches})
+        print_colored(
+            f"{count:>4}个交易对 - 串行: {serial_time:.2f}s, 并发: {pipeline_time:.2f}s "
+            f"({threads}线程/{processes}进程), 加速: {speedup:.1f}x, 结果一致: {matches}",
+            Colors.GREEN if matches else Colors.RED
+        )
+
+    pipeline.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_supertrend()
+    benchmark_recursions()
+    benchmark_indicator_block()
+    benchmark_trend_columns()
+    benchmark_batch_indicators()
+    benchmark_candle_sync()
+    benchmark_kline_parsing()
+    benchmark_mtf_requests()
+    benchmark_candle_archive()
+    benchmark_api_scheduler()
+    benchmark_single_flight()
+    benchmark_mock_exchange()
+    benchmark_mock_cycle()
+    benchmark_analysis_pipeline()
@@ -0,0 +1,339 @@
+"""
+K线压缩归档模块
+长周期历史K线的紧凑磁盘格式：按固定行数分块，每块内时间与价格转换为定点整数后做差分编码，再用zlib压缩；
+块索引记录每块的起止时间，按时间范围读取时只解压需要的块和字段。尚未凑满一块的最新数据（热数据）以原始列式文件保存，
+读取时直接内存映射，不需要解压
+
+归档由 backfill_tool --archive 写入：回填并入本地K线存储后，通过 CandleArchive.import_store 追加新的已收盘K线
+
+目录结构: {根目录}/{交易对}_{时间框架}/
+    index.bin       块索引（INDEX_DTYPE 定长记录）
+    data.bin        压缩块数据，按索引中的偏移读取
+    hot.bin         未压缩的最新数据，按 ARCHIVE_FIELDS 顺序依次存放各字段的整列，每次整体替换
+"""
+
+import os
+import threading
+import zlib
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import CONFIG
+
+# 归档字段与类型
+ARCHIVE_FIELDS: List[Tuple[str, str]] = [
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+]
+_FIELD_NAMES = [name for name, _ in ARCHIVE_FIELDS]
+_HOT_ROW_BYTES = sum(np.dtype(dtype).itemsize for _, dtype in ARCHIVE_FIELDS)
+
+# 块索引: 起止开盘时间、行数，以及每个字段的数据偏移/长度、差分基准值、小数位数（-1表示按原始float64保存）和整数字节宽度
+INDEX_DTYPE = np.dtype([
+    ('start', '<i8'),
+    ('end', '<i8'),
+    ('rows', '<i8'),
+    ('offset', '<i8', (len(ARCHIVE_FIELDS),)),
+    ('nbytes', '<i8', (len(ARCHIVE_FIELDS),)),
+    ('base', '<i8', (len(ARCHIVE_FIELDS),)),
+    ('decimals', '<i1', (len(ARCHIVE_FIELDS),)),
+    ('width', '<i1', (len(ARCHIVE_FIELDS),)),
+])
+
+_MAX_DECIMALS = 8
+_MAX_EXACT_INT = 2 ** 53
+
+
+def _find_decimals(values: np.ndarray) -> int:
+    """能无损表示全部数值的最少小数位数，无法用定点整数表示时返回-1"""
+    for decimals in range(_MAX_DECIMALS + 1):
+        scale = 10.0 ** decimals
+        scaled = np.round(values * scale)
+        if not np.all(np.abs(scaled) < _MAX_EXACT_INT):
+            return -1
+        if np.array_equal(scaled / scale, values):
+            return decimals
+    return -1
+
+
+def _int_width(values: np.ndarray) -> int:
+    """能容纳全部整数的最小字节宽度"""
+    low, high = int(values.min()), int(values.max())
+    for width in (1, 2, 4):
+        limit = 2 ** (8 * width - 1)
+        if -limit <= low and high < limit:
+            return width
+    return 8
+
+
+def _encode_field(values: np.ndarray, dtype: str, level: int) -> Tuple[bytes, int, int, int]:
+    """
+    编码一个字段: 定点整数 -> 相对首个值的差分 -> 最小整数宽度 -> zlib
+
+    返回:
+        (压缩数据, 差分基准值, 小数位数, 整数字节宽度)
+    """
+    if np.dtype(dtype).kind == 'i':
+        ints, decimals = values.astype(np.int64), 0
+    else:
+        decimals = _find_decimals(values)
+        if decimals < 0:
+            return zlib.compress(np.ascontiguousarray(values, dtype='<f8').tobytes(), level), 0, -1, 8
+        ints = np.round(values * 10.0 ** decimals).astype(np.int64)
+    deltas = np.diff(ints, prepend=ints[:1])
+    width = _int_width(deltas)
+    return zlib.compress(deltas.astype(f'<i{width}').tobytes(), level), int(ints[0]), decimals, width
+
+
+def _decode_field(blob: bytes, base: int, decimals: int, width: int, dtype: str) -> np.ndarray:
+    """_encode_field 的逆过程"""
+    raw = zlib.decompress(blob)
+    if decimals < 0:
+        return np.frombuffer(raw, dtype='<f8')
+    ints = np.cumsum(np.frombuffer(raw, dtype=f'<i{width}'), dtype=np.int64) + base
+    if np.dtype(dtype).kind == 'i':
+        return ints
+    return ints / 10.0 ** decimals
+
+
+class CandleArchive:
+    """
+    分块压缩的K线归档，每个 (交易对, 时间框架) 一个目录
+
+    只支持按时间顺序追加；读取返回的数组可能是只读的内存映射视图或解压缓冲区，需要修改时请自行复制
+    """
+
+    def __init__(self, root: Optional[str] = None, chunk_rows: Optional[int] = None, level: int = 6):
+        """
+        参数:
+            root: 归档根目录，默认取 CONFIG["CANDLE_ARCHIVE_DIR"]
+            chunk_rows: 每个压缩块的行数，默认取 CONFIG["CANDLE_ARCHIVE_CHUNK_ROWS"]
+            level: zlib压缩级别
+        """
+        self.root = root or CONFIG.get("CANDLE_ARCHIVE_DIR", "data/archive")
+        self.chunk_rows = chunk_rows or CONFIG.get("CANDLE_ARCHIVE_CHUNK_ROWS", 8192)
+        self.level = level
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._states: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    # ------------------------------------------------------------------ 存储
+
+    def _lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _dir(self, key: Tuple[str, str]) -> str:
+        return os.path.join(self.root, f"{key[0]}_{key[1]}")
+
+    def _path(self, key: Tuple[str, str], name: str) -> str:
+        return os.path.join(self._dir(key), name)
+
+    def _load(self, key: Tuple[str, str]) -> Dict[str, Any]:
+        """读取块索引并内存映射热数据，丢弃不完整的索引记录和已经压缩进块的热数据"""
+        state = self._states.get(key)
+        if state is not None:
+            return state
+
+        index_path = self._path(key, "index.bin")
+        index = np.empty(0, dtype=INDEX_DTYPE)
+        if os.path.exists(index_path):
+            count = os.path.getsize(index_path) // INDEX_DTYPE.itemsize
+            if os.path.getsize(index_path) != count * INDEX_DTYPE.itemsize:
+                os.truncate(index_path, count * INDEX_DTYPE.itemsize)
+            index = np.fromfile(index_path, dtype=INDEX_DTYPE, count=count)
+
+        hot = {}
+        hot_path = self._path(key, "hot.bin")
+        length = os.path.getsize(hot_path) // _HOT_ROW_BYTES if os.path.exists(hot_path) else 0
+        offset = 0
+        for name, dtype in ARCHIVE_FIELDS:
+            hot[name] = np.memmap(hot_path, dtype=dtype, mode='r', offset=offset, shape=(length,)) \
+                if length else np.empty(0, dtype)
+            offset += length * np.dtype(dtype).itemsize
+
+        # 压缩块写入索引后、热数据重写前中断时，热数据开头会与最后一块重复
+        if len(index) and length:
+            skip = int(np.searchsorted(hot['time'], index['end'][-1], side='right'))
+            hot = {name: values[skip:] for name, values in hot.items()}
+
+        state = {"index": index, "hot": hot}
+        self._states[key] = state
+        return state
+
+    def _write_chunk(self, key: Tuple[str, str], columns: Mapping[str, np.ndarray]) -> None:
+        """压缩一块数据，先追加块数据再追加索引记录"""
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record['start'] = columns['time'][0]
+        record['end'] = columns['time'][-1]
+        record['rows'] = len(columns['time'])
+        with open(self._path(key, "data.bin"), 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            for j, (name, dtype) in enumerate(ARCHIVE_FIELDS):
+                blob, base, decimals, width = _encode_field(np.asarray(columns[name]), dtype, self.level)
+                record['offset'][0, j] = f.tell()
+                record['nbytes'][0, j] = len(blob)
+                record['base'][0, j] = base
+                record['decimals'][0, j] = decimals
+                record['width'][0, j] = width
+                f.write(blob)
+        with open(self._path(key, "index.bin"), 'ab') as f:
+            f.write(record.tobytes())
+
+    def _write_hot(self, key: Tuple[str, str], columns: Mapping[str, np.ndarray]) -> None:
+        """
+        重写热数据；所有字段写入同一个新文件后一次替换，中断时各字段不会错位，
+        已返回给调用方的内存映射视图仍指向旧文件，不会失效
+        """
+        path = self._path(key, "hot.bin")
+        with open(path + ".tmp", 'wb') as f:
+            for name, dtype in ARCHIVE_FIELDS:
+                f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        os.replace(path + ".tmp", path)
+
+    def append(self, symbol: str, interval: str, columns: Mapping[str, Any]) -> int:
+        """
+        追加K线，只写入比已归档最后一根更新的部分，热数据凑满一块时压缩
+
+        参数:
+            symbol: 交易对
+            interval: K线周期
+            columns: 包含 ARCHIVE_FIELDS 字段、按时间升序的数组字典（例如 CandleStore.get_arrays 的结果）
+
+        返回:
+            new_bars: 新写入的K线数量
+        """
+        key = (symbol, interval)
+        with self._lock(key):
+            state = self._load(key)
+            index, hot = state["index"], state["hot"]
+            if len(hot['time']):
+                last = int(hot['time'][-1])
+            elif len(index):
+                last = int(index['end'][-1])
+            else:
+                last = None
+            times = np.asarray(columns['time'], dtype=np.int64)
+            newer = times > last if last is not None else np.ones(len(times), dtype=bool)
+            added = int(newer.sum())
+            if added == 0:
+                return 0
+
+            os.makedirs(self._dir(key), exist_ok=True)
+            merged = {name: np.concatenate((hot[name], np.asarray(columns[name], dtype=dtype)[newer]))
+                      for name, dtype in ARCHIVE_FIELDS}
+            self._states.pop(key, None)
+            state = index = hot = None
+
+            position = 0
+            while len(merged['time']) - position >= self.chunk_rows:
+                self._write_chunk(key, {name: values[position:position + self.chunk_rows]
+                                        for name, values in merged.items()})
+                position += self.chunk_rows
+            self._write_hot(key, {name: values[position:] for name, values in merged.items()})
+            return added
+
+    def import_store(self, store, symbol: str, interval: str) -> int:
+        """把本地K线存储（candle_store）中比归档更新的已收盘K线追加到归档"""
+        count = store.stored_count(symbol, interval)
+        if count == 0:
+            return 0
+        return self.append(symbol, interval,
+                           store.get_arrays(symbol, interval, limit=count, include_open=False, sync=False))
+
+    # ------------------------------------------------------------------ 读取
+
+    def read(self, symbol: str, interval: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+             fields: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        按开盘时间范围读取K线，只解压与范围重叠的块和请求的字段
+
+        参数:
+            symbol: 交易对
+            interval: K线周期
+            start_ms: 起始开盘时间（毫秒，含），None表示从头开始
+            end_ms: 结束开盘时间（毫秒，含），None表示到最新
+            fields: 需要的字段，默认全部；time总是包含在结果中
+
+        返回:
+            columns: {字段: 数组}
+        """
+        wanted = [name for name in _FIELD_NAMES if fields is None or name in fields or name == 'time']
+        positions = {name: _FIELD_NAMES.index(name) for name in wanted}
+        dtypes = dict(ARCHIVE_FIELDS)
+        key = (symbol, interval)
+        parts = []
+        with self._lock(key):
+            state = self._load(key)
+            index, hot = state["index"], state["hot"]
+
+            first = 0 if start_ms is None else int(np.searchsorted(index['end'], start_ms, side='left'))
+            last = len(index) if end_ms is None else int(np.searchsorted(index['start'], end_ms, side='right'))
+            if last > first:
+                with open(self._path(key, "data.bin"), 'rb') as f:
+                    for record in index[first:last]:
+                        chunk = {}
+                        for name, j in positions.items():
+                            f.seek(int(record['offset'][j]))
+                            chunk[name] = _decode_field(f.read(int(record['nbytes'][j])), int(record['base'][j]),
+                                                        int(record['decimals'][j]), int(record['width'][j]),
+                                                        dtypes[name])
+                        parts.append(chunk)
+
+            if len(hot['time']):
+                parts.append({name: hot[name] for name in wanted})
+
+        selected = []
+        for chunk in parts:
+            times = chunk['time']
+            lo = 0 if start_ms is None else int(np.searchsorted(times, start_ms, side='left'))
+            hi = len(times) if end_ms is None else int(np.searchsorted(times, end_ms, side='right'))
+            if hi > lo:
+                selected.append({name: values[lo:hi] for name, values in chunk.items()})
+
+        if not selected:
+            return {name: np.empty(0, dtype=dtypes[name]) for name in wanted}
+        if len(selected) == 1:
+            return selected[0]
+        return {name: np.concatenate([chunk[name] for chunk in selected]) for name in wanted}
+
+    def read_frame(self, symbol: str, interval: str, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                   fields: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """按时间范围读取K线DataFrame（time为datetime），参数同read"""
+        columns = self.read(symbol, interval, start_ms, end_ms, fields)
+        df = pd.DataFrame({name: np.asarray(values) for name, values in columns.items()})
+        df['time'] = pd.to_datetime(df['time'], unit='ms')
+        return df
+
+    def info(self, symbol: str, interval: str) -> Dict[str, int]:
+        """归档的K线数量、块数和磁盘占用（字节）"""
+        key = (symbol, interval)
+        with self._lock(key):
+            state = self._load(key)
+            rows = int(state["index"]['rows'].sum()) + len(state["hot"]['time'])
+            chunks = len(state["index"])
+        directory = self._dir(key)
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) \
+            if os.path.isdir(directory) else 0
+        return {"rows": rows, "chunks": chunks, "bytes": size}
+
+
+_archive: Optional[CandleArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_candle_archive() -> CandleArchive:
+    """获取进程内共享的K线归档"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = CandleArchive()
+        return _archive
@@ -0,0 +1,172 @@
+"""
+K线环形缓冲区模块
+为每个 (交易对, 时间框架) 预分配固定容量的 float64 OHLCV 与 int64 开盘时间数组，
+追加/更新最后一根K线都是原地写入，长时间运行内存保持不变
+
+每个槽位同时写入 i 和 i + 容量 两处（双倍长度存储），任意最近N根K线在内存中总是连续的，
+window()/prices() 返回的都是零拷贝视图，可直接交给指标函数使用
+"""
+
+import threading
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import CONFIG
+
+# 缓冲区保存的价格字段，顺序与 batch_indicators.OHLCV_FIELDS 一致
+RING_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class CandleRingBuffer:
+    """
+    固定容量的K线环形缓冲区
+
+    视图与缓冲区共享内存：之后的追加会改写视图下的数据，需要跨追加保存时请自行复制；
+    多个线程共享同一个缓冲区时使用 to_frame，它在锁内复制数据
+    """
+
+    def __init__(self, capacity: int = 1000):
+        if capacity <= 0:
+            raise ValueError("缓冲区容量必须为正数")
+        self.capacity = capacity
+        self._times = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.zeros((len(RING_FIELDS), 2 * capacity), dtype=np.float64)
+        self._count = 0  # 累计写入的K线数量（只增不减）
+        self._lock = threading.RLock()  # 缓冲区在线程间共享（扫描、分析和持仓监控线程），读写都在锁内进行
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    @property
+    def last_time(self) -> Optional[int]:
+        """最后一根K线的开盘时间（毫秒），缓冲区为空时为None"""
+        with self._lock:
+            if self._count == 0:
+                return None
+            return int(self._times[(self._count - 1) % self.capacity])
+
+    def _write(self, slot: int, open_time: int, values: Tuple[float, ...]) -> None:
+        self._times[slot] = self._times[slot + self.capacity] = open_time
+        self._values[:, slot] = self._values[:, slot + self.capacity] = values
+
+    def append(self, open_time: int, open_: float, high: float, low: float, close: float, volume: float) -> bool:
+        """
+        追加一根K线；开盘时间与最后一根相同时改为更新最后一根，早于最后一根时忽略
+
+        返回:
+            added: 是否新增了一根K线
+        """
+        with self._lock:
+            open_time = int(open_time)
+            last = self.last_time
+            if last is not None and open_time <= last:
+                if open_time == last:
+                    self.update_last(open_, high, low, close, volume)
+                return False
+            self._write(self._count % self.capacity, open_time, (open_, high, low, close, volume))
+            self._count += 1
+            return True
+
+    def update_last(self, open_: float, high: float, low: float, close: float, volume: float) -> None:
+        """原地更新最后一根（未收盘）K线"""
+        with self._lock:
+            if self._count == 0:
+                raise IndexError("缓冲区为空，无法更新最后一根K线")
+            slot = (self._count - 1) % self.capacity
+            self._write(slot, self._times[slot], (open_, high, low, close, volume))
+
+    def extend(self, columns: Mapping[str, Any]) -> int:
+        """
+        批量合并K线数组（例如 CandleStore.get_arrays 的结果），只写入比最后一根更新的K线，
+        与最后一根开盘时间相同的K线用于更新最后一根
+
+        参数:
+            columns: 含 time（毫秒）和 open/high/low/close/volume 的数组字典
+
+        返回:
+            added: 新增的K线数量
+        """
+        with self._lock:
+            times = np.asarray(columns['time'], dtype=np.int64)
+            values = np.vstack([np.asarray(columns[field], dtype=np.float64) for field in RING_FIELDS])
+            last = self.last_time
+            if last is not None:
+                same = np.flatnonzero(times == last)
+                if len(same):
+                    self.update_last(*values[:, same[-1]])
+                newer = times > last
+                times, values = times[newer], values[:, newer]
+            if len(times) == 0:
+                return 0
+
+            # 超过容量的部分只保留最新的capacity根
+            added = len(times)
+            if added > self.capacity:
+                skip = added - self.capacity
+                times, values = times[skip:], values[:, skip:]
+                self._count += skip
+            slots = (self._count + np.arange(len(times))) % self.capacity
+            self._times[slots] = self._times[slots + self.capacity] = times
+            self._values[:, slots] = values
+            self._values[:, slots + self.capacity] = values
+            self._count += len(times)
+            return added
+
+    def _bounds(self, n: Optional[int]) -> Tuple[int, int]:
+        """最近n根K线在双倍存储中的连续区间 [start, end)"""
+        size = len(self)
+        n = size if n is None else max(min(n, size), 0)
+        end = (self._count - 1) % self.capacity + 1 + self.capacity if self._count else 0
+        return end - n, end
+
+    def window(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        最近n根K线的零拷贝只读视图
+
+        参数:
+            n: K线数量，None表示全部
+
+        返回:
+            columns: {'time': int64毫秒, 'open'/'high'/'low'/'close'/'volume': float64}
+        """
+        with self._lock:
+            start, end = self._bounds(n)
+            columns = {'time': self._times[start:end]}
+            for i, field in enumerate(RING_FIELDS):
+                columns[field] = self._values[i, start:end]
+            for view in columns.values():
+                view.flags.writeable = False
+            return columns
+
+    def prices(self, n: Optional[int] = None) -> np.ndarray:
+        """最近n根K线的 (n, 5) OHLCV 零拷贝视图，可用 prices[None] 交给 batch_indicators"""
+        with self._lock:
+            start, end = self._bounds(n)
+            view = self._values[:, start:end].T
+            view.flags.writeable = False
+            return view
+
+    def to_frame(self, n: Optional[int] = None) -> pd.DataFrame:
+        """最近n根K线的DataFrame（time为datetime），供需要DataFrame的指标函数使用"""
+        with self._lock:
+            columns = self.window(n)
+            df = pd.DataFrame({field: np.array(values) for field, values in columns.items()})
+        df['time'] = pd.to_datetime(df['time'], unit='ms')
+        return df
+
+
+_buffers: Dict[Tuple[str, str], CandleRingBuffer] = {}
+_buffers_lock = threading.Lock()
+
+
+def get_candle_buffer(symbol: str, interval: str, capacity: Optional[int] = None) -> CandleRingBuffer:
+    """获取（不存在时创建）进程内共享的 (交易对, 时间框架) K线缓冲区"""
+    key = (symbol, interval)
+    with _buffers_lock:
+        buffer = _buffers.get(key)
+        if buffer is None:
+            buffer = CandleRingBuffer(capacity or CONFIG.get("CANDLE_BUFFER_CAPACITY", 1000))
+            _buffers[key] = buffer
+        return buffer
@@ -0,0 +1,551 @@
+"""
+本地K线存储模块
+按 (交易对, 时间框架) 把已收盘的K线以列式二进制文件持久化到磁盘，读取时用内存映射直接返回数组视图，
+同步时只请求最后一根已存K线之后的新K线，重启后不需要重新下载历史数据
+
+目录结构: {根目录}/{交易对}_{时间框架}/{字段}.bin，每个字段一个定长记录文件，
+各文件长度不一致时（例如写入中途退出）按最短的文件截断
+
+重写文件时先写入临时文件再替换，已返回给调用方的内存映射视图仍指向旧文件，不会被改写；
+缓存的内存映射在每次使用前按文件状态校验，其他实例写入后会重新打开
+
+每个内存映射占用一个文件描述符（每个交易对/周期11个），只缓存最近使用的 max_open_keys 个交易对/周期的映射；
+被淘汰的映射在调用方持有的视图全部释放后由垃圾回收关闭（不主动关闭，避免已返回的视图指向已解除的映射）
+
+多个进程可以共用同一个根目录（例如运行中的机器人和 backfill_tool）：每个目录有一个锁文件，
+写入持有排他锁、读取持有共享锁；重写（合并、重建、删除）后递增目录下的 generation 文件，其他进程据此重新打开。
+在其他进程运行时重写文件依赖替换正在被映射的文件，只支持POSIX系统；Windows上替换会因文件被映射而失败
+（PermissionError），需要先停止机器人或使用单独的存储目录
+"""
+
+import contextlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import CONFIG
+from kline_parser import parse_klines_arrays
+from logger_utils import Colors, print_colored
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# K线字段与存储类型，顺序与 futures_klines 返回的列表一致（不含最后的ignore字段）
+KLINE_FIELDS: List[Tuple[str, str]] = [
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('close_time', '<i8'),
+    ('quote_asset_volume', '<f8'),
+    ('trades', '<i8'),
+    ('taker_base_vol', '<f8'),
+    ('taker_quote_vol', '<f8'),
+]
+
+LOCK_FILE = ".lock"
+GENERATION_FILE = "generation"
+
+_INTERVAL_UNITS_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+def interval_to_ms(interval: str) -> int:
+    """把 '1m'/'15m'/'4h'/'1d' 等K线周期转换为毫秒"""
+    unit = interval[-1]
+    if unit not in _INTERVAL_UNITS_MS or not interval[:-1].isdigit():
+        raise ValueError(f"不支持的K线周期: {interval}")
+    return int(interval[:-1]) * _INTERVAL_UNITS_MS[unit]
+
+
+def klines_to_columns(klines: List[List[Any]]) -> Dict[str, np.ndarray]:
+    """把 futures_klines 的原始列表转换为按字段的数组（除ignore外的全部字段）"""
+    return parse_klines_arrays(klines, [name for name, _ in KLINE_FIELDS])
+
+
+class CandleStore:
+    """
+    列式K线存储，每个 (交易对, 时间框架) 一个目录
+
+    只持久化已收盘的K线；最近一次同步拿到的未收盘K线保存在内存中，读取时可选择附加在末尾
+    """
+
+    def __init__(self, client=None, root: Optional[str] = None, max_fetch: int = 1500,
+                 max_gap_bars: int = 15000, max_open_keys: Optional[int] = None):
+        """
+        参数:
+            client: Binance客户端，用于同步
+            root: 存储根目录，默认取 CONFIG["CANDLE_STORE_DIR"]
+            max_fetch: 单次请求的最大K线数量
+            max_gap_bars: 本地数据落后超过该根数时不再补齐缺口，直接以最新数据重建
+            max_open_keys: 缓存内存映射的交易对/周期数量上限，默认取 CONFIG["CANDLE_STORE_MAX_OPEN"]
+        """
+        self.client = client
+        self.root = root or CONFIG.get("CANDLE_STORE_DIR", "data/candles")
+        self.max_fetch = max_fetch
+        self.max_gap_bars = max_gap_bars
+        self.max_open_keys = max(1, max_open_keys or CONFIG.get("CANDLE_STORE_MAX_OPEN", 32))
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # 键 -> (文件状态, 内存映射)，按最近使用排序；不同键的读写在各自的键锁内进行，映射表本身由 _maps_guard 保护
+        self._maps: "OrderedDict[Tuple[str, str], Tuple[Tuple, Dict[str, np.ndarray]]]" = OrderedDict()
+        self._maps_guard = threading.Lock()
+        self._open_candles: Dict[Tuple[str, str], Dict[str, np.ndarray]] = {}
+        self._history_exhausted = set()
+        # 统计: 请求次数、下载的K线数量
+        self.requests = 0
+        self.downloaded_bars = 0
+
+    # ------------------------------------------------------------------ 存储
+
+    def _lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _dir(self, key: Tuple[str, str]) -> str:
+        return os.path.join(self.root, f"{key[0]}_{key[1]}")
+
+    def _path(self, key: Tuple[str, str], field: str) -> str:
+        return os.path.join(self._dir(key), f"{field}.bin")
+
+    @contextlib.contextmanager
+    def _dir_lock(self, key: Tuple[str, str], shared: bool = False):
+        """
+        跨进程的目录锁，与线程锁配合使用（先取线程锁）
+
+        参数:
+            key: (交易对, 时间框架)
+            shared: 只读访问时使用共享锁；目录还不存在时不加锁（没有可读的数据）
+        """
+        directory = self._dir(key)
+        if shared and not os.path.isdir(directory):
+            yield
+            return
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, LOCK_FILE), 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # 只有排他锁，等待超时后抛出OSError
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _generation(self, key: Tuple[str, str]) -> int:
+        """目录的重写代数，每次重写文件后递增"""
+        try:
+            with open(os.path.join(self._dir(key), GENERATION_FILE)) as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _bump_generation(self, key: Tuple[str, str]) -> None:
+        path = os.path.join(self._dir(key), GENERATION_FILE)
+        with open(path + ".tmp", 'w') as f:
+            f.write(str(self._generation(key) + 1))
+        os.replace(path + ".tmp", path)
+
+    def _file_state(self, key: Tuple[str, str]) -> Tuple:
+        """重写代数和各字段文件的 (inode, 大小, 修改时间)，用于判断缓存的内存映射是否仍对应磁盘上的数据"""
+        state = [self._generation(key)]
+        for name, _ in KLINE_FIELDS:
+            try:
+                stat = os.stat(self._path(key, name))
+                state.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                state.append(None)
+        return tuple(state)
+
+    def _sizes(self, state: Tuple) -> Dict[str, int]:
+        return {name: file_state[1] // np.dtype(dtype).itemsize if file_state is not None else 0
+                for (name, dtype), file_state in zip(KLINE_FIELDS, state[1:])}
+
+    @staticmethod
+    def _replace_file(path: str, values: np.ndarray, dtype: str) -> None:
+        """写入临时文件后替换，不改动旧文件（其他线程或实例持有的内存映射仍然有效）"""
+        with open(path + ".tmp", 'wb') as f:
+            f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        os.replace(path + ".tmp", path)
+
+    def _load(self, key: Tuple[str, str], repair: bool = True) -> Dict[str, np.ndarray]:
+        """
+        打开（或返回仍然有效的已缓存）各字段内存映射，需要在线程锁和目录锁内调用
+
+        参数:
+            key: (交易对, 时间框架)
+            repair: 是否把各字段文件截断到相同长度（需要排他的目录锁）；只读时只映射共同长度
+        """
+        state = self._file_state(key)
+        with self._maps_guard:
+            cached = self._maps.get(key)
+            if cached is not None and cached[0] == state:
+                self._maps.move_to_end(key)
+                return cached[1]
+
+        sizes = self._sizes(state)
+        length = min(sizes.values())
+
+        maps = {}
+        for name, dtype in KLINE_FIELDS:
+            path = self._path(key, name)
+            if repair and sizes[name] != length:
+                self._replace_file(path, np.fromfile(path, dtype=dtype, count=length), dtype)
+            if length > 0:
+                maps[name] = np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+            else:
+                maps[name] = np.empty(0, dtype=dtype)
+        if repair or len(set(sizes.values())) == 1:
+            # 未修复的不一致文件不缓存，之后的写入会重新打开并修复
+            self._cache_maps(key, self._file_state(key), maps)
+        return maps
+
+    def _cache_maps(self, key: Tuple[str, str], state: Tuple, maps: Dict[str, np.ndarray]) -> None:
+        """缓存内存映射，超过上限时淘汰最久未使用的（只释放引用，文件描述符随映射被回收而关闭）"""
+        with self._maps_guard:
+            self._maps[key] = (state, maps)
+            self._maps.move_to_end(key)
+            while len(self._maps) > self.max_open_keys:
+                self._maps.popitem(last=False)
+
+    def _drop_maps(self, key: Tuple[str, str]) -> None:
+        with self._maps_guard:
+            self._maps.pop(key, None)
+
+    def _write(self, key: Tuple[str, str], columns: Dict[str, np.ndarray], mode: str) -> None:
+        """
+        追加（'ab'）或重写（'wb'）各字段文件
+
+        追加只在文件末尾写入，已有的内存映射视图不受影响；重写先写临时文件再替换，不截断正在被映射的文件。
+        需要在排他的目录锁内调用
+        """
+        self._drop_maps(key)
+        os.makedirs(self._dir(key), exist_ok=True)
+        for name, dtype in KLINE_FIELDS:
+            path = self._path(key, name)
+            if mode == 'wb':
+                self._replace_file(path, columns[name], dtype)
+            else:
+                with open(path, mode) as f:
+                    f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+        if mode == 'wb':
+            self._bump_generation(key)
+
+    def remove(self, symbol: str, interval: str) -> None:
+        """删除 (交易对, 时间框架) 的本地数据"""
+        key = (symbol, interval)
+        with self._lock(key), self._dir_lock(key):
+            self._drop_maps(key)
+            self._open_candles.pop(key, None)
+            self._history_exhausted.discard(key)
+            for name, _ in KLINE_FIELDS:
+                path = self._path(key, name)
+                if os.path.exists(path):
+                    os.remove(path)
+            self._bump_generation(key)
+
+    def stored_count(self, symbol: str, interval: str) -> int:
+        """本地已存的收盘K线数量"""
+        key = (symbol, interval)
+        with self._lock(key), self._dir_lock(key, shared=True):
+            return len(self._load(key, repair=False)['time'])
+
+    # ------------------------------------------------------------------ 同步
+
+    def _fetch(self, symbol: str, interval: str, **params) -> List[List[Any]]:
+        klines = self.client.futures_klines(symbol=symbol, interval=interval, **params)
+        self.requests += 1
+        self.downloaded_bars += len(klines or [])
+        return klines or []
+
+    def _split_closed(self, key: Tuple[str, str], klines: List[List[Any]],
+                      now_ms: int) -> Dict[str, np.ndarray]:
+        """拆出已收盘的K线，未收盘的最后一根记入内存"""
+        columns = klines_to_columns(klines)
+        closed = columns['close_time'] < now_ms
+        if len(closed) and not closed[-1]:
+            self._open_candles[key] = {name: values[-1:] for name, values in columns.items()}
+        return {name: values[closed] for name, values in columns.items()}
+
+    def sync(self, symbol: str, interval: str, min_bars: int = 200) -> int:
+        """
+        把本地数据同步到最新，只请求最后一根已存K线之后的K线
+
+        参数:
+            symbol: 交易对
+            interval: K线周期
+            min_bars: 本地至少需要的K线数量，不足时向前补齐历史
+
+        返回:
+            new_bars: 新写入的收盘K线数量
+        """
+        key = (symbol, interval)
+        step = interval_to_ms(interval)
+        # 读取-下载-写入期间持有排他的目录锁，避免其他进程在此期间重写文件后重复追加
+        with self._lock(key), self._dir_lock(key):
+            now_ms = int(time.time() * 1000)
+            maps = self._load(key)
+            count = len(maps['time'])
+            new_bars = 0
+
+            if count and (now_ms - int(maps['time'][-1])) // step > self.max_gap_bars:
+                print_colored(f"⚠️ {symbol} {interval} 本地K线落后过多，重建本地数据", Colors.WARNING)
+                count = 0
+
+            if count == 0:
+                maps = None  # 重写文件前释放内存映射
+                self._history_exhausted.discard(key)
+                # 本地没有数据：下载最新一段，多取一根补偿未收盘K线
+                klines = self._fetch(symbol, interval, limit=min(min_bars + 1, self.max_fetch))
+                closed = self._split_closed(key, klines, now_ms)
+                self._write(key, closed, 'wb')
+                new_bars = len(closed['time'])
+            else:
+                # 增量同步：从最后一根已存K线的下一根开始
+                start = int(maps['time'][-1]) + step
+                while True:
+                    # 请求权重按limit计算，只请求预计需要的数量（稳态下只有1~2根）
+                    expected = max((now_ms - start) // step + 2, 1)
+                    limit = int(min(expected, self.max_fetch))
+                    klines = self._fetch(symbol, interval, startTime=start, limit=limit)
+                    if not klines:
+                        break
+                    closed = self._split_closed(key, klines, now_ms)
+                    if len(closed['time']):
+                        self._write(key, closed, 'ab')
+                        new_bars += len(closed['time'])
+                    # 已经拿到未收盘K线或返回不满，说明已同步到最新
+                    if len(klines) < limit or int(klines[-1][6]) >= now_ms:
+                        break
+                    start = int(klines[-1][0]) + step
+
+            # 本地历史不足时向前补齐
+            maps = self._load(key)
+            missing = min_bars - len(maps['time'])
+            while missing > 0 and len(maps['time']) and key not in self._history_exhausted:
+                request_limit = min(missing, self.max_fetch)
+                klines = self._fetch(symbol, interval, endTime=int(maps['time'][0]) - 1, limit=request_limit)
+                if len(klines) < request_limit:
+                    # 已经到达该交易对最早的K线，之后不再向前请求
+                    self._history_exhausted.add(key)
+                if not klines:
+                    break
+                older = klines_to_columns(klines)
+                merged = {name: np.concatenate((older[name], np.asarray(maps[name]))) for name, _ in KLINE_FIELDS}
+                maps = None  # 重写文件前释放内存映射
+                self._write(key, merged, 'wb')
+                maps = self._load(key)
+                new_bars += len(older['time'])
+                missing -= len(older['time'])
+
+            return new_bars
+
+    def sync_many(self, symbols: Sequence[str], interval: str, min_bars: int = 200,
+                  market_client=None) -> Dict[str, int]:
+        """
+        批量增量同步多个交易对
+
+        本地已有足够数据、只差一页增量的交易对，通过行情客户端的 klines_many 在一个事件循环中并发请求；
+        首次下载、需要补齐历史、缺口超过一页或并发请求失败的交易对逐个走 sync
+
+        参数:
+            symbols: 交易对列表
+            interval: K线周期
+            min_bars: 本地至少需要的K线数量
+            market_client: 提供 klines_many 的行情客户端（async_client.SyncMarketClient），默认使用共享实例
+
+        返回:
+            {交易对: 新写入的收盘K线数量}
+        """
+        if market_client is None:
+            from async_client import get_market_client
+            market_client = get_market_client()
+        step = interval_to_ms(interval)
+        now_ms = int(time.time() * 1000)
+        pending: Dict[str, Dict[str, Any]] = {}
+        sequential: List[str] = []
+
+        for symbol in symbols:
+            key = (symbol, interval)
+            with self._lock(key), self._dir_lock(key, shared=True):
+                maps = self._load(key, repair=False)
+                count = len(maps['time'])
+                if count == 0 or (count < min_bars and key not in self._history_exhausted):
+                    sequential.append(symbol)
+                    continue
+                start = int(maps['time'][-1]) + step
+                expected = max((now_ms - start) // step + 2, 1)
+                if expected > self.max_fetch:
+                    sequential.append(symbol)
+                    continue
+                pending[symbol] = {"symbol": symbol, "interval": interval, "startTime": start, "limit": int(expected)}
+
+        results = market_client.klines_many(list(pending.values()))
+        new_bars: Dict[str, int] = {}
+        for (symbol, params), klines in zip(pending.items(), results):
+            if isinstance(klines, Exception):
+                print_colored(f"⚠️ {symbol} {interval} 并发同步失败，改为单独同步: {klines}", Colors.WARNING)
+                sequential.append(symbol)
+                continue
+            key = (symbol, interval)
+            with self._lock(key), self._dir_lock(key):
+                self.requests += 1
+                self.downloaded_bars += len(klines)
+                if not klines:
+                    new_bars[symbol] = 0
+                    continue
+                closed = self._split_closed(key, klines, now_ms)
+                maps = self._load(key)
+                # 等待期间其他线程可能已经同步过，只写入更新的部分
+                newer = closed['time'] > int(maps['time'][-1])
+                maps = None  # 写入前释放内存映射
+                if newer.any():
+                    self._write(key, {name: values[newer] for name, values in closed.items()}, 'ab')
+                new_bars[symbol] = int(newer.sum())
+            if len(klines) >= params["limit"] and int(klines[-1][6]) < now_ms:
+                sequential.append(symbol)  # 一页没有同步到最新，剩余部分翻页同步
+
+        for symbol in sequential:
+            try:
+                new_bars[symbol] = new_bars.get(symbol, 0) + self.sync(symbol, interval, min_bars)
+            except Exception as e:
+                print_colored(f"❌ {symbol} {interval} 同步失败: {e}", Colors.ERROR)
+        return new_bars
+
+    def append_closed(self, symbol: str, interval: str, columns: Dict[str, np.ndarray]) -> int:
+        """
+        追加由其他来源（例如由1m K线重采样）得到的已收盘K线，只写入比最后一根已存K线更新的部分
+
+        参数:
+            symbol: 交易对
+            interval: K线周期
+            columns: 包含全部 KLINE_FIELDS 字段的数组字典，需与已存数据连续
+
+        返回:
+            new_bars: 新写入的收盘K线数量
+        """
+        key = (symbol, interval)
+        with self._lock(key), self._dir_lock(key):
+            maps = self._load(key)
+            times = np.asarray(columns['time'], dtype=np.int64)
+            newer = times > int(maps['time'][-1]) if len(maps['time']) else np.ones(len(times), dtype=bool)
+            if not newer.any():
+                return 0
+            maps = None  # 写入前释放内存映射
+            self._write(key, {name: np.asarray(columns[name])[newer] for name, _ in KLINE_FIELDS}, 'ab')
+            return int(newer.sum())
+
+    def merge_closed(self, symbol: str, interval: str, columns: Dict[str, np.ndarray]) -> int:
+        """
+        合并一段已收盘K线（可以早于、晚于或覆盖已存数据），按开盘时间排序去重后重写，
+        用于把回填下载的历史数据并入本地存储
+
+        参数:
+            symbol: 交易对
+            interval: K线周期
+            columns: 包含全部 KLINE_FIELDS 字段的数组字典
+
+        返回:
+            new_bars: 新增的收盘K线数量
+        """
+        key = (symbol, interval)
+        with self._lock(key), self._dir_lock(key):
+            maps = self._load(key)
+            stored = len(maps['time'])
+            merged = {name: np.concatenate((np.asarray(columns[name], dtype=dtype), maps[name]))
+                      for name, dtype in KLINE_FIELDS}
+            maps = None  # 重写文件前释放内存映射
+            order = np.argsort(merged['time'], kind='stable')
+            times = merged['time'][order]
+            order = order[np.r_[True, times[1:] != times[:-1]]]
+            self._write(key, {name: values[order] for name, values in merged.items()}, 'wb')
+            return len(order) - stored
+
+    # ------------------------------------------------------------------ 读取
+
+    def get_arrays(self, symbol: str, interval: str, limit: int = 200, include_open: bool = True,
+                   sync: bool = True) -> Dict[str, np.ndarray]:
+        """
+        获取最近limit根K线的各字段数组
+
+        参数:
+            symbol: 交易对
+            interval: K线周期
+            limit: K线数量（含未收盘K线）
+            include_open: 是否在末尾附加最近一次同步拿到的未收盘K线
+            sync: 读取前是否先增量同步
+
+        返回:
+            columns: {字段: 数组}；不附加未收盘K线时为内存映射的只读视图，不复制数据
+        """
+        key = (symbol, interval)
+        if sync:
+            self.sync(symbol, interval, min_bars=limit)
+        with self._lock(key), self._dir_lock(key, shared=True):
+            maps = self._load(key, repair=False)
+            open_candle = self._open_candles.get(key) if include_open else None
+            if open_candle is not None and len(maps['time']) and open_candle['time'][0] <= maps['time'][-1]:
+                open_candle = None  # 已经收盘并写入本地
+            if open_candle is None:
+                return {name: maps[name][-limit:] for name, _ in KLINE_FIELDS}
+            closed_limit = max(limit - 1, 0)
+            columns = {}
+            for name, _ in KLINE_FIELDS:
+                closed = maps[name][-closed_limit:] if closed_limit else maps[name][:0]
+                columns[name] = np.concatenate((closed, open_candle[name]))
+            return columns
+
+    def get_frame(self, symbol: str, interval: str, limit: int = 200, include_open: bool = True,
+                  sync: bool = True) -> pd.DataFrame:
+        """
+        获取最近limit根K线的DataFrame，列与 futures_klines 转换后的格式一致（time为datetime，价格为float）
+
+        参数:
+            symbol: 交易对
+            interval: K线周期
+            limit: K线数量（含未收盘K线）
+            include_open: 是否附加未收盘K线
+            sync: 读取前是否先增量同步
+
+        返回:
+            df: K线DataFrame
+        """
+        columns = self.get_arrays(symbol, interval, limit, include_open, sync)
+        df = pd.DataFrame({name: np.asarray(values) for name, values in columns.items()})
+        df['time'] = pd.to_datetime(df['time'], unit='ms')
+        return df
+
+    def stats(self) -> Dict[str, int]:
+        """同步请求次数和下载的K线数量"""
+        return {"requests": self.requests, "downloaded_bars": self.downloaded_bars}
+
+
+_store: Optional[CandleStore] = None
+_store_lock = threading.Lock()
+
+
+def get_candle_store(client=None) -> CandleStore:
+    """获取进程内共享的K线存储，K线是公开数据，任意客户端都可用于同步"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CandleStore(client)
+        elif _store.client is None and client is not None:
+            _store.client = client
+        return _store
@@ -23,7 +23,30 @@ CONFIG = {
     "TRAILING_ACTIVATION": 0.012,  # 激活跟踪止损的价格变动阈值 (1.2%)
     "TRAILING_MIN_DISTANCE": 0.002,  # 最小跟踪距离 (0.2%)
     "TRAILING_MAX_DISTANCE": 0.004,  # 最大跟踪距离 (0.4%)
-    "MIN_PRICE_MOVEMENT": 0.0135#小价格变动阈值 (1.25%)
+    "MIN_PRICE_MOVEMENT": 0.0135,#小价格变动阈值 (1.25%)
+    "INDICATOR_CACHE_MAX_MB": 64,  # 指标结果缓存的内存上限 (MB)
+    "DATA_CACHE_MAX_MB": 256,  # K线等数据缓存（data_cache）的内存上限 (MB)
+    "EXCHANGE_METADATA_REFRESH": 3600,  # 交易所元数据（交易规则/杠杆分层）后台刷新间隔（秒）
+    "PRICE_SNAPSHOT_MAX_AGE": 2.0,  # 全交易对价格快照的有效期（秒），有效期内所有价格查询共用一次请求
+    "PRICE_SNAPSHOT_STALE_LIMIT": 10.0,  # 价格快照可使用的最大时长（秒），刷新失败超过该时长后改为逐个查询价格
+    "PRICE_SNAPSHOT_RETRY_INTERVAL": 5.0,  # 价格快照全量刷新失败后的重试间隔（秒）
+    "FUNDING_FEED_REFRESH": 300,  # 资金费率/标记价格全量刷新间隔（秒）
+    "API_WEIGHT_LIMIT": 2400,  # 交易所每分钟请求权重上限（同一IP共用）
+    "API_WEIGHT_HEADROOM": 0.05,  # 请求调度器预留的权重比例
+    "API_COALESCE_REQUESTS": True,  # 合并并发的相同行情请求（只发送一次，结果共享）
+    "FUTURES_BASE_URL": "https://fapi.binance.com",  # 异步行情客户端的REST地址（可指向本地模拟交易所）
+    "ASYNC_MAX_CONCURRENCY": 20,  # 异步行情客户端的最大并发请求数
+    "PREFETCH_MAX_AGE": 60,  # 批量预取的K线在该秒数内视为最新，分析时不再逐个同步
+    "ANALYSIS_THREADS": 8,  # 交易循环中同时分析的交易对数量（获取数据和生成信号的线程数）
+    "ANALYSIS_PROCESSES": 2,  # 计算指标和质量评分的进程数，0表示在分析线程中直接计算
+    "CANDLE_STORE_DIR": "data/candles",  # 本地K线存储目录
+    "CANDLE_STORE_MAX_OPEN": 32,  # K线存储同时保持内存映射的交易对/周期数量（每个占用11个文件描述符）
+    "CANDLE_BUFFER_CAPACITY": 1000,  # 每个交易对/周期的K线环形缓冲区容量
+    "BACKFILL_WORKERS": 4,  # 历史K线回填的并行线程数
+    "BACKFILL_WEIGHT_BUDGET": 1200,  # 历史K线回填每分钟的请求权重上限（交易所限制2400，给实盘留出余量）
+    "TCN_TRAIN_BARS": 5000,  # TCN训练使用的本地历史K线数量（先用 backfill_tool 回填）
+    "CANDLE_ARCHIVE_DIR": "data/archive",  # K线压缩归档目录
+    "CANDLE_ARCHIVE_CHUNK_ROWS": 8192  # K线归档每个压缩块的行数
 }
 
 VERSION = "1.2.5.9.9"
\ No newline at end of file
@@ -35,6 +35,17 @@ except ImportError as e:
     }
 
 
+try:
+    from candle_store import get_candle_store
+except ImportError:
+    get_candle_store = None
+
+from kline_parser import DEFAULT_FIELDS, parse_klines
+from data_cache import get_data_cache
+from exchange_metadata import get_exchange_metadata
+from api_scheduler import PRIORITY_SCAN, api_priority, create_client
+
+
 # 必要的模块无法导入时的简化实现
 def simplified_calculate_enhanced_indicators(df):
     """简化的指标计算函数"""
@@ -293,13 +304,7 @@ class MockMTFCoordinator:
         try:
             # 获取数据
             klines = self.client.get_klines(symbol=symbol, interval="15m", limit=100)
-            df = pd.DataFrame(klines, columns=['time', 'open', 'high', 'low', 'close', 'volume',
-                                               'close_time', 'quote_volume', 'trades',
-                                               'taker_buy_base', 'taker_buy_quote', 'ignore'])
-
-            # 转换数据类型
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col])
+            df = parse_klines(klines)
 
             # 计算EMA
             df['EMA5'] = df['close'].ewm(span=5, adjust=False).mean()
@@ -340,7 +345,7 @@ class CryptoCurrencyScanner:
         self.api_key = api_key
         self.api_secret = api_secret
         self.config = config if config else CONFIG
-        self.client = Client(api_key, api_secret)
+        self.client = create_client(api_key, api_secret)  # 所有请求经过共享的权重调度器
 
         # 设置日志记录
         self.setup_logging()
@@ -354,8 +359,9 @@ class CryptoCurrencyScanner:
             print("将使用模拟版本替代")
             self.mtf_coordinator = MockMTFCoordinator(self.client, self.logger)
 
-        # 数据缓存
-        self.historical_data_cache = {}
+        # 数据缓存（共享的过期/LRU缓存，历史数据3分钟过期）
+        self.data_cache = get_data_cache()
+        self.data_cache.configure("scanner_history", 180)
         self.quality_scores_cache = {}
 
         # 冷却追踪 - 存储 symbol: timestamp 条目
@@ -404,7 +410,7 @@ class CryptoCurrencyScanner:
         """清理缓存文件和数据"""
         try:
             # 清理数据缓存
-            self.historical_data_cache = {}
+            self.data_cache.invalidate("scanner_history")
 
             # 清理扫描历史记录目录中的旧文件
             scan_results_dir = "scan_results"
@@ -452,15 +458,13 @@ class CryptoCurrencyScanner:
             交易对符号列表 (例如 'BTCUSDT')
         """
         try:
-            # 获取期货交易所信息
-            exchange_info = self.client.futures_exchange_info()
-
-            # 筛选出当前可交易的USDT对
+            # 从交易所元数据索引筛选出当前可交易的USDT对
             usdt_pairs = [
-                symbol['symbol'] for symbol in exchange_info['symbols']
-                if symbol['symbol'].endswith('USDT') and
-                   symbol['status'] == 'TRADING'
+                symbol for symbol in get_exchange_metadata(self.client).symbols(status='TRADING')
+                if symbol.endswith('USDT')
             ]
+            if not usdt_pairs:
+                raise ValueError("交易所元数据不可用")
 
             self.logger.info(f"从期货交易所找到 {len(usdt_pairs)} 个USDT交易对")
 
@@ -495,49 +499,41 @@ class CryptoCurrencyScanner:
                             limit: int = 200, force_refresh: bool = False) -> Optional[pd.DataFrame]:
         """获取期货交易对的历史OHLCV数据"""
         cache_key = f"{symbol}_{interval}_{limit}"
-        current_time = time.time()
-
-        # 缓存持续时间 - 3分钟
-        cache_ttl = 180
 
-        # 检查缓存，除非指定了强制刷新
-        if not force_refresh and cache_key in self.historical_data_cache:
-            cache_entry = self.historical_data_cache[cache_key]
-            if current_time - cache_entry['timestamp'] < cache_ttl:
-                return cache_entry['data']
+        # 检查缓存（3分钟过期），除非指定了强制刷新
+        if not force_refresh:
+            cached = self.data_cache.get("scanner_history", cache_key)
+            if cached is not None:
+                return cached
 
         try:
-            # 获取期货K线数据
-            klines = self.client.futures_klines(
-                symbol=symbol,
-                interval=interval,
-                limit=limit
-            )
+            df = None
+            if get_candle_store is not None:
+                try:
+                    # 从本地K线存储读取，只增量下载上次同步之后的新K线
+                    df = get_candle_store(self.client).get_frame(symbol, interval, limit=limit)
+                except Exception as e:
+                    self.logger.warning(f"本地K线存储不可用，直接下载{symbol}数据: {e}")
+            if df is None:
+                # 获取期货K线数据
+                klines = self.client.futures_klines(
+                    symbol=symbol,
+                    interval=interval,
+                    limit=limit
+                )
+
+                # 转换为DataFrame（后面会用到close_time）
+                df = parse_klines(klines or [], fields=DEFAULT_FIELDS + ('close_time',))
 
-            if not klines:
+            if df.empty:
                 self.logger.warning(f"未返回{symbol}的期货K线数据")
                 return None
 
-            # 转换为DataFrame
-            df = pd.DataFrame(klines, columns=[
-                'time', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_asset_volume', 'trades',
-                'taker_base_vol', 'taker_quote_vol', 'ignore'
-            ])
-
-            # 转换数据类型
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-
             # 转换时间列
-            df['time'] = pd.to_datetime(df['time'], unit='ms')
             df['close_time'] = pd.to_datetime(df['close_time'], unit='ms')
 
             # 更新缓存
-            self.historical_data_cache[cache_key] = {
-                'data': df,
-                'timestamp': current_time
-            }
+            self.data_cache.put("scanner_history", cache_key, df)
 
             return df
 
@@ -875,6 +871,11 @@ class CryptoCurrencyScanner:
                 "error": str(e)
             }
 
+    def _analyze_at_scan_priority(self, symbol: str) -> Dict[str, Any]:
+        """以扫描优先级分析单个交易对，请求排在下单和持仓检查之后"""
+        with api_priority(PRIORITY_SCAN):
+            return self.analyze_single_coin(symbol)
+
     def run_scan_round(self, symbols_to_scan: List[str],
                        min_expected_movement: float = 1.7) -> List[Dict[str, Any]]:
         """
@@ -892,11 +893,18 @@ class CryptoCurrencyScanner:
 
         results = []
 
+        # 先在一个事件循环中并发同步所有交易对的K线，分析线程随后直接读取本地数据
+        if hasattr(self.mtf_coordinator, "prefetch"):
+            try:
+                self.mtf_coordinator.prefetch(symbols_to_scan)
+            except Exception as e:
+                self.logger.warning(f"并发预取K线失败，改为逐个获取: {e}")
+
         # 使用并行处理提高效率 - 增加工作线程数量以加快处理
         with ThreadPoolExecutor(max_workers=10) as executor:
             # 提交所有分析任务
             future_to_symbol = {
-                executor.submit(self.analyze_single_coin, symbol): symbol
+                executor.submit(self._analyze_at_scan_priority, symbol): symbol
                 for symbol in symbols_to_scan
             }
 
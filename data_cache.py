@@ -0,0 +1,161 @@
+"""
+通用数据缓存模块
+进程内共享的带过期时间的LRU缓存，按命名空间设置过期时间，所有命名空间共用一个按DataFrame/ndarray实际内存计算的容量上限，
+替代各模块各自维护、没有淘汰机制的字典缓存
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import CONFIG
+
+_MISSING = object()
+
+
+def estimate_nbytes(value: Any) -> int:
+    """估算缓存值占用的内存（字节），DataFrame/Series/ndarray按数据实际大小，容器递归累加"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(index=True, deep=False)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_nbytes(k) + estimate_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class DataCache:
+    """
+    按命名空间设置过期时间、按内存预算做LRU淘汰的缓存
+
+    过期的条目不会在读取时删除，可以用 allow_stale=True 取回（例如刷新失败时退回旧数据），
+    它们和其他条目一样按最近使用顺序被淘汰，也可以调用 purge_expired 主动清理
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, default_ttl: float = 300.0):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # (命名空间, 键) -> (值, 写入时间, 字节数)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Any, float, int]]" = OrderedDict()
+        self._ttls: Dict[str, float] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _namespace_stats(self, namespace: str) -> Dict[str, int]:
+        if namespace not in self._stats:
+            self._stats[namespace] = {"hits": 0, "misses": 0, "stale_hits": 0, "evictions": 0}
+        return self._stats[namespace]
+
+    def configure(self, namespace: str, ttl: float) -> None:
+        """设置命名空间的过期时间（秒）"""
+        with self._lock:
+            self._ttls[namespace] = ttl
+
+    def ttl(self, namespace: str) -> float:
+        """命名空间的过期时间（秒）"""
+        return self._ttls.get(namespace, self.default_ttl)
+
+    def get(self, namespace: str, key: Hashable, default: Any = None, allow_stale: bool = False) -> Any:
+        """
+        查询缓存
+
+        参数:
+            namespace: 命名空间
+            key: 键
+            default: 未命中时的返回值
+            allow_stale: 是否返回已过期的条目
+
+        返回:
+            缓存的值，未命中（或已过期且不允许过期数据）时返回default
+        """
+        with self._lock:
+            stats = self._namespace_stats(namespace)
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                stats["misses"] += 1
+                return default
+            fresh = time.time() - entry[1] < self.ttl(namespace)
+            if not fresh and not allow_stale:
+                stats["misses"] += 1
+                return default
+            self._entries.move_to_end((namespace, key))
+            stats["hits" if fresh else "stale_hits"] += 1
+            return entry[0]
+
+    def age(self, namespace: str, key: Hashable) -> Optional[float]:
+        """条目写入至今的秒数，不存在时为None（不计入命中统计）"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            return None if entry is None else time.time() - entry[1]
+
+    def put(self, namespace: str, key: Hashable, value: Any) -> None:
+        """写入缓存，超过内存预算时按最近最少使用淘汰；单个值超过预算时不缓存"""
+        nbytes = estimate_nbytes(value)
+        with self._lock:
+            full_key = (namespace, key)
+            old = self._entries.pop(full_key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[full_key] = (value, time.time(), nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                (evicted_namespace, _), (_, _, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self._namespace_stats(evicted_namespace)["evictions"] += 1
+
+    def invalidate(self, namespace: str, key: Any = _MISSING) -> int:
+        """删除命名空间中的一个键，不指定键时删除整个命名空间，返回删除的条目数"""
+        with self._lock:
+            if key is not _MISSING:
+                keys = [(namespace, key)] if (namespace, key) in self._entries else []
+            else:
+                keys = [full_key for full_key in self._entries if full_key[0] == namespace]
+            for full_key in keys:
+                self._bytes -= self._entries.pop(full_key)[2]
+            return len(keys)
+
+    def purge_expired(self) -> int:
+        """删除所有已过期的条目，返回删除的条目数"""
+        now = time.time()
+        with self._lock:
+            expired = [full_key for full_key, (_, stored_at, _) in self._entries.items()
+                       if now - stored_at >= self.ttl(full_key[0])]
+            for full_key in expired:
+                self._bytes -= self._entries.pop(full_key)[2]
+            return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """总条目数/内存占用，以及各命名空间的条目数、命中/未命中/过期命中/淘汰次数和命中率"""
+        with self._lock:
+            namespaces = {}
+            for namespace in set(self._stats) | {full_key[0] for full_key in self._entries}:
+                stats = dict(self._namespace_stats(namespace))
+                stats["entries"] = sum(1 for full_key in self._entries if full_key[0] == namespace)
+                total = stats["hits"] + stats["misses"]
+                stats["hit_rate"] = stats["hits"] / total if total else 0.0
+                namespaces[namespace] = stats
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "namespaces": namespaces
+            }
+
+
+_cache = DataCache(int(CONFIG.get("DATA_CACHE_MAX_MB", 256) * 1024 * 1024))
+
+
+def get_data_cache() -> DataCache:
+    """获取进程内共享的数据缓存"""
+    return _cache
@@ -1,23 +1,30 @@
 import pandas as pd
+from candle_store import get_candle_store
+from kline_parser import parse_klines
+
+def _download_historical_data(client, symbol, interval="30m", limit=200):
+    """直接从API下载K线（本地K线存储不可用时的回退路径）"""
+    candles = client.futures_klines(symbol=symbol, interval=interval, limit=limit)
+    if not candles or not isinstance(candles, list):
+        return None
+    return parse_klines(candles)
 
 def get_historical_data(client, symbol):
     """
     获取历史K线数据，确保包含高低点，支持趋势分析
+    优先使用本地K线存储增量同步，只下载上次同步之后的新K线
     """
     try:
         print(f"尝试获取 {symbol} 数据...")
-        candles = client.futures_klines(symbol=symbol, interval="30m", limit=200)
-        if not candles or not isinstance(candles, list):
+        try:
+            df = get_candle_store(client).get_frame(symbol, "30m", limit=200)
+        except Exception as e:
+            print(f"本地K线存储不可用，直接下载 {symbol} 数据 - {e}")
+            df = _download_historical_data(client, symbol)
+        if df is None or df.empty:
             print(f"错误：获取 {symbol} 数据失败，返回空或无效列表")
             return pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
                                          'quote_asset_volume', 'trades', 'taker_base_vol', 'taker_quote_vol', 'ignore'])
-        df = pd.DataFrame(candles, columns=[
-            'time', 'open', 'high', 'low', 'close', 'volume',
-            'close_time', 'quote_asset_volume', 'trades', 'taker_base_vol', 'taker_quote_vol', 'ignore'
-        ])
-        for col in ['open', 'high', 'low', 'close', 'volume']:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
-        df['time'] = pd.to_datetime(df['time'], unit='ms', errors='coerce')
         close_sum = df['close'].sum()
         if df.empty or close_sum == 0:
             print(f"错误：{symbol} 数据为空或无效，close 列和: {close_sum}")
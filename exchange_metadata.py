@@ -0,0 +1,194 @@
+"""
+交易所元数据索引模块
+启动时一次性加载 futures_exchange_info 和杠杆分层，建立 交易对 -> LOT_SIZE/PRICE_FILTER/MIN_NOTIONAL/最大杠杆 的字典，
+并在后台定时刷新；下单路径只做字典查找，不再每笔订单请求高权重的 exchange_info 和 leverage_bracket 接口
+"""
+
+import math
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import CONFIG
+from logger_utils import Colors, print_colored
+
+
+def _decimals(step: float) -> int:
+    """步长对应的小数位数，例如 0.001 -> 3，1/10 -> 0"""
+    if step <= 0 or step >= 1:
+        return 0
+    return int(round(-math.log10(step)))
+
+
+class SymbolMeta:
+    """单个交易对的交易规则，以及按规则预先计算好的数量/价格量化方法"""
+
+    def __init__(self, info: Dict[str, Any]):
+        self.symbol = info['symbol']
+        self.status = info.get('status')
+        self.contract_type = info.get('contractType')
+        self.base_asset = info.get('baseAsset')
+        self.quote_asset = info.get('quoteAsset')
+        self.step_size = None
+        self.min_qty = None
+        self.max_qty = None
+        self.tick_size = None
+        self.min_price = None
+        self.max_price = None
+        self.min_notional = None
+        self.max_leverage = None
+        self.brackets: List[Dict[str, Any]] = []
+
+        for f in info.get('filters', []):
+            if f['filterType'] == 'LOT_SIZE':
+                self.step_size = float(f['stepSize'])
+                self.min_qty = float(f['minQty'])
+                self.max_qty = float(f['maxQty'])
+            elif f['filterType'] == 'PRICE_FILTER':
+                self.tick_size = float(f['tickSize'])
+                self.min_price = float(f['minPrice'])
+                self.max_price = float(f['maxPrice'])
+            elif f['filterType'] == 'MIN_NOTIONAL':
+                self.min_notional = float(f.get('notional', 0))
+
+        self.quantity_precision = _decimals(self.step_size) if self.step_size else None
+        self.price_precision = _decimals(self.tick_size) if self.tick_size else None
+
+    def floor_quantity(self, quantity: float) -> float:
+        """按步长向下取整并限制在最小/最大数量之间"""
+        if not self.step_size:
+            return round(quantity, 4)
+        steps = math.floor(quantity / self.step_size + 1e-9)
+        quantity = round(steps * self.step_size, self.quantity_precision)
+        return max(self.min_qty, min(self.max_qty, quantity))
+
+    def min_quantity_for_notional(self, price: float) -> float:
+        """满足最小订单价值的最小数量（按步长向上取整）"""
+        if not self.min_notional or not self.step_size or price <= 0:
+            return self.min_qty or 0.0
+        steps = math.ceil(self.min_notional / price / self.step_size - 1e-9)
+        return max(self.min_qty, round(steps * self.step_size, self.quantity_precision))
+
+    def format_quantity(self, quantity: float) -> str:
+        """按数量精度格式化为字符串，避免科学计数法"""
+        precision = self.quantity_precision if self.quantity_precision is not None else 3
+        return f"{quantity:.{precision}f}" if precision > 0 else str(int(quantity))
+
+    def round_price(self, price: float) -> float:
+        """按价格步长取整"""
+        if not self.tick_size:
+            return round(price, 6)
+        return round(round(price / self.tick_size) * self.tick_size, self.price_precision)
+
+    def format_price(self, price: float) -> str:
+        """按价格精度格式化为字符串"""
+        precision = self.price_precision if self.price_precision is not None else 6
+        price = self.round_price(price)
+        return f"{price:.{precision}f}" if precision > 0 else str(int(price))
+
+
+class ExchangeMetadata:
+    """交易所元数据索引，查询为O(1)字典查找"""
+
+    def __init__(self, client, refresh_interval: float = 3600, missing_refresh_interval: float = 60):
+        """
+        参数:
+            client: Binance客户端
+            refresh_interval: 后台刷新间隔（秒）
+            missing_refresh_interval: 查询到未知交易对（例如新上线）时立即刷新的最小间隔（秒）
+        """
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.missing_refresh_interval = missing_refresh_interval
+        self._symbols: Dict[str, SymbolMeta] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_refresh = 0.0
+        self.refresh_count = 0
+
+    def refresh(self) -> bool:
+        """重新加载交易规则和杠杆分层，整体替换索引；失败时保留旧索引"""
+        with self._refresh_lock:
+            try:
+                info = self.client.futures_exchange_info()
+                symbols = {item['symbol']: SymbolMeta(item) for item in info['symbols']}
+            except Exception as e:
+                print_colored(f"⚠️ 交易所元数据刷新失败: {e}", Colors.WARNING)
+                self.last_refresh = time.time()  # 避免失败后每次查询都重试
+                return False
+
+            # 杠杆分层是需要签名的接口，失败时只缺少最大杠杆信息
+            try:
+                for item in self.client.futures_leverage_bracket() or []:
+                    meta = symbols.get(item.get('symbol'))
+                    if meta is not None and item.get('brackets'):
+                        meta.brackets = item['brackets']
+                        meta.max_leverage = item['brackets'][0]['initialLeverage']  # 第一层是最大杠杆
+            except Exception as e:
+                print_colored(f"⚠️ 获取杠杆分层失败，最大杠杆将按需查询: {e}", Colors.WARNING)
+
+            with self._lock:
+                self._symbols = symbols
+            self.last_refresh = time.time()
+            self.refresh_count += 1
+            return True
+
+    def get(self, symbol: str) -> Optional[SymbolMeta]:
+        """查询交易对规则，索引未加载时先同步加载，未知交易对在间隔允许时触发一次刷新"""
+        if self.last_refresh == 0:
+            self.refresh()
+        meta = self._symbols.get(symbol)
+        if meta is None and time.time() - self.last_refresh > self.missing_refresh_interval:
+            self.refresh()
+            meta = self._symbols.get(symbol)
+        return meta
+
+    def max_leverage(self, symbol: str) -> Optional[int]:
+        """交易对的最大杠杆，未知时为None"""
+        meta = self.get(symbol)
+        return meta.max_leverage if meta is not None else None
+
+    def symbols(self, quote_asset: Optional[str] = None, contract_type: Optional[str] = None,
+                status: Optional[str] = None) -> List[str]:
+        """按计价资产/合约类型/状态筛选交易对"""
+        if self.last_refresh == 0:
+            self.refresh()
+        return [s for s, meta in self._symbols.items()
+                if (quote_asset is None or meta.quote_asset == quote_asset)
+                and (contract_type is None or meta.contract_type == contract_type)
+                and (status is None or meta.status == status)]
+
+    def _refresh_loop(self) -> None:
+        while not self._stop_event.wait(self.refresh_interval):
+            self.refresh()
+
+    def start_background_refresh(self) -> None:
+        """启动后台刷新线程（守护线程）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="exchange-metadata-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台刷新"""
+        self._stop_event.set()
+
+
+_metadata: Optional[ExchangeMetadata] = None
+_metadata_lock = threading.Lock()
+
+
+def get_exchange_metadata(client=None) -> ExchangeMetadata:
+    """获取进程内共享的交易所元数据索引，首次调用时加载并启动后台刷新"""
+    global _metadata
+    with _metadata_lock:
+        if _metadata is None:
+            _metadata = ExchangeMetadata(client, CONFIG.get("EXCHANGE_METADATA_REFRESH", 3600))
+            _metadata.refresh()
+            _metadata.start_background_refresh()
+        elif _metadata.client is None and client is not None:
+            _metadata.client = client
+        return _metadata
@@ -0,0 +1,176 @@
+"""
+指标结果缓存模块
+进程内共享的 calculate_optimized_indicators 结果缓存，键为 (交易对, 时间框架, 最后一根K线开盘时间, 参数哈希)，
+同一交易周期内对同一根K线的重复计算直接返回已有结果
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+import pandas as pd
+
+from config import CONFIG
+from indicators_module import calculate_optimized_indicators, resolve_indicator_groups
+
+CacheKey = Tuple[str, str, Any, int]
+
+
+def _frame_signature(df: Optional[pd.DataFrame]) -> Optional[Tuple]:
+    """数据的轻量签名：行数加最后一根K线的OHLCV，未收盘K线价格变化时签名随之变化"""
+    if df is None or df.empty:
+        return None
+    last = df.iloc[-1]
+    return (len(df),) + tuple(float(last[col]) for col in ['open', 'high', 'low', 'close', 'volume']
+                              if col in df.columns)
+
+
+def _last_open_time(df: pd.DataFrame) -> Any:
+    """最后一根K线的开盘时间，没有time列时退化为索引"""
+    if 'time' in df.columns:
+        return df['time'].iloc[-1]
+    return df.index[-1]
+
+
+class IndicatorCache:
+    """
+    按内存预算做LRU淘汰的指标结果缓存
+
+    同一个键只保存一份结果，并记录该结果包含的指标分组；
+    请求的分组是已缓存分组的子集时直接命中（例如完整计算的结果可以服务只要RSI/MACD的调用）
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, Tuple[pd.DataFrame, FrozenSet[str], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(symbol: str, interval: str, df: pd.DataFrame, btc_df: Optional[pd.DataFrame] = None) -> CacheKey:
+        """
+        生成缓存键
+
+        参数:
+            symbol: 交易对
+            interval: K线周期
+            df: 原始K线数据
+            btc_df: 参与市场情绪计算的BTC数据
+
+        返回:
+            key: (交易对, 时间框架, 最后一根K线开盘时间, 参数哈希)
+        """
+        param_hash = hash((_frame_signature(df), _frame_signature(btc_df)))
+        return symbol, interval, _last_open_time(df), param_hash
+
+    def get(self, key: CacheKey, groups: Iterable[str]) -> Optional[pd.DataFrame]:
+        """查询缓存，命中时返回结果副本，未命中返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and set(groups) <= entry[1]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy()
+            self.misses += 1
+            return None
+
+    def put(self, key: CacheKey, df: pd.DataFrame, groups: Iterable[str]) -> None:
+        """写入结果，已有结果覆盖的分组更多时保留已有结果"""
+        groups = frozenset(groups)
+        nbytes = int(df.memory_usage(index=True, deep=False).sum())
+        with self._lock:
+            old = self._entries.get(key)
+            if old is not None:
+                if groups <= old[1]:
+                    return
+                self._bytes -= old[2]
+                del self._entries[key]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (df, groups, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """清空缓存（计数器保留）"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中/未命中次数、命中率和内存占用"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+
+_cache = IndicatorCache(int(CONFIG.get("INDICATOR_CACHE_MAX_MB", 64) * 1024 * 1024))
+
+
+def get_indicator_cache() -> IndicatorCache:
+    """获取进程内共享的指标缓存"""
+    return _cache
+
+
+def cached_optimized_indicators(df: pd.DataFrame, symbol: str, interval: str = "15m", btc_df=None,
+                                columns=None) -> pd.DataFrame:
+    """
+    带缓存的 calculate_optimized_indicators
+
+    参数:
+        df: 包含OHLC数据的DataFrame（不会被修改）
+        symbol: 交易对
+        interval: K线周期
+        btc_df: BTC价格数据
+        columns: 需要的列，含义同 calculate_optimized_indicators
+
+    返回:
+        df: 添加了指标的DataFrame副本，计算失败时为空DataFrame
+    """
+    if df is None or df.empty:
+        return calculate_optimized_indicators(df, btc_df=btc_df, columns=columns)
+
+    groups = resolve_indicator_groups(columns)
+    key = _cache.make_key(symbol, interval, df, btc_df)
+    result = _cache.get(key, groups)
+    if result is not None:
+        return result
+
+    # 原函数会就地转换OHLCV列的类型，这里在副本上计算，避免改动调用方持有的K线缓存
+    result = calculate_optimized_indicators(df.copy(), btc_df=btc_df, columns=columns)
+    if result is not None and not result.empty:
+        _cache.put(key, result, groups)
+        return result.copy()
+    return result
+
+
+def store_optimized_indicators(df: pd.DataFrame, result: pd.DataFrame, symbol: str, interval: str = "15m",
+                               btc_df=None, columns=None) -> None:
+    """
+    写入在其他进程中计算好的指标结果，之后相同K线的 cached_optimized_indicators 直接命中缓存
+
+    参数:
+        df: 计算前的原始K线（用于生成缓存键）
+        result: calculate_optimized_indicators 的返回值
+        symbol: 交易对
+        interval: K线周期
+        btc_df: BTC价格数据
+        columns: 计算时使用的列
+    """
+    if df is None or df.empty or result is None or result.empty:
+        return
+    _cache.put(_cache.make_key(symbol, interval, df, btc_df), result, resolve_indicator_groups(columns))
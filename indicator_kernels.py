@@ -0,0 +1,453 @@
+"""
+指标计算内核模块
+基于原始ndarray的逐K线递推内核，供指标模块调用
+如果安装了numba则自动编译为机器码，否则以纯Python循环在ndarray上运行
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """numba不可用时的空装饰器"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True)
+def _supertrend_loop(close: np.ndarray, upperband: np.ndarray, lowerband: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """超级趋势的带宽/方向递推，逐K线与上一根的上下轨比较"""
+    n = close.shape[0]
+    supertrend = np.zeros(n)
+    direction = np.ones(n, dtype=np.int64)
+    if n == 0:
+        return supertrend, direction
+
+    supertrend[0] = lowerband[0]
+    for i in range(1, n):
+        if close[i] > upperband[i - 1]:
+            supertrend[i] = lowerband[i]
+            direction[i] = 1
+        elif close[i] < lowerband[i - 1]:
+            supertrend[i] = upperband[i]
+            direction[i] = -1
+        elif direction[i - 1] == 1:
+            # 与内置max(lowerband, prev)的NaN语义保持一致
+            prev = supertrend[i - 1]
+            supertrend[i] = prev if prev > lowerband[i] else lowerband[i]
+            direction[i] = 1
+        else:
+            prev = supertrend[i - 1]
+            supertrend[i] = prev if prev < upperband[i] else upperband[i]
+            direction[i] = -1
+
+    return supertrend, direction
+
+
+def supertrend_stability(direction: np.ndarray, min_stable_periods: int = 3) -> np.ndarray:
+    """
+    超级趋势稳定性：当前方向与前 min_stable_periods-1 根K线一致时为1.0，否则为0.5
+
+    参数:
+        direction: 方向数组 (1/-1)
+        min_stable_periods: 需要连续保持同一方向的周期数
+
+    返回:
+        stability: 稳定性数组，前 min_stable_periods 根K线为1.0
+    """
+    n = direction.shape[0]
+    stability = np.ones(n)
+    if n <= min_stable_periods:
+        return stability
+
+    stable = np.ones(n - min_stable_periods, dtype=bool)
+    current = direction[min_stable_periods:]
+    for j in range(1, min_stable_periods):
+        stable &= direction[min_stable_periods - j:n - j] == current
+    stability[min_stable_periods:] = np.where(stable, 1.0, 0.5)
+    return stability
+
+
+def direction_change_points(direction: np.ndarray) -> np.ndarray:
+    """返回方向发生变化的K线位置"""
+    if direction.shape[0] < 2:
+        return np.empty(0, dtype=np.int64)
+    return np.flatnonzero(direction[1:] != direction[:-1]) + 1
+
+
+def supertrend_kernel(high: np.ndarray, low: np.ndarray, close: np.ndarray, atr: np.ndarray,
+                      multiplier: float = 3.0, min_stable_periods: int = 3
+                      ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    超级趋势计算内核，一次完成带宽递推、稳定性检查和信号变化点扫描
+
+    参数:
+        high, low, close: 价格数组
+        atr: ATR数组
+        multiplier: ATR乘数
+        min_stable_periods: 稳定性检查所需的连续周期数
+
+    返回:
+        supertrend: 超级趋势值
+        direction: 方向 (1看多, -1看空)
+        stability: 稳定性 (1.0稳定, 0.5不稳定)
+        change_points: 方向变化的K线位置
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    atr = np.asarray(atr, dtype=np.float64)
+
+    hl2 = (high + low) / 2
+    upperband = hl2 + multiplier * atr
+    lowerband = hl2 - multiplier * atr
+
+    supertrend, direction = _supertrend_loop(close, upperband, lowerband)
+    stability = supertrend_stability(direction, min_stable_periods)
+    change_points = direction_change_points(direction)
+    return supertrend, direction, stability, change_points
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """
+    真实范围 TR = max(H-L, |H-前收|, |L-前收|)，第一根K线没有前收盘价时取 H-L
+
+    参数:
+        high, low, close: 价格数组
+
+    返回:
+        tr: 真实范围数组
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    if close.shape[0] == 0:
+        return np.empty(0)
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """滚动均值，窗口未满时为NaN（与 rolling(window).mean() 一致）"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape[0], np.nan)
+    if window <= 0 or values.shape[0] < window:
+        return out
+    csum = np.cumsum(np.concatenate(([0.0], values)))
+    out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+@njit(cache=True)
+def ema_rows(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    沿时间轴（第二维）对每一行做 adjust=False 的指数平滑，所有行在同一次循环中向量化推进
+
+    参数:
+        values: (行数, K线数) 的二维数组，允许每行开头用NaN补齐
+        alpha: 平滑系数，span对应 2 / (span + 1)
+
+    返回:
+        out: 同形状的EMA，每行从第一个有效值开始；中间缺失值沿用上一个EMA
+    """
+    rows, n = values.shape
+    out = np.empty((rows, n))
+    if n == 0:
+        return out
+    out[:, 0] = values[:, 0]
+    for i in range(1, n):
+        prev = out[:, i - 1]
+        x = values[:, i]
+        out[:, i] = np.where(np.isnan(prev), x, np.where(np.isnan(x), prev, (1.0 - alpha) * prev + alpha * x))
+    return out
+
+
+def supertrend_multi(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                     param_sets: Sequence[Tuple[int, float]], atr: Optional[np.ndarray] = None,
+                     min_stable_periods: int = 3) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    一次计算多组 (atr_period, multiplier) 超级趋势，TR只计算一次，相同周期的ATR共用
+
+    参数:
+        high, low, close: 价格数组
+        param_sets: (ATR周期, ATR乘数) 列表
+        atr: 指定时所有参数组共用该ATR，忽略ATR周期
+        min_stable_periods: 稳定性检查所需的连续周期数
+
+    返回:
+        与param_sets顺序一致的 (supertrend, direction, stability, change_points) 列表
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    hl2 = (high + low) / 2
+
+    atr_by_period = {}
+    if atr is None:
+        tr = true_range(high, low, close)
+        for period, _ in param_sets:
+            if period not in atr_by_period:
+                atr_by_period[period] = rolling_mean(tr, period)
+    else:
+        atr = np.asarray(atr, dtype=np.float64)
+
+    results = []
+    for period, multiplier in param_sets:
+        band_atr = atr if atr is not None else atr_by_period[period]
+        supertrend, direction = _supertrend_loop(close, hl2 + multiplier * band_atr, hl2 - multiplier * band_atr)
+        results.append((supertrend, direction,
+                        supertrend_stability(direction, min_stable_periods),
+                        direction_change_points(direction)))
+    return results
+
+
+def supertrend_sweep(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                     param_sets: Sequence[Tuple[int, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    参数扫描用的超级趋势批量计算，只返回超级趋势值和方向
+
+    参数:
+        high, low, close: 价格数组
+        param_sets: (ATR周期, ATR乘数) 列表
+
+    返回:
+        supertrend: 形状为 (参数组数, K线数) 的超级趋势矩阵
+        direction: 形状为 (参数组数, K线数) 的方向矩阵
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    hl2 = (high + low) / 2
+    tr = true_range(high, low, close)
+
+    n = close.shape[0]
+    supertrend = np.empty((len(param_sets), n))
+    direction = np.empty((len(param_sets), n), dtype=np.int64)
+    atr_by_period = {}
+    for k, (period, multiplier) in enumerate(param_sets):
+        if period not in atr_by_period:
+            atr_by_period[period] = rolling_mean(tr, period)
+        band_atr = atr_by_period[period]
+        supertrend[k], direction[k] = _supertrend_loop(close, hl2 + multiplier * band_atr,
+                                                       hl2 - multiplier * band_atr)
+    return supertrend, direction
+
+
+@njit(cache=True)
+def parabolic_sar_kernel(high: np.ndarray, low: np.ndarray, initial_af: float = 0.02, max_af: float = 0.2,
+                         af_step: float = 0.02) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    抛物线转向指标 (Parabolic SAR) 递推内核，第一根K线假设为上升趋势
+
+    参数:
+        high, low: 价格数组
+        initial_af: 初始加速因子
+        max_af: 最大加速因子
+        af_step: 加速因子步长
+
+    返回:
+        sar: SAR数组
+        trend: 趋势数组 (1上升, -1下降)
+    """
+    n = high.shape[0]
+    sar = np.zeros(n)
+    trend = np.zeros(n)
+    if n == 0:
+        return sar, trend
+
+    trend[0] = 1
+    sar[0] = low[0]
+    extreme_point = high[0]
+    af = initial_af
+
+    for i in range(1, n):
+        value = sar[i - 1] + af * (extreme_point - sar[i - 1])
+
+        if trend[i - 1] == 1:
+            # 确保SAR不高于前两个周期的最低价
+            if i >= 2:
+                bound = low[i - 2] if low[i - 2] < low[i - 1] else low[i - 1]
+                value = bound if bound < value else value
+
+            if low[i] < value:
+                trend[i] = -1
+                value = extreme_point
+                extreme_point = low[i]
+                af = initial_af
+            else:
+                trend[i] = 1
+                if high[i] > extreme_point:
+                    extreme_point = high[i]
+                    next_af = af + af_step
+                    af = next_af if next_af < max_af else max_af
+        else:
+            # 确保SAR不低于前两个周期的最高价
+            if i >= 2:
+                bound = high[i - 2] if high[i - 2] > high[i - 1] else high[i - 1]
+                value = bound if bound > value else value
+
+            if high[i] > value:
+                trend[i] = 1
+                value = extreme_point
+                extreme_point = high[i]
+                af = initial_af
+            else:
+                trend[i] = -1
+                if low[i] < extreme_point:
+                    extreme_point = low[i]
+                    next_af = af + af_step
+                    af = next_af if next_af < max_af else max_af
+
+        sar[i] = value
+
+    return sar, trend
+
+
+def swing_point_masks(high: np.ndarray, low: np.ndarray, window: int,
+                      strict: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    基于居中滚动极值的摆动点识别
+
+    参数:
+        high, low: 价格数组
+        window: 左右两侧比较的K线数量
+        strict: True时要求严格大于/小于两侧window根K线；
+                False时只要求等于居中 2*window+1 窗口的最大/最小值
+
+    返回:
+        high_mask: 摆动高点布尔数组
+        low_mask: 摆动低点布尔数组
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = high.shape[0]
+    high_mask = np.zeros(n, dtype=bool)
+    low_mask = np.zeros(n, dtype=bool)
+    if window < 1 or n <= 2 * window:
+        return high_mask, low_mask
+
+    centers = slice(window, n - window)
+    if strict:
+        # side_max[k] 为 [k, k+window) 的极值：左侧窗口取 k=i-window，右侧窗口取 k=i+1
+        side_max = sliding_window_view(high, window).max(axis=1)
+        side_min = sliding_window_view(low, window).min(axis=1)
+        h, l = high[centers], low[centers]
+        high_mask[centers] = (h > side_max[:n - 2 * window]) & (h > side_max[window + 1:])
+        low_mask[centers] = (l < side_min[:n - 2 * window]) & (l < side_min[window + 1:])
+    else:
+        span = 2 * window + 1
+        high_mask[centers] = high[centers] == sliding_window_view(high, span).max(axis=1)
+        low_mask[centers] = low[centers] == sliding_window_view(low, span).min(axis=1)
+
+    return high_mask, low_mask
+
+
+# 订单块结构化数组格式：type 为 1 表示买方(bid)订单块，-1 表示卖方(ask)订单块
+ORDER_BLOCK_DTYPE = np.dtype([
+    ('index', np.int64),
+    ('price', np.float64),
+    ('type', np.int8),
+    ('strength', np.float64),
+])
+
+
+def trailing_true_run(mask: np.ndarray) -> int:
+    """数组末尾连续为True的元素个数"""
+    mask = np.asarray(mask, dtype=bool)
+    false_idx = np.flatnonzero(~mask)
+    if false_idx.shape[0] == 0:
+        return int(mask.shape[0])
+    return int(mask.shape[0] - 1 - false_idx[-1])
+
+
+def trend_duration_bars(high: np.ndarray, low: np.ndarray, trend: str) -> int:
+    """
+    趋势持续K线数：从倒数第二根K线向前，统计连续满足趋势条件的K线数量
+    上升趋势要求高点或低点不低于前一根，下降趋势要求高点或低点不高于前一根
+
+    参数:
+        high, low: 价格数组
+        trend: 趋势方向 ("UP", "DOWN", 其他返回0)
+
+    返回:
+        duration: 持续K线数
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = high.shape[0]
+    if n < 3 or trend not in ("UP", "DOWN"):
+        return 0
+
+    # cond[k-1] 对应第k根K线与第k-1根的比较，只统计 k = 1 .. n-2
+    if trend == "UP":
+        cond = (high[1:n - 1] >= high[:n - 2]) | (low[1:n - 1] >= low[:n - 2])
+    else:
+        cond = (high[1:n - 1] <= high[:n - 2]) | (low[1:n - 1] <= low[:n - 2])
+    return trailing_true_run(cond)
+
+
+def order_block_kernel(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                       volume: np.ndarray, atr: np.ndarray, volume_threshold: float = 1.3,
+                       price_deviation: float = 0.002, consolidation_bars: int = 3) -> np.ndarray:
+    """
+    三维订单块检测内核：成交量激增 + 价格波动小 + 震荡验证，全部以布尔掩码完成
+
+    参数:
+        open_, high, low, close, volume: K线数组
+        atr: ATR数组
+        volume_threshold: 成交量相对前3根均量的倍数阈值
+        price_deviation: 最大允许价格波动（ATR比率）
+        consolidation_bars: 震荡验证所需K线数
+
+    返回:
+        blocks: ORDER_BLOCK_DTYPE 结构化数组
+    """
+    open_ = np.asarray(open_, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    atr = np.asarray(atr, dtype=np.float64)
+    n = close.shape[0]
+    if n < 4:
+        return np.empty(0, dtype=ORDER_BLOCK_DTYPE)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 成交量激增：当前成交量 / 前3根K线均量
+        vol_ratio = np.full(n, np.nan)
+        vol_ratio[3:] = volume[3:] / rolling_mean(volume, 3)[2:n - 1]
+
+        # 价格波动：收盘价变化 / ATR（ATR无效时记为0）
+        price_change = np.zeros(n)
+        price_change[1:] = np.abs(close[1:] - close[:-1])
+        atr_valid = atr > 0
+        atr_ratio = np.where(atr_valid, price_change / np.where(atr_valid, atr, 1.0), 0.0)
+
+        # 震荡验证：最近consolidation_bars根K线的振幅都小于0.5倍ATR
+        narrow = (np.abs(high - low) < 0.5 * atr).astype(np.int64)
+        is_consolidation = np.zeros(n, dtype=bool)
+        if 0 < consolidation_bars <= n:
+            window_count = np.cumsum(np.concatenate(([0], narrow)))
+            is_consolidation[consolidation_bars - 1:] = (
+                window_count[consolidation_bars:] - window_count[:n - consolidation_bars + 1] == consolidation_bars
+            )
+
+        mask = (vol_ratio > volume_threshold) & (atr_ratio < price_deviation) & is_consolidation
+        mask[0] = False
+
+        idx = np.flatnonzero(mask)
+        blocks = np.empty(idx.shape[0], dtype=ORDER_BLOCK_DTYPE)
+        blocks['index'] = idx
+        blocks['price'] = close[idx]
+        blocks['type'] = np.where(close[idx] > open_[idx], 1, -1)
+        blocks['strength'] = vol_ratio[idx] * (1 - atr_ratio[idx])
+    return blocks
@@ -6,6 +6,10 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional, Union, Any
 from data_module import get_historical_data
+from market_snapshot import get_price_snapshot
+from indicator_kernels import (
+    supertrend_kernel, supertrend_multi, swing_point_masks, order_block_kernel, trend_duration_bars
+)
 import logging
 from logger_setup import get_logger
 # 修改导入以使用正确的模块名称
@@ -23,6 +27,65 @@ logging.basicConfig(
 indicators_logger = logging.getLogger('indicators')
 
 
+def _williams_r_values(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                       period: int = 14) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """威廉指标及其变化率、加速度的数组实现"""
+    highest_high = pd.Series(high).rolling(window=period).max().values
+    lowest_low = pd.Series(low).rolling(window=period).min().values
+
+    # 计算威廉指标 %R = -100 * (H - C) / (H - L)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        williams = -100 * (highest_high - close) / (highest_high - lowest_low)
+    change = np.full(len(williams), np.nan)
+    change[1:] = williams[1:] - williams[:-1]
+    acceleration = np.full(len(williams), np.nan)
+    acceleration[1:] = change[1:] - change[:-1]
+    return williams, change, acceleration
+
+
+def _report_williams_r(williams: np.ndarray) -> None:
+    """输出威廉指标的最新值、超买超卖状态和短期趋势"""
+    last_value = williams[-1]
+
+    # 计算威廉指标的短期趋势
+    williams_slope = 0
+    if len(williams) >= 5:
+        recent_williams = williams[-5:]
+        williams_slope = np.polyfit(range(len(recent_williams)), recent_williams, 1)[0]
+
+    # 判断超买超卖状态
+    if last_value <= -80:
+        williams_state = "超卖"
+        color = Colors.OVERSOLD
+    elif last_value >= -20:
+        williams_state = "超买"
+        color = Colors.OVERBOUGHT
+    else:
+        williams_state = "中性"
+        color = Colors.RESET
+
+    # 判断威廉指标的趋势方向
+    if williams_slope > 1.5:
+        williams_trend = "强势上升"
+        trend_indicator = "⬆️⬆️"
+    elif williams_slope > 0.5:
+        williams_trend = "上升"
+        trend_indicator = "⬆️"
+    elif williams_slope < -1.5:
+        williams_trend = "强势下降"
+        trend_indicator = "⬇️⬇️"
+    elif williams_slope < -0.5:
+        williams_trend = "下降"
+        trend_indicator = "⬇️"
+    else:
+        williams_trend = "平稳"
+        trend_indicator = "➡️"
+
+    print_colored(f"📊 威廉指标(Williams %R): {color}{last_value:.2f}{Colors.RESET} ({williams_state})", color)
+    print_colored(f"{trend_indicator} 威廉指标趋势: {williams_trend}, 斜率: {williams_slope:.4f}",
+                  Colors.BLUE if williams_slope > 0 else Colors.RED if williams_slope < 0 else Colors.RESET)
+
+
 def calculate_williams_r(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     """
     计算威廉指标 (Williams %R)
@@ -39,60 +102,16 @@ def calculate_williams_r(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
             print_colored(f"⚠️ 数据长度 {len(df)} 小于威廉指标周期 {period}", Colors.WARNING)
             return df
 
-        # 计算最高价和最低价
-        highest_high = df['high'].rolling(window=period).max()
-        lowest_low = df['low'].rolling(window=period).min()
-
-        # 计算威廉指标 %R = -100 * (H - C) / (H - L)
-        df['Williams_R'] = -100 * (highest_high - df['close']) / (highest_high - lowest_low)
+        williams, change, acceleration = _williams_r_values(
+            df['high'].values, df['low'].values, df['close'].values, period)
+        df['Williams_R'] = williams
 
-        # 在最后一行显示威廉指标值
-        last_value = df['Williams_R'].iloc[-1]
-
-        # 计算威廉指标的短期趋势
-        williams_slope = 0
+        # 添加威廉指标的变化率和变化加速度
         if len(df) >= 5:
-            recent_williams = df['Williams_R'].tail(5).values
-            williams_slope = np.polyfit(range(len(recent_williams)), recent_williams, 1)[0]
-
-            # 添加威廉指标的变化率
-            df['Williams_R_Change'] = df['Williams_R'].diff()
-
-            # 添加威廉指标的变化加速度
-            df['Williams_R_Acceleration'] = df['Williams_R_Change'].diff()
-
-        # 判断超买超卖状态
-        if last_value <= -80:
-            williams_state = "超卖"
-            color = Colors.OVERSOLD
-        elif last_value >= -20:
-            williams_state = "超买"
-            color = Colors.OVERBOUGHT
-        else:
-            williams_state = "中性"
-            color = Colors.RESET
-
-        # 判断威廉指标的趋势方向
-        if williams_slope > 1.5:
-            williams_trend = "强势上升"
-            trend_indicator = "⬆️⬆️"
-        elif williams_slope > 0.5:
-            williams_trend = "上升"
-            trend_indicator = "⬆️"
-        elif williams_slope < -1.5:
-            williams_trend = "强势下降"
-            trend_indicator = "⬇️⬇️"
-        elif williams_slope < -0.5:
-            williams_trend = "下降"
-            trend_indicator = "⬇️"
-        else:
-            williams_trend = "平稳"
-            trend_indicator = "➡️"
-
-        print_colored(f"📊 威廉指标(Williams %R): {color}{last_value:.2f}{Colors.RESET} ({williams_state})", color)
-        print_colored(f"{trend_indicator} 威廉指标趋势: {williams_trend}, 斜率: {williams_slope:.4f}",
-                      Colors.BLUE if williams_slope > 0 else Colors.RED if williams_slope < 0 else Colors.RESET)
+            df['Williams_R_Change'] = change
+            df['Williams_R_Acceleration'] = acceleration
 
+        _report_williams_r(williams)
         return df
     except Exception as e:
         print_colored(f"❌ 计算威廉指标失败: {e}", Colors.ERROR)
@@ -138,101 +157,60 @@ def calculate_supertrend(df: pd.DataFrame, atr_period: int = 10, multiplier: flo
         else:
             atr = df['ATR']
 
-        # 计算基本上轨和下轨
-        upperband = ((high + low) / 2) + (multiplier * atr)
-        lowerband = ((high + low) / 2) - (multiplier * atr)
-
-        # 初始化超级趋势
-        supertrend = pd.Series(0.0, index=df.index)
-        direction = pd.Series(1, index=df.index)  # 1表示看多，-1表示看空
-
-        # 第一个值使用默认值
-        supertrend.iloc[0] = lowerband.iloc[0]
-
-        # 计算超级趋势和方向
-        for i in range(1, len(df)):
-            if close.iloc[i] > upperband.iloc[i - 1]:
-                supertrend.iloc[i] = lowerband.iloc[i]
-                direction.iloc[i] = 1
-            elif close.iloc[i] < lowerband.iloc[i - 1]:
-                supertrend.iloc[i] = upperband.iloc[i]
-                direction.iloc[i] = -1
-            else:
-                if direction.iloc[i - 1] == 1:
-                    supertrend.iloc[i] = max(lowerband.iloc[i], supertrend.iloc[i - 1])
-                    direction.iloc[i] = 1
-                else:
-                    supertrend.iloc[i] = min(upperband.iloc[i], supertrend.iloc[i - 1])
-                    direction.iloc[i] = -1
-
-        # 添加稳定性检查 - 是否有足够的连续方向
+        # 计算基本上轨和下轨、超级趋势方向、稳定性和信号变化点（数组内核一次完成）
         min_stable_periods = 3  # 至少需要连续3个周期保持同一方向
+        st_values, dir_values, stability_values, change_points = supertrend_kernel(
+            high.values, low.values, close.values, atr.values,
+            multiplier=multiplier, min_stable_periods=min_stable_periods
+        )
+        supertrend = pd.Series(st_values, index=df.index)
+        direction = pd.Series(dir_values, index=df.index)  # 1表示看多，-1表示看空
 
-        # 初始化稳定性列
-        if 'Supertrend_Stability' not in df.columns:
-            df['Supertrend_Stability'] = pd.Series(1.0, index=df.index)
-
-        # 遍历计算稳定性
-        for i in range(min_stable_periods, len(df)):
-            is_stable = True
-            for j in range(1, min_stable_periods):
-                if direction.iloc[i - j] != direction.iloc[i]:
-                    is_stable = False
-                    break
-
-            # 使用loc而不是链式赋值，以避免警告
-            df.loc[i, 'Supertrend_Stability'] = 1.0 if is_stable else 0.5
+        # 稳定性列 - 已存在时保留前min_stable_periods行的原值
+        if 'Supertrend_Stability' in df.columns:
+            stability_values[:min_stable_periods] = df['Supertrend_Stability'].values[:min_stable_periods]
+        df['Supertrend_Stability'] = stability_values
 
         # 计算信号变化点
         if not is_recursive:
             signal_changes = []
-            last_direction = direction.iloc[0]
-            for i in range(1, len(direction)):
-                if direction.iloc[i] != last_direction:
-                    signal_changes.append((i, "BUY" if direction.iloc[i] > 0 else "SELL"))
-                    last_direction = direction.iloc[i]
-                    print_colored(
-                        f"超级趋势信号变化 - 索引: {i}, 方向: {'看多' if direction.iloc[i] > 0 else '看空'}",
-                        Colors.GREEN if direction.iloc[i] > 0 else Colors.RED
-                    )
+            for i in change_points:
+                signal_changes.append((int(i), "BUY" if dir_values[i] > 0 else "SELL"))
+                print_colored(
+                    f"超级趋势信号变化 - 索引: {i}, 方向: {'看多' if dir_values[i] > 0 else '看空'}",
+                    Colors.GREEN if dir_values[i] > 0 else Colors.RED
+                )
 
         # 添加到DataFrame
         col_prefix = "" if is_recursive else ""
         df[f'{col_prefix}Supertrend'] = supertrend
         df[f'{col_prefix}Supertrend_Direction'] = direction
 
-        # 增加快速超级趋势，使用较小的参数
+        # 增加快速/慢速超级趋势，与基础超级趋势共用ATR一次算出，不再复制DataFrame
         if multiplier == 3 and not is_recursive:
-            # 计算快速超级趋势
-            df_copy = df.copy()
-            df_copy = calculate_supertrend(df_copy, atr_period=5, multiplier=2)
-            df['Fast_Supertrend'] = df_copy['Supertrend']
-            df['Fast_Supertrend_Direction'] = df_copy['Supertrend_Direction']
-
-            # 计算慢速超级趋势
-            df_copy = df.copy()
-            df_copy = calculate_supertrend(df_copy, atr_period=15, multiplier=4)
-            df['Slow_Supertrend'] = df_copy['Supertrend']
-            df['Slow_Supertrend_Direction'] = df_copy['Supertrend_Direction']
+            (fast_st, fast_dir, _, _), (slow_st, slow_dir, _, _) = supertrend_multi(
+                high.values, low.values, close.values, [(5, 2), (15, 4)], atr=atr.values
+            )
+            df['Fast_Supertrend'] = fast_st
+            df['Fast_Supertrend_Direction'] = fast_dir
+            df['Slow_Supertrend'] = slow_st
+            df['Slow_Supertrend_Direction'] = slow_dir
 
             # 计算三重超级趋势一致性
-            if 'Fast_Supertrend_Direction' in df.columns and 'Slow_Supertrend_Direction' in df.columns:
-                df['Supertrend_Consensus'] = ((df['Supertrend_Direction'] == df['Fast_Supertrend_Direction']) &
-                                              (df['Supertrend_Direction'] == df['Slow_Supertrend_Direction'])).astype(
-                    float)
+            df['Supertrend_Consensus'] = ((dir_values == fast_dir) & (dir_values == slow_dir)).astype(float)
 
-                # 计算共识百分比
-                consensus_pct = df['Supertrend_Consensus'].mean() * 100
-                consensus_count = df['Supertrend_Consensus'].sum()
-                consensus_status = "高" if consensus_pct >= 80 else "中" if consensus_pct >= 50 else "低"
+            # 计算共识百分比
+            consensus_pct = df['Supertrend_Consensus'].mean() * 100
+            consensus_count = df['Supertrend_Consensus'].sum()
+            consensus_status = "高" if consensus_pct >= 80 else "中" if consensus_pct >= 50 else "低"
 
-                print_colored(
-                    f"超级趋势共识度: {consensus_pct:.1f}% ({consensus_status}) - "
-                    f"一致 {int(consensus_count)}次, 不一致 {len(df) - int(consensus_count)}次",
-                    Colors.GREEN if consensus_pct >= 80 else
-                    Colors.YELLOW if consensus_pct >= 50 else
-                    Colors.RED
-                )
+            print_colored(
+                f"超级趋势共识度: {consensus_pct:.1f}% ({consensus_status}) - "
+                f"一致 {int(consensus_count)}次, 不一致 {len(df) - int(consensus_count)}次",
+                Colors.GREEN if consensus_pct >= 80 else
+                Colors.YELLOW if consensus_pct >= 50 else
+                Colors.RED
+            )
 
         # 计算信号强度 - 价格与超级趋势的距离
         df[f'{col_prefix}Supertrend_Strength'] = abs(df['close'] - supertrend) / df['ATR']
@@ -256,13 +234,88 @@ def calculate_supertrend(df: pd.DataFrame, atr_period: int = 10, multiplier: flo
         return df
 
 
-def calculate_smma(df: pd.DataFrame, period: int = 60) -> pd.DataFrame:
+def calculate_supertrend_set(df: pd.DataFrame, param_sets: Optional[List[Tuple[int, float]]] = None,
+                             names: Optional[List[str]] = None, atr: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    一次计算多组参数的超级趋势，所有参数组共用同一组TR数组，不复制DataFrame
+
+    参数:
+        df: 包含OHLC数据的DataFrame
+        param_sets: (ATR周期, ATR乘数) 列表，默认为基础(10, 3)、快速(5, 2)、慢速(15, 4)
+        names: 各参数组的列名前缀，默认三组为 ""、"Fast_"、"Slow_"，其余为 "ST{周期}x{乘数}_"
+        atr: 指定时所有参数组共用该ATR（与calculate_supertrend中沿用df['ATR']的行为一致）
+
+    返回:
+        df: 添加了各组超级趋势、方向列以及Supertrend_Consensus的DataFrame
+    """
+    if param_sets is None:
+        param_sets = [(10, 3.0), (5, 2.0), (15, 4.0)]
+        if names is None:
+            names = ["", "Fast_", "Slow_"]
+    if names is None:
+        names = [f"ST{period}x{multiplier:g}_" for period, multiplier in param_sets]
+
+    try:
+        results = supertrend_multi(
+            df['high'].values, df['low'].values, df['close'].values, param_sets,
+            atr=atr.values if atr is not None else None
+        )
+
+        base_direction = results[0][1]
+        consensus = np.ones(len(df), dtype=bool)
+        for name, (supertrend, direction, _, _) in zip(names, results):
+            df[f'{name}Supertrend'] = supertrend
+            df[f'{name}Supertrend_Direction'] = direction
+            consensus &= direction == base_direction
+
+        df['Supertrend_Consensus'] = consensus.astype(float)
+        print_colored(
+            f"多参数超级趋势计算完成 - {len(param_sets)}组参数, "
+            f"共识度: {df['Supertrend_Consensus'].mean() * 100:.1f}%",
+            Colors.INFO
+        )
+        return df
+    except Exception as e:
+        print_colored(f"❌ 计算多参数超级趋势失败: {e}", Colors.ERROR)
+        indicators_logger.error(f"计算多参数超级趋势失败: {e}")
+        return df
+
+
+def _smma_reference(close: pd.Series, period: int) -> pd.Series:
+    """原版逐K线SMMA实现，保留用于与快速实现的一致性校验"""
+    # 初始化SMMA为前N个周期的SMA
+    smma = pd.Series(index=close.index, dtype=float)
+    smma.iloc[:period] = close.iloc[:period].mean()
+
+    # 计算后续值: SMMA(t) = (SMMA(t-1) * (period-1) + close(t)) / period
+    for i in range(period, len(close)):
+        smma.iloc[i] = (smma.iloc[i - 1] * (period - 1) + close.iloc[i]) / period
+    return smma
+
+
+def _smma_values(close: np.ndarray, period: int) -> np.ndarray:
+    """
+    SMMA的快速实现：SMMA是 alpha=1/period 的一阶IIR滤波，以前N个周期的SMA为初值，
+    后续收盘价交给ewm(adjust=False)递推，前N个周期保持SMA初值
+    """
+    close = np.asarray(close, dtype=np.float64)
+    seed = close[:period].mean()
+    filtered = pd.Series(np.concatenate(([seed], close[period:]))).ewm(
+        alpha=1.0 / period, adjust=False).mean().values
+    values = np.empty(len(close))
+    values[:period] = seed
+    values[period:] = filtered[1:]
+    return values
+
+
+def calculate_smma(df: pd.DataFrame, period: int = 60, method: str = 'fast') -> pd.DataFrame:
     """
     计算平滑移动平均线 (SMMA)
 
     参数:
         df: 包含收盘价的DataFrame
         period: 计算周期
+        method: 'fast' 使用ewm闭式递推，'reference' 使用原版逐K线实现（用于一致性校验）
 
     返回:
         df: 添加了SMMA的DataFrame
@@ -273,13 +326,10 @@ def calculate_smma(df: pd.DataFrame, period: int = 60) -> pd.DataFrame:
             print_colored(f"⚠️ 数据长度 {len(df)} 小于SMMA周期 {period}", Colors.WARNING)
             return df
 
-        # 初始化SMMA为前N个周期的SMA
-        smma = pd.Series(index=df.index)
-        smma.iloc[:period] = df['close'].iloc[:period].mean()
-
-        # 计算后续值: SMMA(t) = (SMMA(t-1) * (period-1) + close(t)) / period
-        for i in range(period, len(df)):
-            smma.iloc[i] = (smma.iloc[i - 1] * (period - 1) + df['close'].iloc[i]) / period
+        if method == 'reference':
+            smma = _smma_reference(df['close'], period)
+        else:
+            smma = pd.Series(_smma_values(df['close'].values, period), index=df.index)
 
         # 添加到DataFrame
         col_name = f'SMMA{period}'
@@ -342,31 +392,13 @@ def get_smc_trend_and_duration(df: pd.DataFrame, config: Optional[Dict[str, Any]
         lower_highs = True
         lower_lows = True
 
-        # 要求至少3个点才能形成趋势
+        # 要求至少3个点才能形成趋势（从第3个点起与前一个点比较）
         if len(highs) >= 3 and len(lows) >= 3:
-            # 检查高点是否依次升高
-            for i in range(2, len(highs)):
-                if highs[i] <= highs[i - 1]:
-                    higher_highs = False
-                    break
-
-            # 检查低点是否依次升高
-            for i in range(2, len(lows)):
-                if lows[i] <= lows[i - 1]:
-                    higher_lows = False
-                    break
-
-            # 检查高点是否依次降低
-            for i in range(2, len(highs)):
-                if highs[i] >= highs[i - 1]:
-                    lower_highs = False
-                    break
-
-            # 检查低点是否依次降低
-            for i in range(2, len(lows)):
-                if lows[i] >= lows[i - 1]:
-                    lower_lows = False
-                    break
+            # 检查高点/低点是否依次升高或依次降低
+            higher_highs = not np.any(highs[2:] <= highs[1:-1])
+            higher_lows = not np.any(lows[2:] <= lows[1:-1])
+            lower_highs = not np.any(highs[2:] >= highs[1:-1])
+            lower_lows = not np.any(lows[2:] >= lows[1:-1])
         else:
             # 数据不足以判断趋势
             higher_highs = higher_lows = lower_highs = lower_lows = False
@@ -626,18 +658,8 @@ def get_smc_trend_and_duration(df: pd.DataFrame, config: Optional[Dict[str, Any]
             Colors.BOLD
         )
 
-        # 计算趋势持续时间
-        duration = 0
-        if trend == "UP":
-            for i in range(2, len(df)):
-                if not (df['high'].iloc[-i] >= df['high'].iloc[-i - 1] or df['low'].iloc[-i] >= df['low'].iloc[-i - 1]):
-                    break
-                duration += 1
-        elif trend == "DOWN":
-            for i in range(2, len(df)):
-                if not (df['high'].iloc[-i] <= df['high'].iloc[-i - 1] or df['low'].iloc[-i] <= df['low'].iloc[-i - 1]):
-                    break
-                duration += 1
+        # 计算趋势持续时间（从倒数第二根K线向前的连续满足条件的K线数）
+        duration = trend_duration_bars(df['high'].values, df['low'].values, trend)
 
         # 转换为分钟
         candle_minutes = 15  # 假设15分钟K线
@@ -675,48 +697,54 @@ def get_smc_trend_and_duration(df: pd.DataFrame, config: Optional[Dict[str, Any]
         return "NEUTRAL", 0, {"confidence": "无", "reason": f"分析出错: {str(e)}"}
 
 
-def detect_order_blocks_3d(df, volume_threshold=1.3, price_deviation=0.002, consolidation_bars=3):
+def detect_order_blocks_array(df: pd.DataFrame, volume_threshold: float = 1.3, price_deviation: float = 0.002,
+                              consolidation_bars: int = 3, trend: Optional[str] = None) -> np.ndarray:
     """
-    三维订单块检测：成交量+价格波动+震荡验证
+    三维订单块检测（数组版），返回结构化数组，适合在大量K线上批量运行
 
-    参数：
+    参数:
+        df: 包含OHLCV和ATR的DataFrame
         volume_threshold: 成交量倍数阈值
         price_deviation: 最大允许价格波动（ATR比率）
         consolidation_bars: 震荡验证所需K线数
-    """
-    order_blocks = []
-    atr = df['ATR'].values
-
-    for i in range(1, len(df)):
-        # 成交量激增检测
-        vol_ratio = df['volume'].iloc[i] / df['volume'].iloc[i - 3:i].mean()
+        trend: 指定时只保留与趋势同向的订单块 ("UP"保留bid, "DOWN"保留ask, 其他返回空)
 
-        # 价格波动检测
-        price_change = abs(df['close'].iloc[i] - df['close'].iloc[i - 1])
-        atr_ratio = price_change / atr[i] if atr[i] > 0 else 0
+    返回:
+        blocks: ORDER_BLOCK_DTYPE 结构化数组 (index, price, type, strength)，type 1为bid，-1为ask
+    """
+    blocks = order_block_kernel(
+        df['open'].values, df['high'].values, df['low'].values, df['close'].values,
+        df['volume'].values, df['ATR'].values,
+        volume_threshold=volume_threshold, price_deviation=price_deviation,
+        consolidation_bars=consolidation_bars
+    )
+    if trend is None:
+        return blocks
+    if trend == 'UP':
+        return blocks[blocks['type'] == 1]
+    if trend == 'DOWN':
+        return blocks[blocks['type'] == -1]
+    return blocks[:0]
 
-        # 震荡验证
-        is_consolidation = all(
-            abs(df['high'].iloc[j] - df['low'].iloc[j]) < 0.5 * atr[j]
-            for j in range(i - consolidation_bars + 1, i + 1)
-        )
 
-        if (vol_ratio > volume_threshold and
-                atr_ratio < price_deviation and
-                is_consolidation):
-            block_type = "bid" if df['close'].iloc[i] > df['open'].iloc[i] else "ask"
-            order_blocks.append({
-                'index': i,
-                'price': df['close'].iloc[i],
-                'type': block_type,
-                'strength': vol_ratio * (1 - atr_ratio)
-            })
+def detect_order_blocks_3d(df, volume_threshold=1.3, price_deviation=0.002, consolidation_bars=3):
+    """
+    三维订单块检测：成交量+价格波动+震荡验证
 
+    参数：
+        volume_threshold: 成交量倍数阈值
+        price_deviation: 最大允许价格波动（ATR比率）
+        consolidation_bars: 震荡验证所需K线数
+    """
     # 趋势过滤：仅保留与当前趋势同向的订单块
     trend, _, _ = get_smc_trend_and_duration(df)
-    return [b for b in order_blocks if
-            (trend == 'UP' and b['type'] == 'bid') or
-            (trend == 'DOWN' and b['type'] == 'ask')]
+    blocks = detect_order_blocks_array(df, volume_threshold, price_deviation, consolidation_bars, trend=trend)
+    return [{
+        'index': int(block['index']),
+        'price': float(block['price']),
+        'type': "bid" if block['type'] == 1 else "ask",
+        'strength': float(block['strength'])
+    } for block in blocks]
 
 
 def calculate_indicator_resonance(df: pd.DataFrame) -> Dict[str, Any]:
@@ -892,6 +920,116 @@ def calculate_indicator_resonance(df: pd.DataFrame) -> Dict[str, Any]:
     return resonance
 
 
+def _vortex_values(high: np.ndarray, low: np.ndarray, close: np.ndarray, atr: Optional[np.ndarray] = None,
+                   period: int = 14) -> Dict[str, np.ndarray]:
+    """
+    Vortex指标的数组实现，不复制DataFrame
+
+    返回:
+        values: VI_plus/VI_minus/VI_diff/Vortex_Cross_Up/Vortex_Cross_Down，
+                以及诊断用的VM_plus_sum/VM_minus_sum/TR_sum
+    """
+    high = pd.Series(np.asarray(high, dtype=np.float64))
+    low = pd.Series(np.asarray(low, dtype=np.float64))
+    close = pd.Series(np.asarray(close, dtype=np.float64))
+
+    # 计算真实范围 (True Range)，确保有最小值避免除零
+    eps = 1e-10  # 极小值，防止除零
+
+    # 使用已有的ATR或计算TR
+    if atr is not None:
+        # 如果已有ATR，直接乘以14（默认ATR周期）得到TR总和
+        tr = pd.Series(np.asarray(atr, dtype=np.float64) * 14)
+    else:
+        # 手动计算TR，NaN按缺失处理（与DataFrame.max(axis=1)一致）
+        high_low = high - low
+        high_close = (high - close.shift(1)).abs()
+        low_close = (low - close.shift(1)).abs()
+        tr = pd.Series(np.fmax(np.fmax(high_low.values, high_close.values), low_close.values))
+
+    # 确保TR不为零
+    tr = tr.replace(0, eps)
+
+    # 计算VM+ (上升趋势的动量) 和 VM- (下降趋势的动量)
+    vm_plus = (high - low.shift(1)).abs().fillna(0)
+    vm_minus = (low - high.shift(1)).abs().fillna(0)
+
+    # 计算周期内的总和，前period行的NaN用当根的值填充
+    tr_sum = tr.rolling(window=period).sum().fillna(tr)
+    vm_plus_sum = vm_plus.rolling(window=period).sum().fillna(vm_plus)
+    vm_minus_sum = vm_minus.rolling(window=period).sum().fillna(vm_minus)
+
+    # 确保分母非零
+    tr_sum = tr_sum.replace(0, eps)
+
+    # 计算最终的Vortex指标
+    vi_plus = (vm_plus_sum / tr_sum).clip(0, 5)
+    vi_minus = (vm_minus_sum / tr_sum).clip(0, 5)
+
+    # 计算Vortex指标差值，用于评估趋势强度
+    vi_diff = vi_plus - vi_minus
+
+    # 记录交叉信号
+    cross_up = ((vi_plus > vi_minus) & (vi_plus.shift(1) <= vi_minus.shift(1))).astype(int)
+    cross_down = ((vi_plus < vi_minus) & (vi_plus.shift(1) >= vi_minus.shift(1))).astype(int)
+
+    return {
+        'VI_plus': vi_plus.fillna(0).values,
+        'VI_minus': vi_minus.fillna(0).values,
+        'VI_diff': vi_diff.fillna(0).values,
+        'Vortex_Cross_Up': cross_up.values,
+        'Vortex_Cross_Down': cross_down.values,
+        'VM_plus_sum': vm_plus_sum.values,
+        'VM_minus_sum': vm_minus_sum.values,
+        'TR_sum': tr_sum.values
+    }
+
+
+def _report_vortex(values: Dict[str, np.ndarray]) -> None:
+    """输出Vortex指标的最新值、趋势状态、交叉信号和诊断信息"""
+    latest_vi_plus = values['VI_plus'][-1]
+    latest_vi_minus = values['VI_minus'][-1]
+    latest_diff = values['VI_diff'][-1]
+
+    # 确定趋势状态
+    if latest_vi_plus > latest_vi_minus:
+        trend_state = "上升趋势"
+        color = Colors.GREEN
+    else:
+        trend_state = "下降趋势"
+        color = Colors.RED
+
+    # 计算趋势强度（虚拟货币市场优化）
+    trend_strength = abs(latest_diff) * 10  # 放大差值以更好地评估强度
+    if trend_strength > 2.0:
+        strength_desc = "极强"
+    elif trend_strength > 1.0:
+        strength_desc = "强"
+    elif trend_strength > 0.5:
+        strength_desc = "中等"
+    else:
+        strength_desc = "弱"
+
+    # 判断交叉信号
+    cross_message = ""
+    if values['Vortex_Cross_Up'][-1]:
+        cross_message = f"{Colors.GREEN}VI+上穿VI-{Colors.RESET}"
+    elif values['Vortex_Cross_Down'][-1]:
+        cross_message = f"{Colors.RED}VI+下穿VI-{Colors.RESET}"
+
+    print_colored(
+        f"Vortex指标: {color}VI+({latest_vi_plus:.4f}) VI-({latest_vi_minus:.4f}){Colors.RESET} "
+        f"差值: {latest_diff:.4f} - {trend_state}({strength_desc}) {cross_message}",
+        Colors.INFO
+    )
+
+    # 打印诊断信息，帮助跟踪计算过程
+    print_colored(f"Vortex计算诊断 - VM+总和:{values['VM_plus_sum'][-1]:.4f}, "
+                  f"VM-总和:{values['VM_minus_sum'][-1]:.4f}, "
+                  f"TR总和:{values['TR_sum'][-1]:.4f}",
+                  Colors.INFO)
+
+
 def calculate_vortex_indicator(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     """
     计算Vortex指标 - 修复版，解决数值为0问题
@@ -908,126 +1046,15 @@ def calculate_vortex_indicator(df: pd.DataFrame, period: int = 14) -> pd.DataFra
             print_colored(f"⚠️ 数据长度 {len(df)} 小于Vortex指标周期+1 ({period + 1})", Colors.WARNING)
             return df
 
-        # 创建副本防止修改原始数据
-        df_copy = df.copy()
-
-        # 确保所有必要的数据都是数值类型
-        for col in ['high', 'low', 'close']:
-            if col in df_copy.columns:
-                df_copy[col] = pd.to_numeric(df_copy[col], errors='coerce')
-
-        # 计算真实范围 (True Range)，确保有最小值避免除零
-        eps = 1e-10  # 极小值，防止除零
-
-        # 使用已有的ATR或计算TR
-        if 'ATR' in df_copy.columns:
-            # 如果已有ATR，直接乘以14（默认ATR周期）得到TR总和
-            df_copy['TR'] = df_copy['ATR'] * 14
-        else:
-            # 手动计算TR
-            high_low = df_copy['high'] - df_copy['low']
-            high_close = abs(df_copy['high'] - df_copy['close'].shift(1))
-            low_close = abs(df_copy['low'] - df_copy['close'].shift(1))
-
-            # 使用maximum函数处理NaN值
-            TR1 = pd.DataFrame({'hl': high_low, 'hc': high_close, 'lc': low_close})
-            df_copy['TR'] = TR1.max(axis=1)
-
-        # 确保TR不为零
-        df_copy['TR'] = df_copy['TR'].replace(0, eps)
-
-        # 计算VM+ (上升趋势的动量)
-        df_copy['VM_plus'] = abs(df_copy['high'] - df_copy['low'].shift(1))
-
-        # 计算VM- (下降趋势的动量)
-        df_copy['VM_minus'] = abs(df_copy['low'] - df_copy['high'].shift(1))
-
-        # 填充NaN值
-        df_copy['VM_plus'] = df_copy['VM_plus'].fillna(0)
-        df_copy['VM_minus'] = df_copy['VM_minus'].fillna(0)
-
-        # 计算周期内的总和
-        df_copy['TR_sum'] = df_copy['TR'].rolling(window=period).sum()
-        df_copy['VM_plus_sum'] = df_copy['VM_plus'].rolling(window=period).sum()
-        df_copy['VM_minus_sum'] = df_copy['VM_minus'].rolling(window=period).sum()
-
-        # 填充前period行的NaN值，使用后向填充
-        df_copy['TR_sum'] = df_copy['TR_sum'].fillna(df_copy['TR'])
-        df_copy['VM_plus_sum'] = df_copy['VM_plus_sum'].fillna(df_copy['VM_plus'])
-        df_copy['VM_minus_sum'] = df_copy['VM_minus_sum'].fillna(df_copy['VM_minus'])
-
-        # 确保分母非零
-        df_copy['TR_sum'] = df_copy['TR_sum'].replace(0, eps)
-
-        # 计算最终的Vortex指标
-        df_copy['VI_plus'] = (df_copy['VM_plus_sum'] / df_copy['TR_sum']).clip(0, 5)
-        df_copy['VI_minus'] = (df_copy['VM_minus_sum'] / df_copy['TR_sum']).clip(0, 5)
-
-        # 计算Vortex指标差值，用于评估趋势强度
-        df_copy['VI_diff'] = df_copy['VI_plus'] - df_copy['VI_minus']
-
-        # 记录交叉信号
-        df_copy['Vortex_Cross_Up'] = ((df_copy['VI_plus'] > df_copy['VI_minus']) &
-                                      (df_copy['VI_plus'].shift(1) <= df_copy['VI_minus'].shift(1))).astype(int)
-
-        df_copy['Vortex_Cross_Down'] = ((df_copy['VI_plus'] < df_copy['VI_minus']) &
-                                        (df_copy['VI_plus'].shift(1) >= df_copy['VI_minus'].shift(1))).astype(int)
-
-        # 填充NaN值
-        for col in ['VI_plus', 'VI_minus', 'VI_diff', 'Vortex_Cross_Up', 'Vortex_Cross_Down']:
-            df_copy[col] = df_copy[col].fillna(0)
-
-        # 获取最新值并打印
-        latest_vi_plus = df_copy['VI_plus'].iloc[-1]
-        latest_vi_minus = df_copy['VI_minus'].iloc[-1]
-        latest_diff = df_copy['VI_diff'].iloc[-1]
-
-        # 确定趋势状态
-        if latest_vi_plus > latest_vi_minus:
-            trend_state = "上升趋势"
-            color = Colors.GREEN
-        else:
-            trend_state = "下降趋势"
-            color = Colors.RED
-
-        # 计算趋势强度（虚拟货币市场优化）
-        trend_strength = abs(latest_diff) * 10  # 放大差值以更好地评估强度
-        strength_desc = ""
-        if trend_strength > 2.0:
-            strength_desc = "极强"
-        elif trend_strength > 1.0:
-            strength_desc = "强"
-        elif trend_strength > 0.5:
-            strength_desc = "中等"
-        else:
-            strength_desc = "弱"
-
-        # 判断交叉信号
-        cross_up = df_copy['Vortex_Cross_Up'].iloc[-1]
-        cross_down = df_copy['Vortex_Cross_Down'].iloc[-1]
-
-        cross_message = ""
-        if cross_up:
-            cross_message = f"{Colors.GREEN}VI+上穿VI-{Colors.RESET}"
-        elif cross_down:
-            cross_message = f"{Colors.RED}VI+下穿VI-{Colors.RESET}"
-
-        print_colored(
-            f"Vortex指标: {color}VI+({latest_vi_plus:.4f}) VI-({latest_vi_minus:.4f}){Colors.RESET} "
-            f"差值: {latest_diff:.4f} - {trend_state}({strength_desc}) {cross_message}",
-            Colors.INFO
-        )
+        # 直接在数组上计算，不再复制整个DataFrame
+        high, low, close = (pd.to_numeric(df[col], errors='coerce').values for col in ['high', 'low', 'close'])
+        atr = df['ATR'].values if 'ATR' in df.columns else None
+        values = _vortex_values(high, low, close, atr, period)
 
-        # 将计算后的列复制回原始DataFrame
         for col in ['VI_plus', 'VI_minus', 'VI_diff', 'Vortex_Cross_Up', 'Vortex_Cross_Down']:
-            df[col] = df_copy[col]
-
-        # 打印诊断信息，帮助跟踪计算过程
-        print_colored(f"Vortex计算诊断 - VM+总和:{df_copy['VM_plus_sum'].iloc[-1]:.4f}, "
-                      f"VM-总和:{df_copy['VM_minus_sum'].iloc[-1]:.4f}, "
-                      f"TR总和:{df_copy['TR_sum'].iloc[-1]:.4f}",
-                      Colors.INFO)
+            df[col] = values[col]
 
+        _report_vortex(values)
         return df
     except Exception as e:
         print_colored(f"❌ 计算Vortex指标失败: {e}", Colors.ERROR)
@@ -1038,55 +1065,78 @@ def calculate_vortex_indicator(df: pd.DataFrame, period: int = 14) -> pd.DataFra
         return df
 
 
-def find_swing_points(df: pd.DataFrame, window=3):
+def detect_swing_points(df: pd.DataFrame, window: int = 3) -> Dict[str, Any]:
+    """
+    向量化摆动点识别，基于居中滚动极值，同时返回K线位置和时间
+
+    参数:
+        df: 包含OHLC数据的DataFrame
+        window: 寻找摆动点的窗口大小
+
+    返回:
+        swings: 摆动点字典
+            high_idx / low_idx: 摆动高/低点的K线位置
+            high_price / low_price: 摆动高/低点价格
+            high_time / low_time: 摆动高/低点时间（有time列时取time，否则取索引）
+            window: 使用的窗口大小
+            fallback: 是否追加了简化算法的结果
+    """
+    empty_idx = np.empty(0, dtype=np.int64)
+    swings = {
+        "high_idx": empty_idx, "high_price": np.empty(0), "high_time": np.empty(0),
+        "low_idx": empty_idx, "low_price": np.empty(0), "low_time": np.empty(0),
+        "window": window, "fallback": False
+    }
+
+    if len(df) <= 2 * window:
+        indicators_logger.warning(f"数据长度 {len(df)} 不足以找到摆动点 (需要 > {2 * window})")
+        print_colored(f"⚠️ 数据长度 {len(df)} 不足以找到摆动点", Colors.WARNING)
+        return swings
+
+    high = df['high'].values.astype(np.float64)
+    low = df['low'].values.astype(np.float64)
+    times = df['time'].values if 'time' in df.columns else df.index.values
+
+    # 摆动高点/低点：严格大于/小于前后window根K线
+    high_mask, low_mask = swing_point_masks(high, low, window, strict=True)
+    high_idx = np.flatnonzero(high_mask)
+    low_idx = np.flatnonzero(low_mask)
+
+    # 如果没有找到任何摆动点，追加简化算法（缩小窗口，等于居中窗口极值即可）的结果
+    if len(high_idx) == 0 or len(low_idx) == 0:
+        print_colored("使用简化算法寻找摆动点", Colors.INFO)
+        relaxed_window = max(2, window // 2)
+        relaxed_high, relaxed_low = swing_point_masks(high, low, relaxed_window, strict=False)
+        high_idx = np.concatenate((high_idx, np.flatnonzero(relaxed_high)))
+        low_idx = np.concatenate((low_idx, np.flatnonzero(relaxed_low)))
+        swings["fallback"] = True
+
+    swings.update({
+        "high_idx": high_idx, "high_price": high[high_idx], "high_time": times[high_idx],
+        "low_idx": low_idx, "low_price": low[low_idx], "low_time": times[low_idx]
+    })
+    return swings
+
+
+def find_swing_points(df: pd.DataFrame, window=3, swings: Optional[Dict[str, Any]] = None):
         """
         改进摆动点识别，增加窗口参数以平滑噪声
 
         参数:
             df: 包含OHLC数据的DataFrame
             window: 寻找摆动点的窗口大小
+            swings: 已由detect_swing_points计算好的结果，传入时直接复用
 
         返回:
             swing_highs: 摆动高点列表
             swing_lows: 摆动低点列表
         """
-        swing_highs = []
-        swing_lows = []
-
-        if len(df) <= 2 * window:
-            indicators_logger.warning(f"数据长度 {len(df)} 不足以找到摆动点 (需要 > {2 * window})")
-            print_colored(f"⚠️ 数据长度 {len(df)} 不足以找到摆动点", Colors.WARNING)
-            return swing_highs, swing_lows
-
         try:
-            for i in range(window, len(df) - window):
-                # 摆动高点：当前高点大于前后window根K线的高点
-                if all(df['high'].iloc[i] > df['high'].iloc[j] for j in range(i - window, i)) and \
-                        all(df['high'].iloc[i] > df['high'].iloc[j] for j in range(i + 1, i + window + 1)):
-                    swing_highs.append(df['high'].iloc[i])
-                    print_colored(f"发现摆动高点: 索引={i}, 价格={df['high'].iloc[i]:.4f}", Colors.INFO)
-
-                # 摆动低点：当前低点小于前后window根K线的低点
-                if all(df['low'].iloc[i] < df['low'].iloc[j] for j in range(i - window, i)) and \
-                        all(df['low'].iloc[i] < df['low'].iloc[j] for j in range(i + 1, i + window + 1)):
-                    swing_lows.append(df['low'].iloc[i])
-                    print_colored(f"发现摆动低点: 索引={i}, 价格={df['low'].iloc[i]:.4f}", Colors.INFO)
-
-            # 如果没有找到任何摆动点，使用简化的算法
-            if not swing_highs or not swing_lows:
-                print_colored("使用简化算法寻找摆动点", Colors.INFO)
-                window = max(2, window // 2)  # 缩小窗口
-
-                for i in range(window, len(df) - window):
-                    # 简化版摆动高点
-                    if df['high'].iloc[i] == max(df['high'].iloc[i - window:i + window + 1]):
-                        swing_highs.append(df['high'].iloc[i])
-                        print_colored(f"简化算法发现高点: 索引={i}, 价格={df['high'].iloc[i]:.4f}", Colors.INFO)
-
-                    # 简化版摆动低点
-                    if df['low'].iloc[i] == min(df['low'].iloc[i - window:i + window + 1]):
-                        swing_lows.append(df['low'].iloc[i])
-                        print_colored(f"简化算法发现低点: 索引={i}, 价格={df['low'].iloc[i]:.4f}", Colors.INFO)
+            if swings is None:
+                swings = detect_swing_points(df, window)
+
+            swing_highs = swings["high_price"].tolist()
+            swing_lows = swings["low_price"].tolist()
 
             print_colored(f"找到 {len(swing_highs)} 个摆动高点和 {len(swing_lows)} 个摆动低点", Colors.INFO)
             return swing_highs, swing_lows
@@ -1097,19 +1147,20 @@ def find_swing_points(df: pd.DataFrame, window=3):
 
 
 
-def calculate_fibonacci_retracements(df: pd.DataFrame):
+def calculate_fibonacci_retracements(df: pd.DataFrame, swings: Optional[Dict[str, Any]] = None):
     """
     改进斐波那契回撤计算
 
     参数:
         df: 包含OHLC数据的DataFrame
+        swings: 已由detect_swing_points计算好的摆动点，传入时直接复用
 
     返回:
         fib_levels: 斐波那契回撤水平列表
     """
     try:
         # 获取摆动点
-        swing_highs, swing_lows = find_swing_points(df)
+        swing_highs, swing_lows = find_swing_points(df, swings=swings)
 
         # 如果没有足够的摆动点，返回当前价格作为默认值
         if not swing_highs or not swing_lows:
@@ -1184,26 +1235,106 @@ def calculate_fibonacci_retracements(df: pd.DataFrame):
         return [current_price * (1 - 0.05 + i * 0.02) for i in range(5)]
 
 
-def calculate_optimized_indicators(df: pd.DataFrame, btc_df=None):
+# 指标分组：组名 -> 该组产出的列
+INDICATOR_GROUPS = {
+    'VWAP': ['VWAP'],
+    'EMA5': ['EMA5'],
+    'EMA20': ['EMA20'],
+    'EMA24': ['EMA24'],
+    'EMA52': ['EMA52'],
+    'MACD': ['EMA12', 'EMA26', 'MACD', 'MACD_signal', 'MACD_histogram'],
+    'RSI': ['RSI'],
+    'Williams_R': ['Williams_R', 'Williams_R_Change', 'Williams_R_Acceleration'],
+    'OBV': ['OBV'],
+    'ATR': ['TR', 'ATR'],
+    'Vortex': ['VI_plus', 'VI_minus', 'VI_diff', 'Vortex_Cross_Up', 'Vortex_Cross_Down'],
+    'Momentum': ['Momentum'],
+    'BB': ['BB_Middle', 'BB_Std', 'BB_Upper', 'BB_Lower'],
+    'ROC': ['ROC'],
+    'ADX': ['Plus_DM', 'Minus_DM', 'TR14', 'Plus_DI', 'Minus_DI', 'DX', 'ADX'],
+    'CCI': ['CCI'],
+    'Supertrend': ['Supertrend', 'Supertrend_Direction', 'Supertrend_Strength', 'Supertrend_Stability'],
+    'SMMA60': ['SMMA60'],
+    'Sentiment': ['Market_Sentiment', 'Panic_Index'],
+}
+
+# 指标分组的前置依赖
+INDICATOR_DEPENDENCIES = {
+    'Vortex': ['ATR'],
+    'ADX': ['ATR'],
+    'Supertrend': ['ATR'],
+    'Sentiment': ['ATR'],
+}
+
+# get_smc_trend_and_duration 读取的全部指标列（MTF的1m/5m只用到这些），ADX用于把弱趋势降为NEUTRAL和调整置信度
+TREND_COLUMNS = ['Supertrend_Direction', 'Supertrend_Strength', 'Williams_R', 'MACD', 'MACD_signal', 'RSI', 'ADX']
+
+_COLUMN_TO_GROUP = {col: group for group, cols in INDICATOR_GROUPS.items() for col in cols}
+
+# 逐列实现中以整数赋值的列，拼接指标矩阵时取值全为整数则恢复为int64（情绪和恐慌指数只在取整数值时为整数）
+INTEGER_COLUMNS = ['Supertrend_Direction', 'Vortex_Cross_Up', 'Vortex_Cross_Down', 'Market_Sentiment', 'Panic_Index']
+
+
+def resolve_indicator_groups(columns=None):
+    """
+    根据需要的输出列解析出需要计算的指标分组（含前置依赖）
+
+    参数:
+        columns: 需要的列名或分组名列表，None表示全部
+
+    返回:
+        groups: 需要计算的分组名集合
+    """
+    if columns is None:
+        return set(INDICATOR_GROUPS)
+
+    groups = set()
+    pending = []
+    for name in columns:
+        group = name if name in INDICATOR_GROUPS else _COLUMN_TO_GROUP.get(name)
+        if group is None:
+            indicators_logger.warning(f"未知的指标列: {name}，已忽略")
+            continue
+        pending.append(group)
+
+    while pending:
+        group = pending.pop()
+        if group in groups:
+            continue
+        groups.add(group)
+        pending.extend(INDICATOR_DEPENDENCIES.get(group, []))
+    return groups
+
+
+def calculate_optimized_indicators(df: pd.DataFrame, btc_df=None, columns=None, return_arrays: bool = False):
     """
     计算优化后的指标，修复Vortex指标计算问题
     增强版：优化超级趋势计算和提供更多日志信息
 
+    所有指标先写入一块预分配的连续float64矩阵（每列连续存放），最后一次性拼接到DataFrame，
+    避免逐列插入造成的内部块碎片和反复分配
+
     参数:
         df: 包含OHLC数据的DataFrame
         btc_df: BTC价格数据，用于计算整体市场情绪
+        columns: 需要的列名或分组名列表（见INDICATOR_GROUPS），None表示计算全部指标；
+                 前置依赖会自动补齐，例如ADX/Vortex会同时计算ATR
+        return_arrays: True时不构造DataFrame，直接返回 {列名: 数组} 字典
 
     返回:
-        df: 添加了各种指标的DataFrame
+        df: 添加了各种指标的DataFrame（return_arrays=True时为指标数组字典），失败时为空
     """
+    failed = {} if return_arrays else pd.DataFrame()
     try:
         required_cols = ['open', 'high', 'low', 'close', 'volume']
-        critical_indicators = ['RSI', 'MACD', 'EMA5', 'EMA20']
+        groups = resolve_indicator_groups(columns)
+        critical_indicators = [col for col in ['RSI', 'MACD', 'EMA5', 'EMA20'] if _COLUMN_TO_GROUP[col] in groups]
         all_indicators = ['VWAP', 'EMA24', 'EMA52', 'MACD', 'MACD_signal', 'RSI', 'OBV', 'TR',
                           'ATR', 'Momentum', 'BB_Middle', 'BB_Std', 'BB_Upper', 'BB_Lower',
                           'ROC', 'ADX', 'Market_Sentiment', 'CCI', 'EMA5', 'EMA20', 'Panic_Index',
                           'Supertrend', 'Supertrend_Direction', 'SMMA60', 'Williams_R',
                           'VI_plus', 'VI_minus', 'VI_diff', 'Vortex_Cross_Up', 'Vortex_Cross_Down']
+        all_indicators = [col for col in all_indicators if _COLUMN_TO_GROUP[col] in groups]
 
         # 检查输入数据
         if df is None or df.empty or not all(col in df.columns for col in required_cols):
@@ -1212,7 +1343,7 @@ def calculate_optimized_indicators(df: pd.DataFrame, btc_df=None):
                 Colors.WARNING
             )
             indicators_logger.info(f"输入数据无效或缺失列（{required_cols}）")
-            return pd.DataFrame()
+            return failed
 
         # 确保数值类型
         for col in ['open', 'high', 'low', 'close', 'volume']:
@@ -1227,294 +1358,318 @@ def calculate_optimized_indicators(df: pd.DataFrame, btc_df=None):
         if df['close'].sum() == 0:
             print_colored("❌ 数据无效：收盘价全为0", Colors.ERROR)
             indicators_logger.info("数据无效：close 列全为 0")
-            return pd.DataFrame()
+            return failed
 
-        # 初始化指标列
-        for col in all_indicators:
-            if col not in df.columns:
-                df[col] = np.nan
+        n = len(df)
+        eps = np.finfo(float).eps
+        close_s, high_s, low_s, volume_s = df['close'], df['high'], df['low'], df['volume']
+        close, high, low = close_s.values, high_s.values, low_s.values
+
+        # 预分配指标矩阵，out[列名] 是矩阵中一列的视图；已有同名列时以原值为初值
+        names = [col for group, cols in INDICATOR_GROUPS.items() if group in groups for col in cols]
+        block = np.full((n, len(names)), np.nan, order='F')
+        out = {name: block[:, j] for j, name in enumerate(names)}
+        for name in names:
+            if name in df.columns:
+                out[name][:] = pd.to_numeric(df[name], errors='coerce').values
 
         # 计算VWAP
-        if len(df) >= 50:
-            df['VWAP'] = (df['close'] * df['volume']).rolling(window=50, min_periods=1).sum() / \
-                         df['volume'].rolling(window=50, min_periods=1).sum().replace(0, np.finfo(float).eps)
-            log_indicator(None, "VWAP", df['VWAP'].iloc[-1])
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算VWAP（需要50根K线）", Colors.WARNING)
+        if 'VWAP' in groups:
+            if n >= 50:
+                out['VWAP'][:] = (close_s * volume_s).rolling(window=50, min_periods=1).sum().values / \
+                                 volume_s.rolling(window=50, min_periods=1).sum().replace(0, eps).values
+                log_indicator(None, "VWAP", out['VWAP'][-1])
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算VWAP（需要50根K线）", Colors.WARNING)
 
         # 计算各种EMA和MACD
-        if len(df) >= 5:
-            df['EMA5'] = df['close'].ewm(span=5, adjust=False).mean()
-            log_indicator(None, "EMA5", df['EMA5'].iloc[-1])
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算EMA5（需要5根K线）", Colors.WARNING)
-
-        if len(df) >= 20:
-            df['EMA20'] = df['close'].ewm(span=20, adjust=False).mean()
-            log_indicator(None, "EMA20", df['EMA20'].iloc[-1])
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算EMA20（需要20根K线）", Colors.WARNING)
-
-        if len(df) >= 24:
-            df['EMA24'] = df['close'].ewm(span=24, adjust=False).mean()
-            log_indicator(None, "EMA24", df['EMA24'].iloc[-1])
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算EMA24（需要24根K线）", Colors.WARNING)
-
-        if len(df) >= 52:
-            df['EMA52'] = df['close'].ewm(span=52, adjust=False).mean()
-            log_indicator(None, "EMA52", df['EMA52'].iloc[-1])
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算EMA52（需要52根K线）", Colors.WARNING)
+        for span in (5, 20, 24, 52):
+            name = f'EMA{span}'
+            if name not in groups:
+                continue
+            if n >= span:
+                out[name][:] = close_s.ewm(span=span, adjust=False).mean().values
+                log_indicator(None, name, out[name][-1])
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算{name}（需要{span}根K线）", Colors.WARNING)
 
         # 计算MACD
-        if len(df) >= 26:  # 减少所需数据点
-            df['EMA12'] = df['close'].ewm(span=12, adjust=False).mean()
-            df['EMA26'] = df['close'].ewm(span=26, adjust=False).mean()
-            df['MACD'] = df['EMA12'] - df['EMA26']
-            df['MACD_signal'] = df['MACD'].ewm(span=9, adjust=False).mean()
-            df['MACD_histogram'] = df['MACD'] - df['MACD_signal']
-
-            macd_color = Colors.GREEN if df['MACD'].iloc[-1] > df['MACD_signal'].iloc[-1] else Colors.RED
-            print_colored(
-                f"MACD 计算完成，最后值: {macd_color}{df['MACD'].iloc[-1]:.4f}{Colors.RESET}, "
-                f"信号线: {df['MACD_signal'].iloc[-1]:.4f}, "
-                f"柱状图: {df['MACD_histogram'].iloc[-1]:.4f}",
-                Colors.INFO
-            )
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算MACD（需要26根K线）", Colors.WARNING)
+        if 'MACD' in groups:
+            if n >= 26:  # 减少所需数据点
+                out['EMA12'][:] = close_s.ewm(span=12, adjust=False).mean().values
+                out['EMA26'][:] = close_s.ewm(span=26, adjust=False).mean().values
+                np.subtract(out['EMA12'], out['EMA26'], out=out['MACD'])
+                out['MACD_signal'][:] = pd.Series(out['MACD']).ewm(span=9, adjust=False).mean().values
+                np.subtract(out['MACD'], out['MACD_signal'], out=out['MACD_histogram'])
+
+                macd_color = Colors.GREEN if out['MACD'][-1] > out['MACD_signal'][-1] else Colors.RED
+                print_colored(
+                    f"MACD 计算完成，最后值: {macd_color}{out['MACD'][-1]:.4f}{Colors.RESET}, "
+                    f"信号线: {out['MACD_signal'][-1]:.4f}, "
+                    f"柱状图: {out['MACD_histogram'][-1]:.4f}",
+                    Colors.INFO
+                )
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算MACD（需要26根K线）", Colors.WARNING)
 
         # 计算RSI
-        if len(df) >= 14:
-            delta = df['close'].diff()
-            gain = delta.clip(lower=0).rolling(window=14, min_periods=1).mean()
-            loss = -delta.clip(upper=0).rolling(window=14, min_periods=1).mean()
-            rs = gain / loss.replace(0, np.finfo(float).eps)
-            df['RSI'] = 100 - (100 / (1 + rs))
-
-            rsi_value = df['RSI'].iloc[-1]
-            rsi_color = Colors.RED if rsi_value > 70 else Colors.GREEN if rsi_value < 30 else Colors.RESET
-            print_colored(f"RSI 计算完成，最后值: {rsi_color}{rsi_value:.2f}{Colors.RESET}", Colors.INFO)
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算RSI（需要14根K线）", Colors.WARNING)
+        if 'RSI' in groups:
+            if n >= 14:
+                delta = close_s.diff()
+                gain = delta.clip(lower=0).rolling(window=14, min_periods=1).mean()
+                loss = -delta.clip(upper=0).rolling(window=14, min_periods=1).mean()
+                rs = gain / loss.replace(0, eps)
+                out['RSI'][:] = (100 - (100 / (1 + rs))).values
+
+                rsi_value = out['RSI'][-1]
+                rsi_color = Colors.RED if rsi_value > 70 else Colors.GREEN if rsi_value < 30 else Colors.RESET
+                print_colored(f"RSI 计算完成，最后值: {rsi_color}{rsi_value:.2f}{Colors.RESET}", Colors.INFO)
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算RSI（需要14根K线）", Colors.WARNING)
 
         # 计算威廉指标
-        if len(df) >= 14:
-            df = calculate_williams_r(df, period=14)
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算Williams %R（需要14根K线）", Colors.WARNING)
+        if 'Williams_R' in groups:
+            if n >= 14:
+                williams, change, acceleration = _williams_r_values(high, low, close, period=14)
+                out['Williams_R'][:] = williams
+                out['Williams_R_Change'][:] = change
+                out['Williams_R_Acceleration'][:] = acceleration
+                _report_williams_r(williams)
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算Williams %R（需要14根K线）", Colors.WARNING)
 
         # 计算OBV
-        df['OBV'] = (np.sign(df['close'].diff()) * df['volume']).fillna(0).cumsum()
-        log_indicator(None, "OBV", df['OBV'].iloc[-1])
+        if 'OBV' in groups:
+            out['OBV'][:] = (np.sign(close_s.diff()) * volume_s).fillna(0).cumsum().values
+            log_indicator(None, "OBV", out['OBV'][-1])
 
         # 计算ATR
-        if len(df) >= 14:
-            df['TR'] = np.maximum(df['high'] - df['low'],
-                                  np.maximum(abs(df['high'] - df['close'].shift(1)),
-                                             abs(df['low'] - df['close'].shift(1))))
-            df['ATR'] = df['TR'].rolling(window=14, min_periods=1).mean()
-            log_indicator(None, "ATR", df['ATR'].iloc[-1])
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算ATR（需要14根K线）", Colors.WARNING)
+        if 'ATR' in groups:
+            if n >= 14:
+                prev_close = close_s.shift(1).values
+                np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)),
+                           out=out['TR'])
+                out['ATR'][:] = pd.Series(out['TR']).rolling(window=14, min_periods=1).mean().values
+                log_indicator(None, "ATR", out['ATR'][-1])
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算ATR（需要14根K线）", Colors.WARNING)
 
         # 计算Vortex指标 - 修复版本，确保在ATR计算之后
-        if len(df) >= 14 and 'ATR' in df.columns:
-            print_colored("开始计算Vortex指标...", Colors.INFO)
-            df = calculate_vortex_indicator(df, period=14)
-
-            # 检查Vortex指标是否计算成功
-            if all(x in df.columns for x in ['VI_plus', 'VI_minus']):
-                vi_plus_val = df['VI_plus'].iloc[-1]
-                vi_minus_val = df['VI_minus'].iloc[-1]
-                if vi_plus_val == 0 and vi_minus_val == 0:
-                    print_colored("⚠️ Vortex指标计算结果异常（全为0），尝试重新计算", Colors.WARNING)
-                    # 仅用于诊断，输出部分关键数据
-                    print_colored(f"诊断信息 - 高价范围: {df['high'].min():.4f}-{df['high'].max():.4f}, "
-                                  f"低价范围: {df['low'].min():.4f}-{df['low'].max():.4f}, "
-                                  f"ATR: {df['ATR'].iloc[-1]:.4f}",
-                                  Colors.INFO)
+        if 'Vortex' in groups:
+            if n >= 14:
+                print_colored("开始计算Vortex指标...", Colors.INFO)
+                if n < 15:
+                    print_colored(f"⚠️ 数据长度 {n} 小于Vortex指标周期+1 (15)", Colors.WARNING)
+                else:
+                    vortex = _vortex_values(high, low, close, out['ATR'], period=14)
+                    for col in INDICATOR_GROUPS['Vortex']:
+                        out[col][:] = vortex[col]
+                    _report_vortex(vortex)
+
+                    # 检查Vortex指标是否计算成功
+                    if out['VI_plus'][-1] == 0 and out['VI_minus'][-1] == 0:
+                        print_colored("⚠️ Vortex指标计算结果异常（全为0），尝试重新计算", Colors.WARNING)
+                        # 仅用于诊断，输出部分关键数据
+                        print_colored(f"诊断信息 - 高价范围: {high.min():.4f}-{high.max():.4f}, "
+                                      f"低价范围: {low.min():.4f}-{low.max():.4f}, "
+                                      f"ATR: {out['ATR'][-1]:.4f}",
+                                      Colors.INFO)
             else:
-                print_colored("⚠️ Vortex指标列未正确创建", Colors.WARNING)
-        else:
-            print_colored(f"⚠️ 数据不足或缺失ATR，无法计算Vortex指标", Colors.WARNING)
+                print_colored(f"⚠️ 数据不足或缺失ATR，无法计算Vortex指标", Colors.WARNING)
 
         # 计算动量
-        if len(df) >= 10:
-            df['Momentum'] = df['close'] - df['close'].shift(10)
-            log_indicator(None, "Momentum", df['Momentum'].iloc[-1])
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算Momentum（需要10根K线）", Colors.WARNING)
+        if 'Momentum' in groups:
+            if n >= 10:
+                out['Momentum'][10:] = close[10:] - close[:-10]
+                log_indicator(None, "Momentum", out['Momentum'][-1])
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算Momentum（需要10根K线）", Colors.WARNING)
 
         # 计算布林带
-        if len(df) >= 20:
-            df['BB_Middle'] = df['close'].rolling(window=20, min_periods=1).mean()
-            df['BB_Std'] = df['close'].rolling(window=20, min_periods=1).std()
-            df['BB_Upper'] = df['BB_Middle'] + 2 * df['BB_Std']
-            df['BB_Lower'] = df['BB_Middle'] - 2 * df['BB_Std']
-
-            # 计算价格相对布林带位置
-            bb_position = (df['close'].iloc[-1] - df['BB_Lower'].iloc[-1]) / (
-                    df['BB_Upper'].iloc[-1] - df['BB_Lower'].iloc[-1])
-            bb_position_text = (
-                "上轨以上" if bb_position > 1 else
-                "上轨附近" if bb_position > 0.9 else
-                "上轨和中轨之间" if bb_position > 0.5 else
-                "中轨附近" if bb_position > 0.45 and bb_position < 0.55 else
-                "中轨和下轨之间" if bb_position > 0.1 else
-                "下轨附近" if bb_position > 0 else
-                "下轨以下"
-            )
+        if 'BB' in groups:
+            if n >= 20:
+                out['BB_Middle'][:] = close_s.rolling(window=20, min_periods=1).mean().values
+                out['BB_Std'][:] = close_s.rolling(window=20, min_periods=1).std().values
+                np.add(out['BB_Middle'], 2 * out['BB_Std'], out=out['BB_Upper'])
+                np.subtract(out['BB_Middle'], 2 * out['BB_Std'], out=out['BB_Lower'])
+
+                # 计算价格相对布林带位置
+                bb_position = (close[-1] - out['BB_Lower'][-1]) / (out['BB_Upper'][-1] - out['BB_Lower'][-1])
+                bb_position_text = (
+                    "上轨以上" if bb_position > 1 else
+                    "上轨附近" if bb_position > 0.9 else
+                    "上轨和中轨之间" if bb_position > 0.5 else
+                    "中轨附近" if bb_position > 0.45 and bb_position < 0.55 else
+                    "中轨和下轨之间" if bb_position > 0.1 else
+                    "下轨附近" if bb_position > 0 else
+                    "下轨以下"
+                )
 
-            bb_position_color = (
-                Colors.RED if bb_position > 0.9 else
-                Colors.YELLOW if bb_position > 0.7 else
-                Colors.GREEN if bb_position < 0.3 else
-                Colors.RESET
-            )
+                bb_position_color = (
+                    Colors.RED if bb_position > 0.9 else
+                    Colors.YELLOW if bb_position > 0.7 else
+                    Colors.GREEN if bb_position < 0.3 else
+                    Colors.RESET
+                )
 
-            print_colored(
-                f"布林带计算完成 - 上轨: {df['BB_Upper'].iloc[-1]:.4f}, "
-                f"中轨: {df['BB_Middle'].iloc[-1]:.4f}, "
-                f"下轨: {df['BB_Lower'].iloc[-1]:.4f}",
-                Colors.INFO
-            )
-            print_colored(
-                f"价格在布林带的位置: {bb_position_color}{bb_position:.2f} ({bb_position_text}){Colors.RESET}",
-                Colors.INFO
-            )
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算Bollinger Bands（需要20根K线）", Colors.WARNING)
+                print_colored(
+                    f"布林带计算完成 - 上轨: {out['BB_Upper'][-1]:.4f}, "
+                    f"中轨: {out['BB_Middle'][-1]:.4f}, "
+                    f"下轨: {out['BB_Lower'][-1]:.4f}",
+                    Colors.INFO
+                )
+                print_colored(
+                    f"价格在布林带的位置: {bb_position_color}{bb_position:.2f} ({bb_position_text}){Colors.RESET}",
+                    Colors.INFO
+                )
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算Bollinger Bands（需要20根K线）", Colors.WARNING)
 
         # 计算变化率
-        if len(df) >= 5:
-            df['ROC'] = (df['close'] - df['close'].shift(5)) / df['close'].shift(5).replace(0,
-                                                                                            np.finfo(float).eps) * 100
-            log_indicator(None, "ROC", df['ROC'].iloc[-1])
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算ROC（需要5根K线）", Colors.WARNING)
+        if 'ROC' in groups:
+            if n >= 5:
+                close_5 = close_s.shift(5)
+                out['ROC'][:] = ((close_s - close_5) / close_5.replace(0, eps) * 100).values
+                log_indicator(None, "ROC", out['ROC'][-1])
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算ROC（需要5根K线）", Colors.WARNING)
 
         # 计算ADX
-        if len(df) >= 14:
-            df['Plus_DM'] = (df['high'] - df['high'].shift(1)).clip(lower=0)
-            df['Minus_DM'] = (df['low'].shift(1) - df['low']).clip(lower=0)
-            df['TR14'] = df['TR'].rolling(window=14, min_periods=1).sum()
-
-            # 确保不除以零
-            tr14_nonzero = df['TR14'].replace(0, np.finfo(float).eps)
-
-            df['Plus_DI'] = 100 * (df['Plus_DM'].rolling(window=14, min_periods=1).sum() / tr14_nonzero)
-            df['Minus_DI'] = 100 * (df['Minus_DM'].rolling(window=14, min_periods=1).sum() / tr14_nonzero)
-
-            # 计算DX时避免除以零
-            di_sum = df['Plus_DI'] + df['Minus_DI']
-            di_sum_nonzero = di_sum.replace(0, np.finfo(float).eps)
-
-            df['DX'] = 100 * abs(df['Plus_DI'] - df['Minus_DI']) / di_sum_nonzero
-            df['ADX'] = df['DX'].rolling(window=14, min_periods=1).mean()
-
-            adx_value = df['ADX'].iloc[-1]
-            adx_strength = (
-                "强烈趋势" if adx_value >= 35 else
-                "趋势" if adx_value >= 25 else
-                "弱趋势" if adx_value >= 20 else
-                "无趋势"
-            )
-            adx_color = (
-                Colors.GREEN + Colors.BOLD if adx_value >= 35 else
-                Colors.GREEN if adx_value >= 25 else
-                Colors.YELLOW if adx_value >= 20 else
-                Colors.GRAY
-            )
+        if 'ADX' in groups:
+            if n >= 14:
+                out['Plus_DM'][:] = (high_s - high_s.shift(1)).clip(lower=0).values
+                out['Minus_DM'][:] = (low_s.shift(1) - low_s).clip(lower=0).values
+                out['TR14'][:] = pd.Series(out['TR']).rolling(window=14, min_periods=1).sum().values
+
+                # 确保不除以零
+                tr14_nonzero = pd.Series(out['TR14']).replace(0, eps).values
+
+                out['Plus_DI'][:] = 100 * (pd.Series(out['Plus_DM']).rolling(window=14, min_periods=1).sum().values
+                                           / tr14_nonzero)
+                out['Minus_DI'][:] = 100 * (pd.Series(out['Minus_DM']).rolling(window=14, min_periods=1).sum().values
+                                            / tr14_nonzero)
+
+                # 计算DX时避免除以零
+                di_sum = pd.Series(out['Plus_DI'] + out['Minus_DI']).replace(0, eps).values
+                out['DX'][:] = 100 * np.abs(out['Plus_DI'] - out['Minus_DI']) / di_sum
+                out['ADX'][:] = pd.Series(out['DX']).rolling(window=14, min_periods=1).mean().values
+
+                adx_value = out['ADX'][-1]
+                adx_strength = (
+                    "强烈趋势" if adx_value >= 35 else
+                    "趋势" if adx_value >= 25 else
+                    "弱趋势" if adx_value >= 20 else
+                    "无趋势"
+                )
+                adx_color = (
+                    Colors.GREEN + Colors.BOLD if adx_value >= 35 else
+                    Colors.GREEN if adx_value >= 25 else
+                    Colors.YELLOW if adx_value >= 20 else
+                    Colors.GRAY
+                )
 
-            print_colored(f"ADX 计算完成，最后值: {adx_color}{adx_value:.2f} ({adx_strength}){Colors.RESET}",
-                          Colors.INFO)
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算ADX（需要14根K线）", Colors.WARNING)
+                print_colored(f"ADX 计算完成，最后值: {adx_color}{adx_value:.2f} ({adx_strength}){Colors.RESET}",
+                              Colors.INFO)
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算ADX（需要14根K线）", Colors.WARNING)
 
         # 计算CCI
-        if len(df) >= 20:
-            typical_price = (df['high'] + df['low'] + df['close']) / 3
-            sma_tp = typical_price.rolling(window=20, min_periods=1).mean()
-            mean_dev = (typical_price - sma_tp).abs().rolling(window=20, min_periods=1).mean()
-            # 确保不除以零
-            mean_dev_nonzero = mean_dev.replace(0, np.finfo(float).eps)
+        if 'CCI' in groups:
+            if n >= 20:
+                typical_price = (high_s + low_s + close_s) / 3
+                sma_tp = typical_price.rolling(window=20, min_periods=1).mean()
+                mean_dev = (typical_price - sma_tp).abs().rolling(window=20, min_periods=1).mean()
+                # 确保不除以零
+                mean_dev_nonzero = mean_dev.replace(0, eps)
 
-            df['CCI'] = (typical_price - sma_tp) / (0.015 * mean_dev_nonzero)
+                out['CCI'][:] = ((typical_price - sma_tp) / (0.015 * mean_dev_nonzero)).values
 
-            cci_value = df['CCI'].iloc[-1]
-            cci_color = Colors.RED if cci_value > 100 else Colors.GREEN if cci_value < -100 else Colors.RESET
-            cci_state = "超买" if cci_value > 100 else "超卖" if cci_value < -100 else "中性"
+                cci_value = out['CCI'][-1]
+                cci_color = Colors.RED if cci_value > 100 else Colors.GREEN if cci_value < -100 else Colors.RESET
+                cci_state = "超买" if cci_value > 100 else "超卖" if cci_value < -100 else "中性"
 
-            print_colored(f"CCI 计算完成，最后值: {cci_color}{cci_value:.2f} ({cci_state}){Colors.RESET}", Colors.INFO)
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算CCI（需要20根K线）", Colors.WARNING)
+                print_colored(f"CCI 计算完成，最后值: {cci_color}{cci_value:.2f} ({cci_state}){Colors.RESET}", Colors.INFO)
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算CCI（需要20根K线）", Colors.WARNING)
 
-        # 计算超级趋势指标
-        if len(df) >= 14 and 'ATR' in df.columns:
-            df = calculate_supertrend(df)
-        else:
-            print_colored(f"⚠️ 数据不足或缺失ATR，无法计算Supertrend", Colors.WARNING)
+        # 计算超级趋势指标（沿用流水线中的ATR，只计算基础参数组）
+        if 'Supertrend' in groups:
+            if n >= 14:
+                st_values, dir_values, stability_values, _ = supertrend_kernel(
+                    high, low, close, out['ATR'], multiplier=3.0, min_stable_periods=3
+                )
+                out['Supertrend'][:] = st_values
+                out['Supertrend_Direction'][:] = dir_values
+                # 稳定性列 - 输入已有时保留前3行的原值
+                if 'Supertrend_Stability' in df.columns:
+                    stability_values[:3] = out['Supertrend_Stability'][:3]
+                out['Supertrend_Stability'][:] = stability_values
+                out['Supertrend_Strength'][:] = np.abs(close - st_values) / out['ATR']
+            else:
+                print_colored(f"⚠️ 数据不足或缺失ATR，无法计算Supertrend", Colors.WARNING)
 
         # 计算SMMA
-        if len(df) >= 60:
-            df = calculate_smma(df, period=60)
-            log_indicator(None, "SMMA60", df['SMMA60'].iloc[-1])
-        else:
-            print_colored(f"⚠️ 数据不足（{len(df)}根K线），无法计算SMMA60（需要60根K线）", Colors.WARNING)
+        if 'SMMA60' in groups:
+            if n >= 60:
+                out['SMMA60'][:] = _smma_values(close, 60)
+                print_colored(f"计算SMMA60完成，最新值: {out['SMMA60'][-1]:.4f}", Colors.INFO)
+                log_indicator(None, "SMMA60", out['SMMA60'][-1])
+            else:
+                print_colored(f"⚠️ 数据不足（{n}根K线），无法计算SMMA60（需要60根K线）", Colors.WARNING)
 
         # 计算市场情绪和恐慌指数
-        has_btc_data = btc_df is not None and not btc_df.empty and len(btc_df) >= 6
-        if has_btc_data:
-            btc_change = (btc_df['close'].iloc[-1] - btc_df['close'].iloc[-6]) / btc_df['close'].iloc[-6] * 100
-            print_colored(f"BTC变化率: {Colors.GREEN if btc_change > 0 else Colors.RED}{btc_change:.2f}%{Colors.RESET}",
-                          Colors.INFO)
-
-            if btc_change > 2.0:
-                df['Market_Sentiment'] = 1  # 强烈看多
-                sentiment_desc = "强烈看多"
-                sentiment_color = Colors.GREEN + Colors.BOLD
-            elif btc_change > 1.0:
-                df['Market_Sentiment'] = 0.8  # 看多
-                sentiment_desc = "看多"
-                sentiment_color = Colors.GREEN
-            elif btc_change > 0.2:
-                df['Market_Sentiment'] = 0.6  # 轻微看多
-                sentiment_desc = "轻微看多"
-                sentiment_color = Colors.GREEN
-            elif btc_change < -2.0:
-                df['Market_Sentiment'] = -1  # 强烈看空
-                sentiment_desc = "强烈看空"
-                sentiment_color = Colors.RED + Colors.BOLD
-            elif btc_change < -1.0:
-                df['Market_Sentiment'] = -0.8  # 看空
-                sentiment_desc = "看空"
-                sentiment_color = Colors.RED
-            elif btc_change < -0.2:
-                df['Market_Sentiment'] = -0.6  # 轻微看空
-                sentiment_desc = "轻微看空"
-                sentiment_color = Colors.RED
-            else:
-                df['Market_Sentiment'] = 0  # 中性
-                sentiment_desc = "中性"
-                sentiment_color = Colors.RESET
+        if 'Sentiment' in groups:
+            atr_s = pd.Series(out['ATR'])
+            has_btc_data = btc_df is not None and not btc_df.empty and len(btc_df) >= 6
+            if has_btc_data:
+                btc_change = (btc_df['close'].iloc[-1] - btc_df['close'].iloc[-6]) / btc_df['close'].iloc[-6] * 100
+                print_colored(f"BTC变化率: {Colors.GREEN if btc_change > 0 else Colors.RED}{btc_change:.2f}%{Colors.RESET}",
+                              Colors.INFO)
+
+                if btc_change > 2.0:
+                    sentiment = 1  # 强烈看多
+                    sentiment_desc = "强烈看多"
+                    sentiment_color = Colors.GREEN + Colors.BOLD
+                elif btc_change > 1.0:
+                    sentiment = 0.8  # 看多
+                    sentiment_desc = "看多"
+                    sentiment_color = Colors.GREEN
+                elif btc_change > 0.2:
+                    sentiment = 0.6  # 轻微看多
+                    sentiment_desc = "轻微看多"
+                    sentiment_color = Colors.GREEN
+                elif btc_change < -2.0:
+                    sentiment = -1  # 强烈看空
+                    sentiment_desc = "强烈看空"
+                    sentiment_color = Colors.RED + Colors.BOLD
+                elif btc_change < -1.0:
+                    sentiment = -0.8  # 看空
+                    sentiment_desc = "看空"
+                    sentiment_color = Colors.RED
+                elif btc_change < -0.2:
+                    sentiment = -0.6  # 轻微看空
+                    sentiment_desc = "轻微看空"
+                    sentiment_color = Colors.RED
+                else:
+                    sentiment = 0  # 中性
+                    sentiment_desc = "中性"
+                    sentiment_color = Colors.RESET
+                out['Market_Sentiment'][:] = sentiment
 
-            print_colored(
-                f"市场情绪: {sentiment_color}{sentiment_desc}{Colors.RESET} ({df['Market_Sentiment'].iloc[-1]:.1f})",
-                Colors.INFO)
+                print_colored(
+                    f"市场情绪: {sentiment_color}{sentiment_desc}{Colors.RESET} ({sentiment:.1f})",
+                    Colors.INFO)
 
-            # 计算恐慌指数 - 考虑BTC波动和当前ATR
-            if 'ATR' in df.columns:
-                atr_mean = df['ATR'].mean()
-                atr_ratio = df['ATR'].iloc[-1] / atr_mean if atr_mean != 0 else 1
+                # 计算恐慌指数 - 考虑BTC波动和当前ATR
+                atr_mean = atr_s.mean()
+                atr_ratio = atr_s.iloc[-1] / atr_mean if atr_mean != 0 else 1
 
                 # 综合BTC波动和ATR比率计算恐慌指数
                 btc_factor = abs(btc_change) / 2  # BTC波动贡献
                 atr_factor = (atr_ratio - 1) * 5 if atr_ratio > 1 else 0  # ATR贡献
 
                 panic_index = min(10, max(0, 5 + btc_factor + atr_factor))
-                df['Panic_Index'] = panic_index
+                out['Panic_Index'][:] = panic_index
 
                 panic_color = (
                     Colors.RED + Colors.BOLD if panic_index > 7 else
@@ -1536,17 +1691,13 @@ def calculate_optimized_indicators(df: pd.DataFrame, btc_df=None):
                     Colors.INFO
                 )
             else:
-                df['Panic_Index'] = 5  # 默认中等恐慌
-                print_colored(f"恐慌指数: 5.00/10 (默认值，无ATR数据)", Colors.INFO)
-        else:
-            # 仅使用ATR计算恐慌指数
-            if 'ATR' in df.columns:
-                atr_mean = df['ATR'].rolling(window=20).mean().iloc[-1]
-                atr_ratio = df['ATR'].iloc[-1] / atr_mean if atr_mean != 0 else 1
+                # 仅使用ATR计算恐慌指数
+                atr_mean = atr_s.rolling(window=20).mean().iloc[-1]
+                atr_ratio = atr_s.iloc[-1] / atr_mean if atr_mean != 0 else 1
 
                 panic_index = min(10, (1 + (atr_ratio - 1) * 5)) if atr_ratio > 1 else 3
-                df['Market_Sentiment'] = 0  # 无BTC数据，默认中性
-                df['Panic_Index'] = panic_index
+                out['Market_Sentiment'][:] = 0  # 无BTC数据，默认中性
+                out['Panic_Index'][:] = panic_index
 
                 panic_color = (
                     Colors.RED + Colors.BOLD if panic_index > 7 else
@@ -1571,33 +1722,37 @@ def calculate_optimized_indicators(df: pd.DataFrame, btc_df=None):
                     f"[仅基于ATR比率:{atr_ratio:.2f}]",
                     Colors.INFO
                 )
-            else:
-                df['Market_Sentiment'] = 0
-                df['Panic_Index'] = 5
-                print_colored(f"市场情绪: 中性 (0.0，无BTC数据)", Colors.INFO)
-                print_colored(f"恐慌指数: 5.00/10 (默认值，无ATR和BTC数据)", Colors.INFO)
 
         # 检查关键指标是否计算成功
-        missing_critical = [indicator for indicator in critical_indicators if
-                            indicator not in df.columns or df[indicator].isna().all()]
+        missing_critical = [indicator for indicator in critical_indicators if np.isnan(out[indicator]).all()]
         if missing_critical:
             print_colored(f"❌ 关键指标计算失败: {missing_critical}", Colors.ERROR)
             indicators_logger.error(f"关键指标 {missing_critical} 计算失败，停止计算")
-            return pd.DataFrame()
+            return failed
 
         # 填充缺失的指标
         for col in all_indicators:
-            if col not in df.columns or df[col].isna().all():
-                df[col] = 0.0
+            if np.isnan(out[col]).all():
+                out[col][:] = 0.0
                 indicators_logger.warning(f"{col} 计算失败，填充默认值")
 
         print_colored(f"✅ 所有指标计算完成，总计 {len(all_indicators)} 个指标", Colors.GREEN + Colors.BOLD)
-        return df
+        if return_arrays:
+            return out
+
+        # 一次性拼接指标矩阵（F序矩阵转置后正好是pandas需要的块布局，不再复制）
+        indicator_frame = pd.DataFrame(block, index=df.index, columns=names, copy=False)
+        for name in INTEGER_COLUMNS:
+            if name in out and np.array_equal(out[name], np.round(out[name])):
+                indicator_frame[name] = out[name].astype(np.int64)
+        base = df.drop(columns=[name for name in names if name in df.columns])
+        return pd.concat([base, indicator_frame], axis=1)
 
     except Exception as e:
         print_colored(f"❌ 计算优化指标失败: {e}", Colors.ERROR)
         indicators_logger.error(f"计算优化指标失败: {e}")
-        return pd.DataFrame()
+        return failed
+
 
 def wait_for_entry_timing(self, symbol, score, amount):
         """
@@ -1623,15 +1778,16 @@ def wait_for_entry_timing(self, symbol, score, amount):
 
         try:
             # 获取当前价格
-            ticker = self.client.futures_symbol_ticker(symbol=symbol)
+            ticker = get_price_snapshot(self.client).ticker(symbol)
             current_price = float(ticker['price'])
 
             # 趋势分析
             trend, duration, trend_info = get_smc_trend_and_duration(df, None, self.logger)
 
             # 关键判断因素1：价格是否在支撑位附近
-            swing_highs, swing_lows = find_swing_points(df)
-            fib_levels = calculate_fibonacci_retracements(df)
+            swings = detect_swing_points(df)
+            swing_highs, swing_lows = find_swing_points(df, swings=swings)
+            fib_levels = calculate_fibonacci_retracements(df, swings=swings)
 
             # 支撑位检测
             is_near_support = False
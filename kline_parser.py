@@ -0,0 +1,76 @@
+"""
+K线数据解析模块
+把 futures_klines 返回的原始列表（数字字符串）一次性转换为类型化的NumPy数组或DataFrame，
+替代各处重复的 12列DataFrame + pd.to_numeric + pd.to_datetime 转换
+"""
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# futures_klines 返回的字段顺序
+KLINE_COLUMNS = [
+    'time', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_asset_volume', 'trades', 'taker_base_vol', 'taker_quote_vol', 'ignore'
+]
+
+# 默认只解析指标计算用到的字段
+DEFAULT_FIELDS = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+# 以int64保存的字段，其余为float64
+INT_FIELDS = {'time', 'close_time', 'trades'}
+
+_POSITIONS = {name: i for i, name in enumerate(KLINE_COLUMNS)}
+
+
+def parse_klines_arrays(klines: List[List[Any]], fields: Sequence[str] = DEFAULT_FIELDS) -> Dict[str, np.ndarray]:
+    """
+    把原始K线列表转换为按字段的类型化数组
+
+    参数:
+        klines: futures_klines 的返回值
+        fields: 需要的字段，默认不含 close_time/ignore 等未使用字段
+
+    返回:
+        columns: {字段: 数组}，时间/成交笔数为int64（时间单位毫秒），其余为float64；
+                 无法解析的数值按0处理（与 pd.to_numeric(errors='coerce').fillna(0.0) 一致）
+    """
+    positions = [_POSITIONS[name] for name in fields]
+    width = max(positions) + 1 if positions else 0
+    if not klines:
+        return {name: np.empty(0, dtype=np.int64 if name in INT_FIELDS else np.float64) for name in fields}
+
+    try:
+        # 一次转换整个矩阵，NumPy直接解析数字字符串
+        raw = np.array([k[:width] for k in klines], dtype=np.float64)
+    except (ValueError, TypeError):
+        raw = np.column_stack([
+            pd.to_numeric(pd.Series([k[i] for k in klines]), errors='coerce').fillna(0.0).values
+            for i in range(width)
+        ])
+
+    columns = {}
+    for name, position in zip(fields, positions):
+        values = raw[:, position]
+        columns[name] = values.astype(np.int64) if name in INT_FIELDS else np.ascontiguousarray(values)
+    return columns
+
+
+def parse_klines(klines: List[List[Any]], fields: Sequence[str] = DEFAULT_FIELDS,
+                 time_as_datetime: bool = True) -> pd.DataFrame:
+    """
+    把原始K线列表转换为DataFrame
+
+    参数:
+        klines: futures_klines 的返回值
+        fields: 需要的字段
+        time_as_datetime: 是否把time列转换为datetime
+
+    返回:
+        df: 按fields顺序的K线DataFrame
+    """
+    df = pd.DataFrame(parse_klines_arrays(klines, fields), columns=list(fields))
+    if time_as_datetime and 'time' in df.columns:
+        df['time'] = pd.to_datetime(df['time'], unit='ms')
+    return df
@@ -11,6 +11,8 @@ import requests  # 确保 requests 已导入
 from logger_setup import get_logger  #  确保正确导入
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from trade_module import get_max_leverage
+from market_snapshot import get_price_snapshot
+from api_scheduler import create_client
 from concurrent.futures import ThreadPoolExecutor, as_completed
 #有好多重复的引入乱乱的:d
 #这里是存放主要东西的地方API也要在这里输入
@@ -61,7 +63,7 @@ class USDCTradeBot:
     def __init__(self, api_key: str, api_secret: str, config: dict):
         print("初始化 USDCTradeBot...")
         self.config = config
-        self.client = Client(api_key, api_secret)
+        self.client = create_client(api_key, api_secret)  # 所有请求经过共享的权重调度器
         self.logger = get_logger()
         self.trade_cycle = 0
         self.open_positions = []
@@ -127,7 +129,7 @@ class USDCTradeBot:
 
     def get_grok_suggestion(self, symbol, df_ind):
         latest = df_ind.iloc[-1]
-        current_data = self.client.futures_symbol_ticker(symbol=symbol)
+        current_data = get_price_snapshot(self.client).ticker(symbol)
         current_price = float(current_data['price']) if current_data else None
         predicted = self.predict_short_term_price(symbol, horizon_minutes=60)
         signal = self.generate_trade_signal(df_ind)
@@ -260,7 +262,7 @@ class USDCTradeBot:
             best_candidates.append((symbol, final_score))
 
             # 获取最新市场价格
-            current_data = self.client.futures_symbol_ticker(symbol=symbol)
+            current_data = get_price_snapshot(self.client).ticker(symbol)
             current_price = float(current_data['price']) if current_data else None
             if current_price is None:
                 continue
@@ -314,7 +316,7 @@ class USDCTradeBot:
         print("【持仓管理】")
         self.load_existing_positions()
         for pos in self.open_positions:
-            current_data = self.client.futures_symbol_ticker(symbol=pos["symbol"])
+            current_data = get_price_snapshot(self.client).ticker(pos["symbol"])
             current_price = float(current_data['price']) if current_data else None
             if current_price is None:
                 continue
@@ -372,7 +374,7 @@ class USDCTradeBot:
             symbol = pos["symbol"]
 
             if abs(amt) > 0:
-                current_data = self.client.futures_symbol_ticker(symbol=symbol)
+                current_data = get_price_snapshot(self.client).ticker(symbol)
                 current_price = float(current_data['price']) if current_data else None
                 predicted = self.predict_short_term_price(symbol, horizon_minutes=60)
 
@@ -454,7 +456,7 @@ class USDCTradeBot:
         return predicted_price
 
     def record_prediction_error(self, symbol: str):
-        current_data = self.client.futures_symbol_ticker(symbol=symbol)
+        current_data = get_price_snapshot(self.client).ticker(symbol)
         current = float(current_data['price']) if current_data else None
         raw_pred = self._raw_predict(symbol)
         if current is None or raw_pred is None:
@@ -512,20 +514,14 @@ class USDCTradeBot:
         """
         try:
             order_amount = max(amount, self.config["MIN_NOTIONAL"])
-            ticker = self.client.futures_symbol_ticker(symbol=symbol)
+            ticker = get_price_snapshot(self.client).ticker(symbol)
             price = float(ticker['price'])
             raw_qty = order_amount / price
 
             from trade_module import get_precise_quantity, format_quantity, get_max_leverage
-            info = self.client.futures_exchange_info()
-            step_size = None
-            for item in info['symbols']:
-                if item['symbol'] == symbol:
-                    for f in item['filters']:
-                        if f['filterType'] == 'LOT_SIZE':
-                            step_size = float(f['stepSize'])
-                            break
-                    break
+            from exchange_metadata import get_exchange_metadata
+            meta = get_exchange_metadata(self.client).get(symbol)
+            step_size = meta.step_size if meta is not None else None
             if step_size is None:
                 print(f"❌ 未能获取 {symbol} 的步长信息")
                 return False
@@ -603,7 +599,7 @@ class USDCTradeBot:
 
     def add_to_position(self, symbol: str, side: str, amount: float, leverage: int = 3) -> bool:
         try:
-            ticker = self.client.futures_symbol_ticker(symbol=symbol)
+            ticker = get_price_snapshot(self.client).ticker(symbol)
             price = float(ticker['price'])
             quantity = round(amount / price, 6)
             self.client.futures_change_leverage(symbol=symbol, leverage=leverage)
@@ -702,7 +698,7 @@ class USDCTradeBot:
                     adv_score = calculate_advanced_score(df)
                     final_score = adjusted_score + anomaly_score + adv_score
                     final_score = self.adjust_score_with_garch(symbol, final_score)
-                    current_data = self.client.futures_symbol_ticker(symbol=symbol)
+                    current_data = get_price_snapshot(self.client).ticker(symbol)
                     current_price = float(current_data['price']) if current_data else None
                     predicted = self.predict_short_term_price(symbol, horizon_minutes=60)
                     if current_price is None or predicted is None:
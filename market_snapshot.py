@@ -0,0 +1,280 @@
+"""
+市场快照模块
+一次请求获取全部交易对的最新价格，在有效期内为所有调用方提供同一份带时间戳的价格快照，
+替代各处按交易对逐个调用 futures_symbol_ticker；
+资金费率/标记价格同样由一次全量 premium index 请求定时刷新，替代质量评分中逐个调用 futures_mark_price
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config import CONFIG
+from logger_utils import Colors, print_colored
+
+
+class PriceSnapshot:
+    """
+    全交易对价格快照
+
+    快照超过 max_age 秒后，下一次查询会触发一次全量刷新（并发查询只刷新一次）；
+    快照中没有的交易对退回单独查询，并补入当前快照。
+    刷新失败后 retry_interval 秒内不再重试全量刷新；快照超过 stale_limit 秒后不再使用，
+    每次查询改为单独请求该交易对（与原逐个查询的行为相同，失败时 ticker 抛出异常）
+    """
+
+    def __init__(self, client, max_age: float = 2.0, stale_limit: float = 10.0, retry_interval: float = 5.0):
+        """
+        参数:
+            client: Binance客户端
+            max_age: 快照有效期（秒）
+            stale_limit: 快照可以使用的最大时长（秒），刷新失败时旧快照最多使用到此时长
+            retry_interval: 全量刷新失败后的重试间隔（秒）
+        """
+        self.client = client
+        self.max_age = max_age
+        self.stale_limit = stale_limit
+        self.retry_interval = retry_interval
+        self._prices: Dict[str, float] = {}
+        self._timestamp = 0.0
+        self._failed_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        # 统计: 全量刷新次数、刷新失败次数、单独查询次数、查询次数
+        self.refreshes = 0
+        self.failures = 0
+        self.single_requests = 0
+        self.lookups = 0
+
+    def refresh(self) -> bool:
+        """一次请求获取全部交易对价格，整体替换快照；失败时保留旧快照（超过 stale_limit 后不再使用）"""
+        try:
+            tickers = self.client.futures_symbol_ticker()
+            prices = {item['symbol']: float(item['price']) for item in tickers}
+        except Exception as e:
+            print_colored(f"⚠️ 价格快照刷新失败: {e}", Colors.WARNING)
+            with self._lock:
+                self._failed_at = time.time()  # 避免失败后每次查询都重试全量刷新
+                self.failures += 1
+            return False
+        with self._lock:
+            self._prices = prices
+            self._timestamp = time.time()
+            self.refreshes += 1
+        return True
+
+    def _ensure_fresh(self, max_age: Optional[float]) -> None:
+        max_age = self.max_age if max_age is None else max_age
+        if time.time() - self._timestamp < max_age or time.time() - self._failed_at < self.retry_interval:
+            return
+        with self._refresh_lock:
+            # 等待锁期间其他线程可能已经刷新（或刷新失败）
+            now = time.time()
+            if now - self._timestamp >= max_age and now - self._failed_at >= self.retry_interval:
+                self.refresh()
+
+    def snapshot(self, max_age: Optional[float] = None) -> Tuple[Dict[str, float], float]:
+        """
+        获取完整快照
+
+        参数:
+            max_age: 可接受的快照时长（秒），默认使用实例的有效期
+
+        返回:
+            (价格字典, 快照时间戳)，价格字典是只读使用的共享对象；快照超过 stale_limit 时为 ({}, 0.0)
+        """
+        self._ensure_fresh(max_age)
+        with self._lock:
+            if time.time() - self._timestamp > self.stale_limit:
+                return {}, 0.0
+            return self._prices, self._timestamp
+
+    def _get_price(self, symbol: str, max_age: Optional[float]) -> Tuple[Optional[float], float]:
+        """查询价格，返回 (价格, 价格时间戳)"""
+        self._ensure_fresh(max_age)
+        with self._lock:
+            self.lookups += 1
+            usable = time.time() - self._timestamp <= self.stale_limit
+            price = self._prices.get(symbol) if usable else None
+            timestamp = self._timestamp
+        if price is not None:
+            return price, timestamp
+        try:
+            price = float(self.client.futures_symbol_ticker(symbol=symbol)['price'])
+        except Exception as e:
+            print_colored(f"⚠️ 获取{symbol}价格失败: {e}", Colors.WARNING)
+            return None, 0.0
+        with self._lock:
+            self.single_requests += 1
+            if usable:
+                # 只补入仍可使用的快照，过期快照整体等待下一次全量刷新
+                self._prices = dict(self._prices)
+                self._prices[symbol] = price
+        return price, time.time()
+
+    def get_price(self, symbol: str, max_age: Optional[float] = None) -> Optional[float]:
+        """查询交易对最新价格，快照过期（超过 stale_limit）时单独查询，单独查询也失败时返回None"""
+        return self._get_price(symbol, max_age)[0]
+
+    def ticker(self, symbol: str, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        与 futures_symbol_ticker(symbol=...) 返回格式相同的价格字典，便于直接替换原调用
+
+        返回:
+            {'symbol': 交易对, 'price': 价格字符串, 'time': 快照时间（毫秒）}；无法获取价格时抛出异常
+        """
+        price, timestamp = self._get_price(symbol, max_age)
+        if price is None:
+            raise ValueError(f"无法获取{symbol}的价格")
+        return {'symbol': symbol, 'price': repr(price), 'time': int(timestamp * 1000)}
+
+    def stats(self) -> Dict[str, Any]:
+        """刷新次数、失败次数、单独查询次数、查询次数和快照时长"""
+        with self._lock:
+            return {
+                "refreshes": self.refreshes,
+                "failures": self.failures,
+                "single_requests": self.single_requests,
+                "lookups": self.lookups,
+                "symbols": len(self._prices),
+                "age_s": time.time() - self._timestamp if self._timestamp else None
+            }
+
+
+class FundingFeed:
+    """
+    全交易对资金费率/标记价格
+
+    资金费率每8小时结算一次，数据在 refresh_interval 秒内视为有效；
+    超过有效期或越过下一次结算时间后，下一次查询触发一次全量刷新（并发查询只刷新一次）
+    """
+
+    def __init__(self, client, refresh_interval: float = 300.0):
+        """
+        参数:
+            client: Binance客户端
+            refresh_interval: 刷新间隔（秒）
+        """
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[str, Dict[str, float]] = {}
+        self._timestamp = 0.0
+        self._next_funding_ms = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        # 统计: 全量刷新次数、查询次数、未找到的交易对次数
+        self.refreshes = 0
+        self.lookups = 0
+        self.misses = 0
+
+    def refresh(self) -> bool:
+        """一次请求获取全部交易对的资金费率和标记价格，整体替换；失败时保留旧数据"""
+        try:
+            items = self.client.futures_mark_price()
+            if isinstance(items, dict):  # 部分客户端版本对单个结果不返回列表
+                items = [items]
+            entries = {
+                item['symbol']: {
+                    'funding_rate': float(item.get('lastFundingRate') or 0.0),
+                    'mark_price': float(item['markPrice']),
+                    'index_price': float(item.get('indexPrice') or 0.0),
+                    'next_funding_time': int(item.get('nextFundingTime') or 0)
+                }
+                for item in items
+            }
+        except Exception as e:
+            print_colored(f"⚠️ 资金费率刷新失败: {e}", Colors.WARNING)
+            self._timestamp = time.time()  # 避免失败后每次查询都重试
+            return False
+        now = time.time()
+        # 只看尚未到达的结算时间：结算中或已下架的合约可能报告过去的时间
+        next_times = [entry['next_funding_time'] for entry in entries.values()
+                      if entry['next_funding_time'] > now * 1000]
+        with self._lock:
+            self._entries = entries
+            self._timestamp = now
+            self._next_funding_ms = min(next_times) if next_times else 0
+            self.refreshes += 1
+        return True
+
+    def _is_stale(self) -> bool:
+        now = time.time()
+        if now - self._timestamp >= self.refresh_interval:
+            return True
+        # 上次刷新之后越过了结算时间，lastFundingRate 已经变化（失败后的时间戳更新同样推迟重试）
+        return self._timestamp * 1000 < self._next_funding_ms <= now * 1000
+
+    def _ensure_fresh(self) -> None:
+        if not self._is_stale():
+            return
+        with self._refresh_lock:
+            if self._is_stale():
+                self.refresh()
+
+    def get(self, symbol: str) -> Optional[Dict[str, float]]:
+        """
+        查询交易对的资金费率数据
+
+        返回:
+            {'funding_rate', 'mark_price', 'index_price', 'next_funding_time'}，未知交易对返回None
+        """
+        self._ensure_fresh()
+        with self._lock:
+            self.lookups += 1
+            entry = self._entries.get(symbol)
+            if entry is None:
+                self.misses += 1
+            return entry
+
+    def get_funding_rate(self, symbol: str) -> Optional[float]:
+        """交易对最近一次的资金费率，未知时为None"""
+        entry = self.get(symbol)
+        return entry['funding_rate'] if entry is not None else None
+
+    def get_mark_price(self, symbol: str) -> Optional[float]:
+        """交易对的标记价格，未知时为None"""
+        entry = self.get(symbol)
+        return entry['mark_price'] if entry is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """刷新次数、查询次数、未找到次数和数据时长"""
+        with self._lock:
+            return {
+                "refreshes": self.refreshes,
+                "lookups": self.lookups,
+                "misses": self.misses,
+                "symbols": len(self._entries),
+                "age_s": time.time() - self._timestamp if self._timestamp else None
+            }
+
+
+_snapshot: Optional[PriceSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_price_snapshot(client=None) -> PriceSnapshot:
+    """获取进程内共享的价格快照；传入与当前不同的客户端（例如重连后新建的客户端）时改用新客户端"""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = PriceSnapshot(client, CONFIG.get("PRICE_SNAPSHOT_MAX_AGE", 2.0),
+                                      CONFIG.get("PRICE_SNAPSHOT_STALE_LIMIT", 10.0),
+                                      CONFIG.get("PRICE_SNAPSHOT_RETRY_INTERVAL", 5.0))
+        elif client is not None and client is not _snapshot.client:
+            _snapshot.client = client
+        return _snapshot
+
+
+_funding_feed: Optional[FundingFeed] = None
+_funding_feed_lock = threading.Lock()
+
+
+def get_funding_feed(client=None) -> FundingFeed:
+    """获取进程内共享的资金费率数据；传入与当前不同的客户端（例如重连后新建的客户端）时改用新客户端"""
+    global _funding_feed
+    with _funding_feed_lock:
+        if _funding_feed is None:
+            _funding_feed = FundingFeed(client, CONFIG.get("FUNDING_FEED_REFRESH", 300))
+        elif client is not None and client is not _funding_feed.client:
+            _funding_feed.client = client
+        return _funding_feed
@@ -0,0 +1,596 @@
+"""
+本地模拟交易所模块
+实现本项目用到的 Binance 期货 REST 接口子集（K线、价格、24小时行情、标记价格/资金费率、交易规则、杠杆分层、
+持仓、余额、下单、调整杠杆），K线由确定性的合成价格或本地K线存储中的录制数据回放生成，
+可配置延迟、错误率和请求权重限流，用于不需要API密钥的离线负载和延迟测试
+
+把 CONFIG["FUTURES_BASE_URL"] 设置为模拟交易所地址后，api_scheduler.create_client 创建的客户端
+（EnhancedTradingBot、CryptoCurrencyScanner 以及它们传给 MultiTimeframeCoordinator 的客户端）
+和异步行情客户端都会请求模拟交易所
+
+命令行用法:
+    python mock_exchange.py --port 8800 --symbols 500 --latency 0.02 --error-rate 0.01
+"""
+
+import itertools
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from api_scheduler import request_weight
+from config import CONFIG
+from logger_utils import Colors, print_colored
+
+_INTERVAL_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+_PATH_PATTERN = re.compile(r'^/(api|fapi)/v\d+/(.+)$')
+
+
+def _interval_ms(interval: str) -> int:
+    return int(interval[:-1]) * _INTERVAL_MS[interval[-1]]
+
+
+class ExchangeError(Exception):
+    """按 Binance 格式返回的错误响应"""
+
+    def __init__(self, status: int, code: int, msg: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(msg)
+        self.status = status
+        self.code = code
+        self.msg = msg
+        self.headers = headers or {}
+
+
+class MockExchange:
+    """模拟交易所的行情、账户和订单状态"""
+
+    def __init__(self, symbols: Optional[Sequence[str]] = None, symbol_count: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 weight_limit: int = 2400, history_days: int = 60, recorded_root: Optional[str] = None,
+                 balance: float = 10000.0, seed: int = 42):
+        """
+        参数:
+            symbols: 交易对列表，默认取 CONFIG["TRADE_PAIRS"]
+            symbol_count: 额外生成的合成交易对数量（MOCK000USDT...），用于大规模扫描测试
+            latency: 每个请求的固定延迟（秒）
+            jitter: 随机附加延迟的上限（秒）
+            error_rate: 随机返回500错误的概率
+            rate_limit_rate: 随机返回429的概率（在真实的权重限流之外）
+            weight_limit: 每分钟请求权重上限，超过后返回429和 Retry-After
+            history_days: 合成K线的历史长度（天）
+            recorded_root: 录制数据所在的本地K线存储目录，有数据的 (交易对, 周期) 按录制数据回放
+            balance: 初始 USDT/USDC 余额
+            seed: 随机数种子（延迟、错误注入）
+        """
+        symbols = list(symbols if symbols is not None else CONFIG.get("TRADE_PAIRS", []))
+        symbols += [f"MOCK{i:03d}USDT" for i in range(symbol_count)]
+        self.symbols = list(dict.fromkeys(symbols))
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.weight_limit = weight_limit
+        self.history_ms = history_days * 86_400_000
+        self._recorded = None
+        if recorded_root:
+            from candle_store import CandleStore
+            self._recorded = CandleStore(root=recorded_root)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_id = 0
+        self._window_used = 0
+        self._order_ids = itertools.count(1)
+        self._balances = {"USDT": balance, "USDC": balance}
+        self._leverage: Dict[str, int] = {}
+        self._positions: Dict[Tuple[str, str], Dict[str, float]] = {}  # (交易对, 持仓方向) -> 数量/开仓价
+        self._open_orders: Dict[int, Dict[str, Any]] = {}
+        self.dual_side = True
+        # 每个交易对的基础价格和相位（由交易对名称确定，重启后一致）
+        self._params = {}
+        for symbol in self.symbols:
+            h = zlib.crc32(symbol.encode())
+            base = 10 ** ((h % 500) / 100.0 - 1)  # 0.1 ~ 1000
+            self._params[symbol] = (base, (h >> 9) % 628 / 100.0)
+        self._routes = self._build_routes()
+        # 统计
+        self.requests = 0
+        self.injected_errors = 0
+        self.rate_limited = 0
+        self.orders = 0
+
+    # ------------------------------------------------------------------ 行情
+
+    def _check_symbol(self, symbol: Optional[str]) -> str:
+        if not symbol or symbol not in self._params:
+            raise ExchangeError(400, -1121, "Invalid symbol.")
+        return symbol
+
+    def _tick(self, symbol: str) -> float:
+        base = self._params[symbol][0]
+        return 10 ** (math.floor(math.log10(base)) - 4)
+
+    def price_at(self, symbol: str, ms: int) -> float:
+        """合成价格：几个不同周期的正弦叠加，同一时刻在所有周期上一致"""
+        base, phase = self._params[symbol]
+        x = ms / 60_000.0
+        price = base * (1 + 0.03 * math.sin(x / 240 + phase) + 0.01 * math.sin(x / 37 + 2 * phase)
+                        + 0.004 * math.sin(x / 5 + 3 * phase))
+        tick = self._tick(symbol)
+        return round(round(price / tick) * tick, 10)
+
+    def _synthetic_bar(self, symbol: str, open_time: int, step: int, now_ms: int) -> List[Any]:
+        close_at = min(open_time + step, now_ms)
+        open_price = self.price_at(symbol, open_time)
+        close_price = self.price_at(symbol, close_at)
+        mid = self.price_at(symbol, (open_time + close_at) // 2)
+        high = round(max(open_price, close_price, mid) * 1.0008, 10)
+        low = round(min(open_price, close_price, mid) * 0.9992, 10)
+        volume = 1000.0 * (1 + 0.5 * math.sin(open_time / 3_600_000.0 + self._params[symbol][1]))
+        volume *= (close_at - open_time) / step
+        return [open_time, repr(open_price), repr(high), repr(low), repr(close_price), f"{volume:.3f}",
+                open_time + step - 1, f"{volume * mid:.2f}", int(volume), f"{volume / 2:.3f}",
+                f"{volume * mid / 2:.2f}", "0"]
+
+    def _recorded_bars(self, symbol: str, interval: str, step: int, now_ms: int, limit: int,
+                       start: Optional[int], end: Optional[int]) -> Optional[List[List[Any]]]:
+        """录制数据平移到当前时间回放：最后一根录制K线对齐为最近一根收盘K线"""
+        if self._recorded is None:
+            return None
+        count = self._recorded.stored_count(symbol, interval)
+        if not count:
+            return None
+        columns = self._recorded.get_arrays(symbol, interval, limit=count, include_open=False, sync=False)
+        times = columns['time']
+        shift = (now_ms - now_ms % step - step) - int(times[-1])
+        lo = int(times.searchsorted(start - shift)) if start is not None else 0
+        hi = int(times.searchsorted(end - shift, side='right')) if end is not None else count
+        lo, hi = (lo, min(hi, lo + limit)) if start is not None else (max(lo, hi - limit), hi)
+        return [[int(times[i]) + shift, repr(float(columns['open'][i])), repr(float(columns['high'][i])),
+                 repr(float(columns['low'][i])), repr(float(columns['close'][i])), repr(float(columns['volume'][i])),
+                 int(times[i]) + shift + step - 1, repr(float(columns['quote_asset_volume'][i])),
+                 int(columns['trades'][i]), repr(float(columns['taker_base_vol'][i])),
+                 repr(float(columns['taker_quote_vol'][i])), "0"] for i in range(lo, hi)]
+
+    def klines(self, symbol: str, interval: str, limit: int = 500, startTime: Optional[int] = None,
+               endTime: Optional[int] = None) -> List[List[Any]]:
+        """与 futures_klines 相同的 startTime/endTime/limit 语义"""
+        self._check_symbol(symbol)
+        step = _interval_ms(interval)
+        limit = max(1, min(int(limit), 1500))
+        now_ms = int(time.time() * 1000)
+        recorded = self._recorded_bars(symbol, interval, step, now_ms, limit, startTime, endTime)
+        if recorded is not None:
+            return recorded
+
+        current_open = now_ms - now_ms % step
+        first_open = current_open - self.history_ms // step * step
+        if startTime is not None:
+            first = max(startTime + (-startTime) % step, first_open)
+            last = current_open if endTime is None else min(current_open, endTime - endTime % step)
+            opens = range(first, min(last, first + (limit - 1) * step) + 1, step)
+        else:
+            last = current_open if endTime is None else min(current_open, endTime - endTime % step)
+            opens = range(max(last - (limit - 1) * step, first_open), last + 1, step)
+        return [self._synthetic_bar(symbol, open_time, step, now_ms) for open_time in opens]
+
+    def last_price(self, symbol: str) -> float:
+        now_ms = int(time.time() * 1000)
+        if self._recorded is not None and self._recorded.stored_count(symbol, "1m"):
+            return float(self.klines(symbol, "1m", limit=1)[-1][4])
+        return self.price_at(symbol, now_ms)
+
+    def _symbols_for(self, params: Dict[str, str]) -> List[str]:
+        return [self._check_symbol(params['symbol'])] if params.get('symbol') else self.symbols
+
+    def _one_or_all(self, params: Dict[str, str], items: List[Any]) -> Any:
+        return items[0] if params.get('symbol') else items
+
+    def ticker_price(self, params: Dict[str, str]) -> Any:
+        now_ms = int(time.time() * 1000)
+        return self._one_or_all(params, [{"symbol": s, "price": repr(self.last_price(s)), "time": now_ms}
+                                         for s in self._symbols_for(params)])
+
+    def ticker_24hr(self, params: Dict[str, str]) -> Any:
+        items = []
+        now_ms = int(time.time() * 1000)
+        for symbol in self._symbols_for(params):
+            last = self.last_price(symbol)
+            open_price = self.price_at(symbol, now_ms - 86_400_000)
+            change = last - open_price
+            items.append({
+                "symbol": symbol, "priceChange": repr(change),
+                "priceChangePercent": f"{change / open_price * 100:.3f}", "lastPrice": repr(last),
+                "openPrice": repr(open_price), "highPrice": repr(max(last, open_price) * 1.01),
+                "lowPrice": repr(min(last, open_price) * 0.99), "volume": "100000.000",
+                "quoteVolume": f"{100000 * last:.2f}", "openTime": now_ms - 86_400_000, "closeTime": now_ms,
+                "count": 10000
+            })
+        return self._one_or_all(params, items)
+
+    def premium_index(self, params: Dict[str, str]) -> Any:
+        now_ms = int(time.time() * 1000)
+        next_funding = now_ms - now_ms % 28_800_000 + 28_800_000
+        items = []
+        for symbol in self._symbols_for(params):
+            mark = self.last_price(symbol)
+            funding = 0.0001 * math.sin(now_ms / 28_800_000.0 + self._params[symbol][1])
+            items.append({"symbol": symbol, "markPrice": repr(mark), "indexPrice": repr(mark),
+                          "lastFundingRate": f"{funding:.8f}", "interestRate": "0.00010000",
+                          "nextFundingTime": next_funding, "time": now_ms})
+        return self._one_or_all(params, items)
+
+    def order_book(self, params: Dict[str, str]) -> Dict[str, Any]:
+        symbol = self._check_symbol(params.get('symbol'))
+        limit = min(int(params.get('limit', 100)), 1000)
+        price, tick = self.last_price(symbol), self._tick(symbol)
+        bids = [[repr(round(price - (i + 1) * tick, 10)), f"{10 + i:.3f}"] for i in range(limit)]
+        asks = [[repr(round(price + (i + 1) * tick, 10)), f"{10 + i:.3f}"] for i in range(limit)]
+        return {"lastUpdateId": int(time.time() * 1000), "bids": bids, "asks": asks}
+
+    def exchange_info(self) -> Dict[str, Any]:
+        symbols = []
+        for symbol in self.symbols:
+            tick = self._tick(symbol)
+            price = self.last_price(symbol)
+            step = 10 ** math.floor(math.log10(max(5.0 / price, 1e-3)))  # 最小数量约值5 USDT
+            quote = "USDC" if symbol.endswith("USDC") else "USDT"
+            symbols.append({
+                "symbol": symbol, "status": "TRADING", "contractType": "PERPETUAL",
+                "baseAsset": symbol[:-len(quote)], "quoteAsset": quote, "marginAsset": quote,
+                "pricePrecision": max(0, -int(math.floor(math.log10(tick)))),
+                "quantityPrecision": max(0, -int(math.floor(math.log10(step)))),
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "tickSize": repr(tick), "minPrice": repr(tick),
+                     "maxPrice": repr(price * 100)},
+                    {"filterType": "LOT_SIZE", "stepSize": repr(step), "minQty": repr(step), "maxQty": "10000000"},
+                    {"filterType": "MARKET_LOT_SIZE", "stepSize": repr(step), "minQty": repr(step),
+                     "maxQty": "1000000"},
+                    {"filterType": "MIN_NOTIONAL", "notional": "5"}
+                ]
+            })
+        return {"timezone": "UTC", "serverTime": int(time.time() * 1000), "rateLimits": [
+            {"rateLimitType": "REQUEST_WEIGHT", "interval": "MINUTE", "intervalNum": 1, "limit": self.weight_limit}
+        ], "symbols": symbols}
+
+    def leverage_brackets(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        brackets = [
+            {"bracket": 1, "initialLeverage": 50, "notionalCap": 50000, "notionalFloor": 0, "maintMarginRatio": 0.01},
+            {"bracket": 2, "initialLeverage": 20, "notionalCap": 250000, "notionalFloor": 50000,
+             "maintMarginRatio": 0.025},
+            {"bracket": 3, "initialLeverage": 10, "notionalCap": 1000000, "notionalFloor": 250000,
+             "maintMarginRatio": 0.05}
+        ]
+        return [{"symbol": s, "brackets": brackets} for s in self._symbols_for(params)]
+
+    # ------------------------------------------------------------------ 账户
+
+    def _position_entry(self, symbol: str, side: str) -> Dict[str, Any]:
+        position = self._positions.get((symbol, side), {"amount": 0.0, "entry": 0.0})
+        mark = self.last_price(symbol)
+        amount = position["amount"]
+        return {
+            "symbol": symbol, "positionAmt": repr(amount), "entryPrice": repr(position["entry"]),
+            "markPrice": repr(mark), "unRealizedProfit": repr((mark - position["entry"]) * amount if amount else 0.0),
+            "liquidationPrice": "0", "leverage": str(self._leverage.get(symbol, 20)), "marginType": "cross",
+            "isolatedMargin": "0", "positionSide": side, "notional": repr(amount * mark),
+            "updateTime": int(time.time() * 1000)
+        }
+
+    def position_information(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        sides = ("LONG", "SHORT") if self.dual_side else ("BOTH",)
+        with self._lock:
+            if params.get('symbol'):
+                symbol = self._check_symbol(params['symbol'])
+                return [self._position_entry(symbol, side) for side in sides]
+            return [self._position_entry(symbol, side) for (symbol, side), position in self._positions.items()
+                    if position["amount"]]
+
+    def _used_margin(self, asset: str) -> float:
+        return sum(abs(p["amount"]) * p["entry"] / self._leverage.get(symbol, 20)
+                   for (symbol, _), p in self._positions.items() if symbol.endswith(asset))
+
+    def account_balance(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{"accountAlias": "mock", "asset": asset, "balance": repr(balance),
+                     "crossWalletBalance": repr(balance), "crossUnPnl": "0",
+                     "availableBalance": repr(balance - self._used_margin(asset)),
+                     "maxWithdrawAmount": repr(balance - self._used_margin(asset)),
+                     "marginAvailable": True, "updateTime": int(time.time() * 1000)}
+                    for asset, balance in self._balances.items()]
+
+    def account(self) -> Dict[str, Any]:
+        balances = self.account_balance()
+        total = sum(float(b["balance"]) for b in balances)
+        available = sum(float(b["availableBalance"]) for b in balances)
+        return {"totalWalletBalance": repr(total), "availableBalance": repr(available),
+                "totalUnrealizedProfit": "0", "assets": [
+                    {"asset": b["asset"], "walletBalance": b["balance"], "availableBalance": b["availableBalance"]}
+                    for b in balances],
+                "positions": self.position_information({})}
+
+    def spot_account(self) -> Dict[str, Any]:
+        return {"balances": [{"asset": asset, "free": repr(balance), "locked": "0"}
+                             for asset, balance in self._balances.items()]}
+
+    def change_leverage(self, params: Dict[str, str]) -> Dict[str, Any]:
+        symbol = self._check_symbol(params.get('symbol'))
+        leverage = int(params.get('leverage', 20))
+        if not 1 <= leverage <= 125:
+            raise ExchangeError(400, -4028, "Leverage is not valid.")
+        with self._lock:
+            self._leverage[symbol] = leverage
+        return {"symbol": symbol, "leverage": leverage, "maxNotionalValue": "1000000"}
+
+    def position_mode(self, params: Dict[str, str], change: bool) -> Dict[str, Any]:
+        if change:
+            self.dual_side = str(params.get('dualSidePosition', 'true')).lower() == 'true'
+            return {"code": 200, "msg": "success"}
+        return {"dualSidePosition": self.dual_side}
+
+    def create_order(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """市价单立即按当前价格成交并更新持仓，其他类型的订单只记录为挂单"""
+        symbol = self._check_symbol(params.get('symbol'))
+        side = params.get('side')
+        order_type = params.get('type', 'MARKET')
+        if side not in ('BUY', 'SELL'):
+            raise ExchangeError(400, -1102, "Mandatory parameter 'side' was not sent.")
+        try:
+            quantity = float(params.get('quantity', 0))
+        except ValueError:
+            raise ExchangeError(400, -1100, "Illegal characters found in parameter 'quantity'.")
+        position_side = params.get('positionSide', 'LONG' if side == 'BUY' else 'SHORT') if self.dual_side \
+            else 'BOTH'
+        if quantity <= 0 and params.get('closePosition') != 'true':
+            raise ExchangeError(400, -4003, "Quantity less than or equal to zero.")
+
+        price = self.last_price(symbol)
+        now_ms = int(time.time() * 1000)
+        with self._lock:
+            order_id = next(self._order_ids)
+            self.orders += 1
+            order = {"orderId": order_id, "symbol": symbol, "status": "NEW", "clientOrderId": f"mock{order_id}",
+                     "price": params.get('price', "0"), "avgPrice": "0", "origQty": repr(quantity),
+                     "executedQty": "0", "cumQuote": "0", "type": order_type, "side": side,
+                     "positionSide": position_side, "stopPrice": params.get('stopPrice', "0"),
+                     "reduceOnly": params.get('reduceOnly') == 'true', "updateTime": now_ms}
+            if order_type != 'MARKET':
+                self._open_orders[order_id] = order
+                return order
+
+            key = (symbol, position_side)
+            position = self._positions.setdefault(key, {"amount": 0.0, "entry": 0.0})
+            signed = quantity if side == 'BUY' else -quantity
+            if params.get('closePosition') == 'true':
+                signed = -position["amount"]
+            new_amount = position["amount"] + signed
+            if position["amount"] * signed >= 0:  # 开仓或加仓
+                total = abs(position["amount"]) + abs(signed)
+                position["entry"] = (abs(position["amount"]) * position["entry"] + abs(signed) * price) / total \
+                    if total else 0.0
+            else:  # 减仓，实现盈亏计入余额
+                closed = min(abs(signed), abs(position["amount"]))
+                pnl = closed * (price - position["entry"]) * (1 if position["amount"] > 0 else -1)
+                asset = "USDC" if symbol.endswith("USDC") else "USDT"
+                self._balances[asset] += pnl
+                if abs(signed) > abs(position["amount"]):
+                    position["entry"] = price
+            position["amount"] = round(new_amount, 10)
+            if position["amount"] == 0:
+                position["entry"] = 0.0
+            order.update({"status": "FILLED", "avgPrice": repr(price), "executedQty": repr(abs(signed)),
+                          "cumQuote": repr(abs(signed) * price)})
+            return order
+
+    def open_orders(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [o for o in self._open_orders.values()
+                    if not params.get('symbol') or o["symbol"] == params['symbol']]
+
+    def cancel_order(self, params: Dict[str, str]) -> Dict[str, Any]:
+        with self._lock:
+            order = self._open_orders.pop(int(params.get('orderId', 0)), None)
+        if order is None:
+            raise ExchangeError(400, -2011, "Unknown order sent.")
+        order["status"] = "CANCELED"
+        return order
+
+    # ------------------------------------------------------------------ 路由与注入
+
+    def _build_routes(self) -> Dict[Tuple[str, str, str], Tuple[str, Callable[[Dict[str, str]], Any]]]:
+        """(HTTP方法, api/fapi, 接口路径) -> (python-binance 方法名, 处理函数)，方法名用于计算请求权重"""
+        return {
+            ('GET', 'api', 'ping'): ('ping', lambda p: {}),
+            ('GET', 'api', 'time'): ('get_server_time', lambda p: {"serverTime": int(time.time() * 1000)}),
+            ('GET', 'api', 'klines'): ('get_klines', lambda p: self.klines(
+                p.get('symbol'), p.get('interval', '1m'), int(p.get('limit', 500)),
+                int(p['startTime']) if 'startTime' in p else None, int(p['endTime']) if 'endTime' in p else None)),
+            ('GET', 'api', 'account'): ('get_account', lambda p: self.spot_account()),
+            ('GET', 'fapi', 'ping'): ('futures_ping', lambda p: {}),
+            ('GET', 'fapi', 'time'): ('futures_time', lambda p: {"serverTime": int(time.time() * 1000)}),
+            ('GET', 'fapi', 'klines'): ('futures_klines', lambda p: self.klines(
+                p.get('symbol'), p.get('interval', '1m'), int(p.get('limit', 500)),
+                int(p['startTime']) if 'startTime' in p else None, int(p['endTime']) if 'endTime' in p else None)),
+            ('GET', 'fapi', 'ticker/price'): ('futures_symbol_ticker', self.ticker_price),
+            ('GET', 'fapi', 'ticker/24hr'): ('futures_ticker', self.ticker_24hr),
+            ('GET', 'fapi', 'premiumIndex'): ('futures_mark_price', self.premium_index),
+            ('GET', 'fapi', 'depth'): ('futures_order_book', self.order_book),
+            ('GET', 'fapi', 'exchangeInfo'): ('futures_exchange_info', lambda p: self.exchange_info()),
+            ('GET', 'fapi', 'leverageBracket'): ('futures_leverage_bracket', self.leverage_brackets),
+            ('GET', 'fapi', 'positionRisk'): ('futures_position_information', self.position_information),
+            ('GET', 'fapi', 'balance'): ('futures_account_balance', lambda p: self.account_balance()),
+            ('GET', 'fapi', 'account'): ('futures_account', lambda p: self.account()),
+            ('GET', 'fapi', 'openOrders'): ('futures_get_open_orders', self.open_orders),
+            ('GET', 'fapi', 'positionSide/dual'): ('futures_get_position_mode',
+                                                   lambda p: self.position_mode(p, False)),
+            ('POST', 'fapi', 'positionSide/dual'): ('futures_change_position_mode',
+                                                    lambda p: self.position_mode(p, True)),
+            ('POST', 'fapi', 'order'): ('futures_create_order', self.create_order),
+            ('DELETE', 'fapi', 'order'): ('futures_cancel_order', self.cancel_order),
+            ('POST', 'fapi', 'leverage'): ('futures_change_leverage', self.change_leverage),
+            ('POST', 'fapi', 'marginType'): ('futures_change_margin_type', lambda p: {"code": 200, "msg": "success"})
+        }
+
+    def _consume_weight(self, weight: int) -> int:
+        """按分钟计数请求权重，超过上限时抛出429，返回本分钟已用权重"""
+        with self._lock:
+            window_id = int(time.time() // 60)
+            if window_id != self._window_id:
+                self._window_id, self._window_used = window_id, 0
+            self._window_used += weight
+            used = self._window_used
+            if used > self.weight_limit:
+                self.rate_limited += 1
+                retry_after = 60 - int(time.time() % 60)
+                raise ExchangeError(429, -1003, "Too many requests; current limit is exceeded.",
+                                    {"Retry-After": str(retry_after), "X-MBX-USED-WEIGHT-1M": str(used)})
+            return used
+
+    def handle(self, http_method: str, path: str, params: Dict[str, str]) -> Tuple[int, Dict[str, str], Any]:
+        """处理一个请求，返回 (状态码, 响应头, 响应数据)"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+            inject_error = self._rng.random() < self.error_rate
+            inject_limit = self._rng.random() < self.rate_limit_rate
+        if delay > 0:
+            time.sleep(delay)
+
+        match = _PATH_PATTERN.match(path)
+        route = self._routes.get((http_method, match.group(1), match.group(2))) if match else None
+        if route is None:
+            return 404, {}, {"code": -5000, "msg": f"Path {path} not found in mock exchange."}
+        method_name, handler = route
+        try:
+            used = self._consume_weight(request_weight(method_name, params))
+            if inject_limit:
+                with self._lock:
+                    self.rate_limited += 1
+                raise ExchangeError(429, -1003, "Too many requests (injected).", {"Retry-After": "1"})
+            if inject_error:
+                with self._lock:
+                    self.injected_errors += 1
+                raise ExchangeError(500, -1001, "Internal error; unable to process your request. (injected)")
+            return 200, {"X-MBX-USED-WEIGHT-1M": str(used)}, handler(params)
+        except ExchangeError as e:
+            return e.status, e.headers, {"code": e.code, "msg": e.msg}
+
+    def stats(self) -> Dict[str, Any]:
+        """请求数、注入的错误数、限流次数、订单数和本分钟已用权重"""
+        with self._lock:
+            return {"requests": self.requests, "injected_errors": self.injected_errors,
+                    "rate_limited": self.rate_limited, "orders": self.orders, "window_used": self._window_used,
+                    "symbols": len(self.symbols)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 保持连接，客户端连接池可以复用
+
+    def _dispatch(self, http_method: str) -> None:
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            params.update(parse_qsl(self.rfile.read(length).decode('utf-8')))
+        status, headers, payload = self.server.exchange.handle(http_method, url.path, params)
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def log_message(self, format, *args):
+        pass  # 不输出每个请求的访问日志
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # 数百个并发连接时避免连接被拒绝后的重试等待
+
+
+class MockExchangeServer:
+    """在后台线程中运行的模拟交易所HTTP服务"""
+
+    def __init__(self, exchange: Optional[MockExchange] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        参数:
+            exchange: 模拟交易所状态，默认使用 MockExchange()
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+        """
+        self.exchange = exchange or MockExchange()
+        self._server = _Server((host, port), _Handler)
+        self._server.exchange = self.exchange
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """REST地址，用作 CONFIG["FUTURES_BASE_URL"]"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockExchangeServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-exchange", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='本地模拟交易所')
+    parser.add_argument('--host', type=str, default="127.0.0.1", help='监听地址')
+    parser.add_argument('--port', type=int, default=8800, help='监听端口')
+    parser.add_argument('--symbols', type=int, default=0, help='额外生成的合成交易对数量')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个请求的固定延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='随机附加延迟上限（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='随机500错误的概率')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='随机429的概率')
+    parser.add_argument('--weight-limit', type=int, default=2400, help='每分钟请求权重上限')
+    parser.add_argument('--recorded', type=str, default=None, help='录制数据所在的本地K线存储目录')
+    args = parser.parse_args()
+
+    server = MockExchangeServer(MockExchange(symbol_count=args.symbols, latency=args.latency, jitter=args.jitter,
+                                             error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                                             weight_limit=args.weight_limit, recorded_root=args.recorded),
+                                args.host, args.port).start()
+    print_colored(f"🧪 模拟交易所已启动: {server.base_url}（{len(server.exchange.symbols)}个交易对），"
+                  f"设置 CONFIG[\"FUTURES_BASE_URL\"] 指向该地址", Colors.GREEN)
+    try:
+        while True:
+            time.sleep(60)
+            stats = server.exchange.stats()
+            print_colored(f"ℹ️ 请求 {stats['requests']}, 订单 {stats['orders']}, 注入错误 {stats['injected_errors']}, "
+                          f"限流 {stats['rate_limited']}, 本分钟权重 {stats['window_used']}", Colors.INFO)
+    except KeyboardInterrupt:
+        server.stop()
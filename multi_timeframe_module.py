@@ -8,27 +8,36 @@ import numpy as np
 from typing import Dict, List, Tuple, Optional, Union, Any
 import time
 from logger_utils import Colors, print_colored
-from indicators_module import calculate_optimized_indicators, get_smc_trend_and_duration
+from indicators_module import get_smc_trend_and_duration, TREND_COLUMNS
+from indicator_cache import cached_optimized_indicators
+from timeframe_resampler import get_timeframe_resampler
+from candle_buffer import get_candle_buffer
+from data_cache import get_data_cache
+from config import CONFIG
 
 
 class MultiTimeframeCoordinator:
     """多时间框架协调类，用于在不同时间框架上进行分析并协调决策"""
 
-    def __init__(self, client, logger=None):
+    def __init__(self, client, logger=None, resampler=None, market_client=None):
         """初始化多时间框架协调器
 
         参数:
             client: Binance客户端
             logger: 日志对象
+            resampler: 周期聚合器，默认使用共享实例（CONFIG["CANDLE_STORE_DIR"] 下的本地K线存储）
+            market_client: prefetch 使用的行情客户端，默认使用共享实例
         """
         self.client = client
         self.logger = logger
+        self.resampler = resampler
+        self.market_client = market_client
         self.timeframes = {
-            "1m": {"interval": "1m", "weight": 0.5, "data": {}, "last_update": {}},
-            "5m": {"interval": "5m", "weight": 0.7, "data": {}, "last_update": {}},
-            "15m": {"interval": "15m", "weight": 1.0, "data": {}, "last_update": {}},
-            "1h": {"interval": "1h", "weight": 1.5, "data": {}, "last_update": {}},
-            "4h": {"interval": "4h", "weight": 2.0, "data": {}, "last_update": {}}
+            "1m": {"interval": "1m", "weight": 0.5},
+            "5m": {"interval": "5m", "weight": 0.7},
+            "15m": {"interval": "15m", "weight": 1.0},
+            "1h": {"interval": "1h", "weight": 1.5},
+            "4h": {"interval": "4h", "weight": 2.0}
         }
         self.update_interval = {
             "1m": 60,  # 1分钟K线每1分钟更新一次
@@ -39,8 +48,34 @@ class MultiTimeframeCoordinator:
         }
         self.coherence_cache = {}  # 缓存一致性分析结果
 
+        # 各时间框架数据缓存在共享的数据缓存中，每个时间框架一个命名空间，过期时间即更新间隔
+        self.data_cache = get_data_cache()
+        for tf_name, interval_seconds in self.update_interval.items():
+            self.data_cache.configure(f"mtf_{tf_name}", interval_seconds)
+
         print_colored("🔄 多时间框架协调器初始化完成", Colors.GREEN)
 
+    def _get_resampler(self):
+        return self.resampler if self.resampler is not None else get_timeframe_resampler(self.client)
+
+    def prefetch(self, symbols: List[str], min_bars: int = 200) -> Dict[str, int]:
+        """
+        在一个事件循环中并发同步多个交易对的1m K线（所有时间框架都由1m聚合），
+        之后 PREFETCH_MAX_AGE 秒内的 fetch_all_timeframes 不再逐个请求
+
+        参数:
+            symbols: 交易对列表
+            min_bars: 每个交易对至少需要的1m K线数量
+
+        返回:
+            {交易对: 新写入的1m K线数量}
+        """
+        started = time.time()
+        new_bars = self._get_resampler().sync_many(symbols, min_bars=min_bars, market_client=self.market_client)
+        print_colored(f"📥 并发同步{len(new_bars)}/{len(symbols)}个交易对的K线，"
+                      f"耗时 {time.time() - started:.2f}秒", Colors.BLUE)
+        return new_bars
+
     def fetch_all_timeframes(self, symbol: str, force_refresh: bool = False) -> Dict[str, pd.DataFrame]:
         """获取指定交易对的所有时间框架数据
 
@@ -52,62 +87,54 @@ class MultiTimeframeCoordinator:
             各时间框架的DataFrame字典
         """
         result = {}
-        current_time = time.time()
 
         print_colored(f"🔍 获取{symbol}的多时间框架数据{'(强制刷新)' if force_refresh else ''}", Colors.BLUE)
 
+        # 所有周期都由1m K线聚合，本轮只需同步一次1m数据
+        resampler = self._get_resampler()
+        base_synced = False
+
         for tf_name, tf_info in self.timeframes.items():
             # 检查是否需要更新数据
-            last_update = tf_info["last_update"].get(symbol, 0)
-            interval_seconds = self.update_interval[tf_name]
+            namespace = f"mtf_{tf_name}"
+            df = None if force_refresh else self.data_cache.get(namespace, symbol)
 
-            if force_refresh or (current_time - last_update) > interval_seconds or symbol not in tf_info["data"]:
+            if df is None:
                 try:
                     # 根据时间框架调整获取的K线数量
                     limit = 100
                     if tf_name in ["1h", "4h"]:
                         limit = 200  # 长周期获取更多数据
 
-                    # 获取K线数据
-                    klines = self.client.futures_klines(
-                        symbol=symbol,
-                        interval=tf_info["interval"],
-                        limit=limit
-                    )
-
-                    # 处理数据
-                    df = pd.DataFrame(klines, columns=[
-                        'time', 'open', 'high', 'low', 'close', 'volume',
-                        'close_time', 'quote_asset_volume', 'trades',
-                        'taker_base_vol', 'taker_quote_vol', 'ignore'
-                    ])
+                    # 获取K线数据（由本地1m K线聚合，只增量下载新的1m K线），原地合并进该周期的环形缓冲区
+                    if not base_synced:
+                        resampler.sync(symbol, min_bars=limit, max_age=CONFIG.get("PREFETCH_MAX_AGE", 60))
+                        base_synced = True
+                    columns = resampler.get_arrays(symbol, tf_info["interval"], limit=limit, sync=False)
+                    buffer = get_candle_buffer(symbol, tf_info["interval"])
+                    buffer.extend(columns)
+                    df = buffer.to_frame(limit)
 
-                    # 转换数据类型
-                    for col in ['open', 'high', 'low', 'close', 'volume']:
-                        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
-
-                    # 转换时间
-                    df['time'] = pd.to_datetime(df['time'], unit='ms', errors='coerce')
-
-                    # 计算指标
-                    df = calculate_optimized_indicators(df)
+                    # 计算指标（1m/5m只用于判断趋势方向，只计算趋势相关列）
+                    columns = TREND_COLUMNS if tf_name in ["1m", "5m"] else None
+                    df = cached_optimized_indicators(df, symbol, tf_info["interval"], columns=columns)
 
                     # 缓存数据
-                    tf_info["data"][symbol] = df
-                    tf_info["last_update"][symbol] = current_time
+                    self.data_cache.put(namespace, symbol, df)
 
                     print_colored(f"✅ {tf_name}时间框架数据获取成功: {len(df)}行", Colors.GREEN)
                 except Exception as e:
                     print_colored(f"❌ 获取{symbol} {tf_name}数据失败: {e}", Colors.ERROR)
-                    if symbol in tf_info["data"]:
-                        print_colored(f"使用缓存的{tf_name}数据: {len(tf_info['data'][symbol])}行", Colors.YELLOW)
+                    df = self.data_cache.get(namespace, symbol, allow_stale=True)
+                    if df is not None:
+                        print_colored(f"使用缓存的{tf_name}数据: {len(df)}行", Colors.YELLOW)
                     else:
-                        tf_info["data"][symbol] = pd.DataFrame()  # 放入空DataFrame避免后续错误
+                        df = pd.DataFrame()  # 返回空DataFrame避免后续错误
             else:
-                print_colored(f"使用缓存的{tf_name}数据: {len(tf_info['data'][symbol])}行", Colors.CYAN)
+                print_colored(f"使用缓存的{tf_name}数据: {len(df)}行", Colors.CYAN)
 
             # 添加到结果
-            result[tf_name] = tf_info["data"][symbol]
+            result[tf_name] = df
 
         return result
 
@@ -403,9 +430,8 @@ class MultiTimeframeCoordinator:
         try:
             # 获取默认时间框架数据
             default_tf = "15m"
-            if default_tf in self.timeframes and symbol in self.timeframes[default_tf]["data"]:
-                df = self.timeframes[default_tf]["data"][symbol]
-
+            df = self.data_cache.get(f"mtf_{default_tf}", symbol, allow_stale=True)
+            if df is not None:
                 if 'ATR' in df.columns:
                     # 计算ATR比率
                     atr = df['ATR'].iloc[-1]
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import time
+from market_snapshot import get_price_snapshot
 
 def load_positions(client, logger=None):
     """
@@ -209,7 +210,7 @@ def adjust_position_for_market_change(positions, client, logger=None):
 
         # 获取当前价格
         try:
-            ticker = client.futures_symbol_ticker(symbol=symbol)
+            ticker = get_price_snapshot(client).ticker(symbol)
             current_price = float(ticker['price'])
         except Exception as e:
             if logger:
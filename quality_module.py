@@ -2,10 +2,12 @@ import numpy as np
 import pandas as pd
 from data_module import get_historical_data
 from indicators_module import calculate_optimized_indicators, get_smc_trend_and_duration, find_swing_points, \
-    calculate_fibonacci_retracements
+    calculate_fibonacci_retracements, detect_swing_points
+from market_snapshot import get_funding_feed
 
 
-def calculate_quality_score(df, client=None, symbol=None, btc_df=None, config=None, logger=None):
+def calculate_quality_score(df, client=None, symbol=None, btc_df=None, config=None, logger=None,
+                            funding_rate=None):
     """
     计算0-10分的货币质量评分，10分表示低风险
     基于SMC策略（Smart Money Concept）和风险参数
@@ -18,6 +20,7 @@ def calculate_quality_score(df, client=None, symbol=None, btc_df=None, config=No
         btc_df: BTC数据（可选，用于市场情绪评估）
         config: 配置对象（可选）
         logger: 日志对象（可选）
+        funding_rate: 资金费率（可选），未提供时从共享的资金费率数据中查询
 
     返回:
         quality_score (float): 0-10分的质量评分
@@ -129,8 +132,9 @@ def calculate_quality_score(df, client=None, symbol=None, btc_df=None, config=No
 
     # 3. 支撑阻力评估 - 最高2分
     try:
-        swing_highs, swing_lows = find_swing_points(df)
-        fib_levels = calculate_fibonacci_retracements(df)
+        swings = detect_swing_points(df)
+        swing_highs, swing_lows = find_swing_points(df, swings=swings)
+        fib_levels = calculate_fibonacci_retracements(df, swings=swings)
 
         print(f"📊 {symbol} - 发现摆动高点: {len(swing_highs)}个, 摆动低点: {len(swing_lows)}个")
         if fib_levels:
@@ -390,10 +394,15 @@ def calculate_quality_score(df, client=None, symbol=None, btc_df=None, config=No
                 market_score = 0.3
                 print(f"⚠️ {symbol} - BTC小幅下跌，市场情绪评分: 0.3")
 
-        # 如果提供了客户端和符号，也可以查看期货资金费率
-        if client and symbol:
+        # 如果提供了资金费率或客户端和符号，也可以查看期货资金费率
+        if funding_rate is None and client and symbol:
             try:
-                funding_rate = float(client.futures_mark_price(symbol=symbol)['lastFundingRate'])
+                funding_rate = get_funding_feed(client).get_funding_rate(symbol)
+            except Exception as e:
+                print(f"⚠️ {symbol} - 无法获取资金费率: {e}")
+        if funding_rate is not None:
+            try:
+                funding_rate = float(funding_rate)
                 print(f"📊 {symbol} - 资金费率: {funding_rate:.6f}")
 
                 # 负的资金费率通常对做多有利
@@ -8,6 +8,7 @@ import pandas as pd
 from typing import Dict, List, Tuple, Optional, Union, Any
 from logger_utils import Colors, print_colored
 from indicators_module import (
+    detect_swing_points,
     find_swing_points,
     calculate_fibonacci_retracements,
     get_smc_trend_and_duration
@@ -116,13 +117,14 @@ def advanced_smc_stop_loss(df: pd.DataFrame, entry_price: float, leverage: int,
             }
 
         # 市场结构止损 - 使用摆动点
-        swing_highs, swing_lows = find_swing_points(df)
+        swings = detect_swing_points(df)
+        swing_highs, swing_lows = find_swing_points(df, swings=swings)
 
         # 趋势分析
         trend, _, trend_info = get_smc_trend_and_duration(df)
 
         # 斐波那契回撤位
-        fib_levels = calculate_fibonacci_retracements(df)
+        fib_levels = calculate_fibonacci_retracements(df, swings=swings)
 
         # 当前价格
         current_price = df['close'].iloc[-1]
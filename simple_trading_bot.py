@@ -9,10 +9,19 @@ from config import CONFIG, VERSION
 from data_module import get_historical_data
 from indicators_module import calculate_optimized_indicators, get_smc_trend_and_duration, find_swing_points, \
     calculate_fibonacci_retracements
+from indicator_cache import cached_optimized_indicators, get_indicator_cache, store_optimized_indicators
+from analysis_pipeline import compute_symbol_score, create_analysis_pipeline, replay_log_records
+from candle_store import get_candle_store
+from data_cache import get_data_cache
+from exchange_metadata import get_exchange_metadata
+from market_snapshot import get_funding_feed, get_price_snapshot
+from api_scheduler import create_client, get_api_scheduler
+from single_flight import get_single_flight
 from position_module import load_positions, get_total_position_exposure, calculate_order_amount, \
     adjust_position_for_market_change
 from logger_setup import get_logger
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 from trade_module import get_max_leverage, get_precise_quantity, format_quantity
 from quality_module import calculate_quality_score, detect_pattern_similarity, adjust_quality_for_similarity
 from pivot_points_module import calculate_pivot_points, analyze_pivot_point_strategy
@@ -46,12 +55,13 @@ class EnhancedTradingBot:
     def __init__(self, api_key: str, api_secret: str, config: dict):
         print("初始化 EnhancedTradingBot...")
         self.config = config
-        self.client = Client(api_key, api_secret)
+        self.client = create_client(api_key, api_secret)  # 所有请求经过共享的权重调度器
         self.logger = get_logger()
         self.trade_cycle = 0
         self.open_positions = []  # 存储持仓信息
-        self.api_request_delay = 0.5  # API请求延迟以避免限制
-        self.historical_data_cache = {}  # 缓存历史数据
+        self.data_cache = get_data_cache()  # 缓存历史数据（共享的过期/LRU缓存）
+        self.data_cache.configure("bot_history", 300)  # 5分钟
+        self.exchange_metadata = get_exchange_metadata(self.client)  # 交易规则索引，启动时加载一次并在后台刷新
         self.quality_score_history = {}  # 存储质量评分历史
         self.similar_patterns_history = {}  # 存储相似模式历史
         self.hedge_mode_enabled = True  # 默认启用双向持仓
@@ -64,6 +74,7 @@ class EnhancedTradingBot:
         # 多时间框架协调器初始化
         self.mtf_coordinator = MultiTimeframeCoordinator(self.client, self.logger)
         print("✅ 多时间框架协调器初始化完成")
+        self.analysis_pipeline = create_analysis_pipeline(config)  # 交易对并发分析（线程池获取数据，进程池计算指标）
 
         # 创建日志目录
         log_dir = "logs"
@@ -122,7 +133,7 @@ class EnhancedTradingBot:
 
             # 获取当前价格
             try:
-                ticker = self.client.futures_symbol_ticker(symbol=symbol)
+                ticker = get_price_snapshot(self.client).ticker(symbol)
                 current_price = float(ticker['price'])
             except Exception as e:
                 print(f"⚠️ 无法获取 {symbol} 当前价格: {e}")
@@ -273,7 +284,7 @@ class EnhancedTradingBot:
                 try:
                     print(f"🔄 尝试重新连接API (尝试 {attempt + 1}/{retry_count})...")
                     # 重新创建客户端
-                    self.client = Client(self.api_key, self.api_secret)
+                    self.client = create_client(self.api_key, self.api_secret)
 
                     # 验证连接
                     self.client.ping()
@@ -330,7 +341,7 @@ class EnhancedTradingBot:
 
                     # 获取当前价格
                     try:
-                        ticker = self.client.futures_symbol_ticker(symbol=symbol)
+                        ticker = get_price_snapshot(self.client).ticker(symbol)
                         current_price = float(ticker['price'])
                     except Exception as e:
                         print(f"⚠️ 获取{symbol}价格失败: {e}")
@@ -490,9 +501,9 @@ class EnhancedTradingBot:
         if btc_df is None:
             print("🔄 尝试替代方法获取市场情绪...")
 
-            # 尝试方法1: 直接使用futures_symbol_ticker获取BTC当前价格
+            # 尝试方法1: 从价格快照获取BTC当前价格
             try:
-                ticker_now = self.client.futures_symbol_ticker(symbol="BTCUSDT")
+                ticker_now = get_price_snapshot(self.client).ticker("BTCUSDT")
                 current_price = float(ticker_now['price'])
 
                 # 获取历史价格（通过klines获取单个数据点）
@@ -738,7 +749,6 @@ class EnhancedTradingBot:
 
                 # 先执行多头订单
                 long_success = self.place_futures_order_usdc(symbol, "BUY", long_amount, long_leverage)
-                time.sleep(1)
                 # 再执行空头订单
                 short_success = self.place_futures_order_usdc(symbol, "SELL", short_amount, short_leverage)
 
@@ -772,30 +782,23 @@ class EnhancedTradingBot:
     def get_historical_data_with_cache(self, symbol, interval="15m", limit=200, force_refresh=False):
         """获取历史数据，使用缓存减少API调用 - 改进版"""
         cache_key = f"{symbol}_{interval}_{limit}"
-        current_time = time.time()
-
-        # 更频繁刷新缓存 - 减少到5分钟
-        cache_ttl = 300  # 5分钟
 
         # 对于长时间运行的会话，每小时强制刷新一次
         hourly_force_refresh = self.trade_cycle % 12 == 0  # 假设每5分钟一个周期
 
-        # 检查缓存是否存在且有效
-        if not force_refresh and not hourly_force_refresh and cache_key in self.historical_data_cache:
-            cache_item = self.historical_data_cache[cache_key]
-            if current_time - cache_item['timestamp'] < cache_ttl:
+        # 检查缓存是否存在且有效（有效期5分钟）
+        if not force_refresh and not hourly_force_refresh:
+            cached = self.data_cache.get("bot_history", cache_key)
+            if cached is not None:
                 self.logger.info(f"使用缓存数据: {symbol}")
-                return cache_item['data']
+                return cached
 
         # 获取新数据
         try:
             df = get_historical_data(self.client, symbol)
             if df is not None and not df.empty:
                 # 缓存数据
-                self.historical_data_cache[cache_key] = {
-                    'data': df,
-                    'timestamp': current_time
-                }
+                self.data_cache.put("bot_history", cache_key, df)
                 self.logger.info(f"获取并缓存新数据: {symbol}")
                 return df
             else:
@@ -813,8 +816,8 @@ class EnhancedTradingBot:
             return None
 
         try:
-            # 计算指标
-            df = calculate_optimized_indicators(df)
+            # 计算指标（预测只用收盘价，仅保留关键指标检查）
+            df = cached_optimized_indicators(df, symbol, columns=['RSI', 'MACD', 'EMA5', 'EMA20'])
             if df is None or df.empty:
                 return None
 
@@ -871,19 +874,11 @@ class EnhancedTradingBot:
         print(f"ℹ️ 当前内存使用: {memory_usage:.2f} MB")
         self.logger.info(f"内存使用情况", extra={"memory_mb": memory_usage})
 
-        # 限制缓存大小
-        if len(self.historical_data_cache) > 50:
-            # 删除最老的缓存
-            oldest_keys = sorted(
-                self.historical_data_cache.keys(),
-                key=lambda k: self.historical_data_cache[k]['timestamp']
-            )[:10]
-
-            for key in oldest_keys:
-                del self.historical_data_cache[key]
-
-            print(f"🧹 清理了{len(oldest_keys)}个历史数据缓存项")
-            self.logger.info(f"清理历史数据缓存", extra={"cleaned_items": len(oldest_keys)})
+        # 清理过期的数据缓存（容量由缓存按内存预算自动淘汰）
+        purged = self.data_cache.purge_expired()
+        if purged:
+            print(f"🧹 清理了{purged}个过期数据缓存项")
+            self.logger.info(f"清理过期数据缓存", extra={"cleaned_items": purged})
 
         # 限制持仓历史记录大小
         if hasattr(self, 'position_history') and len(self.position_history) > 1000:
@@ -892,6 +887,33 @@ class EnhancedTradingBot:
             print(f"🧹 持仓历史记录裁剪至1000条")
             self.logger.info(f"裁剪持仓历史记录", extra={"max_records": 1000})
 
+        # 指标缓存统计
+        cache_stats = get_indicator_cache().stats()
+        print(f"ℹ️ 指标缓存: {cache_stats['entries']}项, {cache_stats['bytes'] / 1024 / 1024:.2f} MB, "
+              f"命中率 {cache_stats['hit_rate']:.1%} ({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']})")
+
+        # 数据缓存统计
+        data_stats = self.data_cache.stats()
+        print(f"ℹ️ 数据缓存: {data_stats['entries']}项, {data_stats['bytes'] / 1024 / 1024:.2f} MB")
+        for namespace, stats in sorted(data_stats['namespaces'].items()):
+            print(f"   {namespace}: {stats['entries']}项, 命中率 {stats['hit_rate']:.1%}, 淘汰 {stats['evictions']}次")
+
+        # 价格快照统计
+        snapshot_stats = get_price_snapshot(self.client).stats()
+        print(f"ℹ️ 价格快照: {snapshot_stats['lookups']}次查询, {snapshot_stats['refreshes']}次全量刷新, "
+              f"{snapshot_stats['single_requests']}次单独请求")
+        scheduler_stats = get_api_scheduler().stats()
+        print(f"ℹ️ API调度: {scheduler_stats['requests']}次请求, 权重 {scheduler_stats['weight']}, "
+              f"本分钟 {scheduler_stats['window_used']}/{scheduler_stats['limit']}, "
+              f"被限流 {scheduler_stats['rate_limited']}次")
+        flight_stats = get_single_flight().stats()
+        print(f"ℹ️ 请求合并: {flight_stats['calls']}次调用, {flight_stats['deduplicated']}次被合并 "
+              f"({flight_stats['dedup_rate']:.1%})")
+        funding_stats = get_funding_feed(self.client).stats()
+        print(f"ℹ️ 资金费率: {funding_stats['lookups']}次查询, {funding_stats['refreshes']}次全量刷新, "
+              f"{funding_stats['misses']}次未找到")
+        self.logger.info(f"指标缓存统计", extra=cache_stats)
+
         # 重置一些累积的统计数据
         if self.trade_cycle % 100 == 0:
             self.quality_score_history = {}
@@ -908,20 +930,25 @@ class EnhancedTradingBot:
         run_hours = (time.time() - self.resource_management_start_time) / 3600
         print(f"⏱️ 机器人已运行: {run_hours:.2f}小时")
 
-    def generate_trade_signal(self, df, symbol):
-        """生成更积极的交易信号，考虑市场偏向和趋势优先"""
+    def generate_trade_signal(self, df, symbol, precomputed=None):
+        """生成更积极的交易信号，考虑市场偏向和趋势优先（precomputed: 已计算的 (指标DataFrame, 质量评分, 评分明细)）"""
 
         if df is None or len(df) < 20:
             return "HOLD", 0
 
         try:
-            # 计算指标
-            df = calculate_optimized_indicators(df)
+            if precomputed is not None:
+                # 指标和质量评分已在分析进程池中计算
+                df, quality_score, metrics = precomputed
+            else:
+                # 计算指标
+                df = cached_optimized_indicators(df, symbol)
+                if df is not None and not df.empty:
+                    # 计算质量评分
+                    quality_score, metrics = calculate_quality_score(df, self.client, symbol, None, self.config,
+                                                                     self.logger)
             if df is None or df.empty:
                 return "HOLD", 0
-
-            # 计算质量评分
-            quality_score, metrics = calculate_quality_score(df, self.client, symbol, None, self.config, self.logger)
             print_colored(f"{symbol} 初始质量评分: {quality_score:.2f}", Colors.INFO)
 
             # 获取多时间框架信号
@@ -959,7 +986,7 @@ class EnhancedTradingBot:
 
             # 获取当前价格
             try:
-                ticker = self.client.futures_symbol_ticker(symbol=symbol)
+                ticker = get_price_snapshot(self.client).ticker(symbol)
                 current_price = float(ticker['price'])
             except Exception as e:
                 return "HOLD", 0
@@ -1049,7 +1076,6 @@ class EnhancedTradingBot:
                 short_amount = order_amount * 0.4  # 40%做空
 
                 long_success = self.place_futures_order_usdc(symbol, "BUY", long_amount)
-                time.sleep(1)  # 避免API请求过快
                 short_success = self.place_futures_order_usdc(symbol, "SELL", short_amount)
 
                 if long_success and short_success:
@@ -1109,7 +1135,7 @@ class EnhancedTradingBot:
             print(f"📊 当前账户余额: {account_balance:.2f} USDC")
 
             # 获取当前价格
-            ticker = self.client.futures_symbol_ticker(symbol=symbol)
+            ticker = get_price_snapshot(self.client).ticker(symbol)
             current_price = float(ticker['price'])
 
             # 预测未来价格，用于检查最小价格变动和计算动态止损
@@ -1167,22 +1193,11 @@ class EnhancedTradingBot:
             notional_min = None
 
             try:
-                # 获取交易对信息
-                info = self.client.futures_exchange_info()
-
-                # 查找该交易对的所有过滤器
-                for item in info['symbols']:
-                    if item['symbol'] == symbol:
-                        for f in item['filters']:
-                            # 数量精度
-                            if f['filterType'] == 'LOT_SIZE':
-                                step_size = float(f['stepSize'])
-                                min_qty = float(f['minQty'])
-                                max_qty = float(f['maxQty'])
-                            # 最小订单价值
-                            elif f['filterType'] == 'MIN_NOTIONAL':
-                                notional_min = float(f.get('notional', 0))
-                        break
+                # 从交易所元数据索引获取数量精度和最小订单价值
+                meta = get_exchange_metadata(self.client).get(symbol)
+                if meta is not None:
+                    step_size, min_qty, max_qty = meta.step_size, meta.min_qty, meta.max_qty
+                    notional_min = meta.min_notional
             except Exception as e:
                 print_colored(f"⚠️ 获取{symbol}交易信息失败: {e}，使用默认值", Colors.WARNING)
                 self.logger.warning(f"获取交易信息失败: {e}", extra={"symbol": symbol})
@@ -1345,6 +1360,161 @@ class EnhancedTradingBot:
             self.logger.error(f"{symbol} 交易错误", extra={"error": str(e)})
             return False
 
+    def analyze_trade_candidate(self, symbol, df, account_balance, min_quality_score, precomputed=None):
+        """
+        分析单个交易对，生成交易候选
+
+        参数:
+            symbol: 交易对
+            df: K线数据
+            account_balance: 账户余额
+            min_quality_score: 最低质量评分要求
+            precomputed: (指标DataFrame, 质量评分, 评分明细)，已在分析进程池中计算时传入
+
+        返回:
+            候选交易字典，不满足条件时返回None
+        """
+        # 使用新的信号生成函数
+        signal, quality_score = self.generate_trade_signal(df, symbol, precomputed)
+
+        # 跳过保持信号
+        if signal == "HOLD":
+            print(f"⏸️ {symbol} 保持观望")
+            return None
+
+        # 检查质量评分是否达到最低要求 - 新增的筛选条件
+        if quality_score < min_quality_score:
+            print_colored(
+                f"⚠️ {symbol} 质量评分 ({quality_score:.2f}) 低于最低要求 ({min_quality_score:.2f})，跳过交易",
+                Colors.YELLOW)
+            return None
+
+        # 检查原始信号是否为轻量级
+        is_light = False
+        # 临时获取原始信号
+        _, _, details = self.mtf_coordinator.generate_signal(symbol, quality_score)
+        raw_signal = details.get("coherence", {}).get("recommendation", "")
+        if raw_signal.startswith("LIGHT_"):
+            is_light = True
+            print_colored(f"{symbol} 检测到轻量级信号，将使用较小仓位", Colors.YELLOW)
+
+        # 获取当前价格
+        try:
+            ticker = get_price_snapshot(self.client).ticker(symbol)
+            current_price = float(ticker['price'])
+        except Exception as e:
+            print(f"❌ 获取{symbol}价格失败: {e}")
+            return None
+
+        # 预测未来价格
+        predicted = None
+        if "price_prediction" in details and details["price_prediction"].get("valid", False):
+            predicted = details["price_prediction"]["predicted_price"]
+        else:
+            predicted = self.predict_short_term_price(symbol, horizon_minutes=90)  # 使用90分钟预测
+
+        if predicted is None:
+            predicted = current_price * (1.05 if signal == "BUY" else 0.95)  # 默认5%变动
+
+        # 计算预期价格变动百分比
+        expected_movement = abs(predicted - current_price) / current_price * 100
+
+        # 使用固定的预期变动阈值: 1.35%
+        if expected_movement < 1.35:
+            print_colored(
+                f"⚠️ {symbol}的预期价格变动({expected_movement:.2f}%)小于最低要求(1.35%)，跳过交易",
+                Colors.WARNING)
+            return None
+
+        # 计算风险和交易金额
+        risk = expected_movement / 100  # 预期变动作为风险指标
+
+        # 计算交易金额时考虑轻量级信号
+        candidate_amount = self.calculate_dynamic_order_amount(risk, account_balance)
+        if is_light:
+            candidate_amount *= 0.5  # 轻量级信号使用半仓
+            print_colored(f"{symbol} 轻量级信号，使用50%标准仓位: {candidate_amount:.2f} USDC",
+                          Colors.YELLOW)
+
+        # 候选交易
+        candidate = {
+            "symbol": symbol,
+            "signal": signal,
+            "quality_score": quality_score,
+            "current_price": current_price,
+            "predicted_price": predicted,
+            "risk": risk,
+            "amount": candidate_amount,
+            "is_light": is_light,
+            "expected_movement": expected_movement
+        }
+
+        print_colored(
+            f"候选交易: {symbol} {signal}, "
+            f"质量评分: {quality_score:.2f}, "
+            f"预期波动: {expected_movement:.2f}%, "
+            f"下单金额: {candidate_amount:.2f} USDC",
+            Colors.GREEN if signal == "BUY" else Colors.RED
+        )
+        return candidate
+
+    def analyze_trade_candidates(self, symbols, account_balance, min_quality_score):
+        """
+        并发分析交易对并生成交易候选
+
+        获取数据和信号生成在线程池中执行，指标和质量评分在进程池中计算；单个交易对出错只记录日志，
+        候选按质量评分从高到低排序，评分相同时保持 symbols 中的顺序
+
+        参数:
+            symbols: 交易对列表
+            account_balance: 账户余额
+            min_quality_score: 最低质量评分要求
+
+        返回:
+            排序后的候选交易列表
+        """
+        # 先并发同步所有交易对的多时间框架K线，之后各线程的读取直接命中本地数据
+        try:
+            self.mtf_coordinator.prefetch(symbols)
+        except Exception as e:
+            print_colored(f"⚠️ 预取多时间框架数据失败: {e}", Colors.WARNING)
+        funding_feed = get_funding_feed(self.client)
+
+        def fetch(symbol):
+            print(f"\n分析交易对: {symbol}")
+            df = self.get_historical_data_with_cache(symbol, force_refresh=True)
+            if df is None:
+                print(f"❌ 无法获取{symbol}数据")
+                return None
+            if len(df) < 20:
+                print(f"⏸️ {symbol} 保持观望")
+                return None
+            return df, funding_feed.get_funding_rate(symbol)
+
+        def finalize(symbol, payload, computed):
+            df = payload[0]
+            indicators_df, quality_score, metrics, log_records = computed
+            # 评分过程的日志在子进程中记录，这里写入机器人的日志
+            replay_log_records(log_records, self.logger)
+            # 子进程的指标结果写回本进程的指标缓存，供后续持仓管理等环节复用
+            store_optimized_indicators(df, indicators_df, symbol)
+            return self.analyze_trade_candidate(symbol, df, account_balance, min_quality_score,
+                                                (indicators_df, quality_score, metrics))
+
+        start = time.time()
+        results, errors = self.analysis_pipeline.run(symbols, fetch,
+                                                     partial(compute_symbol_score, config=self.config), finalize)
+        for symbol, error in errors.items():
+            self.logger.error(f"处理{symbol}时出错: {error}")
+            print(f"❌ 处理{symbol}时出错: {error}")
+
+        trade_candidates = [candidate for candidate in results if candidate is not None]
+        # 稳定排序：评分相同的候选保持配置中的顺序，结果不受线程完成顺序影响
+        trade_candidates.sort(key=lambda x: x["quality_score"], reverse=True)
+        print_colored(f"ℹ️ 分析{len(symbols)}个交易对用时 {time.time() - start:.2f}秒，"
+                      f"候选 {len(trade_candidates)}个，失败 {len(errors)}个", Colors.INFO)
+        return trade_candidates
+
     def trade(self):
         """增强版多时框架集成交易循环，包含主动持仓监控"""
         import threading
@@ -1403,108 +1573,9 @@ class EnhancedTradingBot:
                 # 管理现有持仓
                 self.manage_open_positions()
 
-                # 分析交易对并生成建议
-                trade_candidates = []
-                for symbol in self.config["TRADE_PAIRS"]:
-                    try:
-                        print(f"\n分析交易对: {symbol}")
-                        # 获取基础数据
-                        df = self.get_historical_data_with_cache(symbol, force_refresh=True)
-                        if df is None:
-                            print(f"❌ 无法获取{symbol}数据")
-                            continue
-
-                        # 使用新的信号生成函数
-                        signal, quality_score = self.generate_trade_signal(df, symbol)
-
-                        # 跳过保持信号
-                        if signal == "HOLD":
-                            print(f"⏸️ {symbol} 保持观望")
-                            continue
-
-                        # 检查质量评分是否达到最低要求 - 新增的筛选条件
-                        if quality_score < min_quality_score:
-                            print_colored(
-                                f"⚠️ {symbol} 质量评分 ({quality_score:.2f}) 低于最低要求 ({min_quality_score:.2f})，跳过交易",
-                                Colors.YELLOW)
-                            continue
-
-                        # 检查原始信号是否为轻量级
-                        is_light = False
-                        # 临时获取原始信号
-                        _, _, details = self.mtf_coordinator.generate_signal(symbol, quality_score)
-                        raw_signal = details.get("coherence", {}).get("recommendation", "")
-                        if raw_signal.startswith("LIGHT_"):
-                            is_light = True
-                            print_colored(f"{symbol} 检测到轻量级信号，将使用较小仓位", Colors.YELLOW)
-
-                        # 获取当前价格
-                        try:
-                            ticker = self.client.futures_symbol_ticker(symbol=symbol)
-                            current_price = float(ticker['price'])
-                        except Exception as e:
-                            print(f"❌ 获取{symbol}价格失败: {e}")
-                            continue
-
-                        # 预测未来价格
-                        predicted = None
-                        if "price_prediction" in details and details["price_prediction"].get("valid", False):
-                            predicted = details["price_prediction"]["predicted_price"]
-                        else:
-                            predicted = self.predict_short_term_price(symbol, horizon_minutes=90)  # 使用90分钟预测
-
-                        if predicted is None:
-                            predicted = current_price * (1.05 if signal == "BUY" else 0.95)  # 默认5%变动
-
-                        # 计算预期价格变动百分比
-                        expected_movement = abs(predicted - current_price) / current_price * 100
-
-                        # 使用固定的预期变动阈值: 1.35%
-                        if expected_movement < 1.35:
-                            print_colored(
-                                f"⚠️ {symbol}的预期价格变动({expected_movement:.2f}%)小于最低要求(1.35%)，跳过交易",
-                                Colors.WARNING)
-                            continue
-
-                        # 计算风险和交易金额
-                        risk = expected_movement / 100  # 预期变动作为风险指标
-
-                        # 计算交易金额时考虑轻量级信号
-                        candidate_amount = self.calculate_dynamic_order_amount(risk, account_balance)
-                        if is_light:
-                            candidate_amount *= 0.5  # 轻量级信号使用半仓
-                            print_colored(f"{symbol} 轻量级信号，使用50%标准仓位: {candidate_amount:.2f} USDC",
-                                          Colors.YELLOW)
-
-                        # 添加到候选列表
-                        candidate = {
-                            "symbol": symbol,
-                            "signal": signal,
-                            "quality_score": quality_score,
-                            "current_price": current_price,
-                            "predicted_price": predicted,
-                            "risk": risk,
-                            "amount": candidate_amount,
-                            "is_light": is_light,
-                            "expected_movement": expected_movement
-                        }
-
-                        trade_candidates.append(candidate)
-
-                        print_colored(
-                            f"候选交易: {symbol} {signal}, "
-                            f"质量评分: {quality_score:.2f}, "
-                            f"预期波动: {expected_movement:.2f}%, "
-                            f"下单金额: {candidate_amount:.2f} USDC",
-                            Colors.GREEN if signal == "BUY" else Colors.RED
-                        )
-
-                    except Exception as e:
-                        self.logger.error(f"处理{symbol}时出错: {e}")
-                        print(f"❌ 处理{symbol}时出错: {e}")
-
-                # 按质量评分排序候选交易
-                trade_candidates.sort(key=lambda x: x["quality_score"], reverse=True)
+                # 分析交易对并生成建议（按质量评分排序）
+                trade_candidates = self.analyze_trade_candidates(self.config["TRADE_PAIRS"], account_balance,
+                                                                 min_quality_score)
 
                 # 显示详细交易计划
                 if trade_candidates:
@@ -1603,7 +1674,7 @@ class EnhancedTradingBot:
                 return 0.03  # 默认上升空间3%
 
             # 计算指标
-            df = calculate_optimized_indicators(df)
+            df = cached_optimized_indicators(df, symbol)
             if df is None or df.empty:
                 return 0.03
 
@@ -1768,7 +1839,7 @@ class EnhancedTradingBot:
 
             # 获取当前价格
             try:
-                ticker = self.client.futures_symbol_ticker(symbol=symbol)
+                ticker = get_price_snapshot(self.client).ticker(symbol)
                 current_price = float(ticker['price'])
             except Exception as e:
                 print(f"⚠️ 无法获取 {symbol} 当前价格: {e}")
@@ -1913,7 +1984,7 @@ class EnhancedTradingBot:
 
                     # 获取当前价格
                     try:
-                        ticker = self.client.futures_symbol_ticker(symbol=symbol)
+                        ticker = get_price_snapshot(self.client).ticker(symbol)
                         current_price = float(ticker['price'])
                     except Exception as e:
                         print(f"⚠️ 获取{symbol}价格失败: {e}")
@@ -2160,16 +2231,8 @@ class EnhancedTradingBot:
 
                 try:
                     # 获取精确数量
-                    info = self.client.futures_exchange_info()
-                    step_size = None
-
-                    for item in info['symbols']:
-                        if item['symbol'] == symbol:
-                            for f in item['filters']:
-                                if f['filterType'] == 'LOT_SIZE':
-                                    step_size = float(f['stepSize'])
-                                    break
-                            break
+                    meta = get_exchange_metadata(self.client).get(symbol)
+                    step_size = meta.step_size if meta is not None else None
 
                     if step_size:
                         precision = int(round(-math.log(step_size, 10), 0))
@@ -2196,7 +2259,7 @@ class EnhancedTradingBot:
                         )
 
                     # 获取平仓价格
-                    ticker = self.client.futures_symbol_ticker(symbol=symbol)
+                    ticker = get_price_snapshot(self.client).ticker(symbol)
                     exit_price = float(ticker['price'])
 
                     # 计算盈亏
@@ -2285,7 +2348,7 @@ class EnhancedTradingBot:
 
             # 获取当前价格
             try:
-                ticker = self.client.futures_symbol_ticker(symbol=symbol)
+                ticker = get_price_snapshot(self.client).ticker(symbol)
                 current_price = float(ticker['price'])
             except:
                 current_price = 0.0
@@ -2317,37 +2380,18 @@ class EnhancedTradingBot:
     def get_btc_data(self):
         """专门获取BTC数据的方法"""
         try:
-            # 直接从API获取最新数据，完全绕过缓存
-            print("正在直接从API获取BTC数据...")
+            # 通过本地K线存储增量同步获取最新数据，绕过历史数据缓存
+            print("正在获取BTC数据...")
 
             # 尝试不同的交易对名称
             btc_symbols = ["BTCUSDT", "BTCUSDC"]
 
             for symbol in btc_symbols:
                 try:
-                    # 直接调用client.futures_klines而不是get_historical_data
-                    klines = self.client.futures_klines(
-                        symbol=symbol,
-                        interval="15m",
-                        limit=30  # 获取足够多的数据点
-                    )
-
-                    if klines and len(klines) > 20:
-                        print(f"✅ 成功获取{symbol}数据: {len(klines)}行")
-
-                        # 转换为DataFrame
-                        df = pd.DataFrame(klines, columns=[
-                            'time', 'open', 'high', 'low', 'close', 'volume',
-                            'close_time', 'quote_asset_volume', 'trades',
-                            'taker_base_vol', 'taker_quote_vol', 'ignore'
-                        ])
-
-                        # 转换数据类型
-                        for col in ['open', 'high', 'low', 'close', 'volume']:
-                            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0)
+                    df = get_candle_store(self.client).get_frame(symbol, "15m", limit=30)  # 获取足够多的数据点
 
-                        # 转换时间
-                        df['time'] = pd.to_datetime(df['time'], unit='ms', errors='coerce')
+                    if len(df) > 20:
+                        print(f"✅ 成功获取{symbol}数据: {len(df)}行")
 
                         print(f"BTC价格范围: {df['close'].min():.2f} - {df['close'].max():.2f}")
                         return df
@@ -2361,8 +2405,7 @@ class EnhancedTradingBot:
             print("🔍 正在尝试获取可用的交易对列表...")
             try:
                 # 获取可用的交易对列表
-                exchange_info = self.client.futures_exchange_info()
-                available_symbols = [info['symbol'] for info in exchange_info['symbols']]
+                available_symbols = get_exchange_metadata(self.client).symbols()
                 btc_symbols = [sym for sym in available_symbols if 'BTC' in sym]
                 print(f"发现BTC相关交易对: {btc_symbols[:5]}...")
             except Exception as e:
@@ -2424,7 +2467,7 @@ class EnhancedTradingBot:
 
             # 获取当前价格
             try:
-                ticker = self.client.futures_symbol_ticker(symbol=symbol)
+                ticker = get_price_snapshot(self.client).ticker(symbol)
                 current_price = float(ticker['price'])
             except:
                 current_price = 0.0
@@ -2477,7 +2520,7 @@ class EnhancedTradingBot:
             if df is None:
                 continue
 
-            df = calculate_optimized_indicators(df)
+            df = cached_optimized_indicators(df, symbol)
             quality_score, metrics = calculate_quality_score(df, self.client, symbol, None, self.config,
                                                              self.logger)
 
@@ -2864,7 +2907,7 @@ def check_all_positions_status(self):
 
         try:
             # 获取当前价格
-            ticker = self.client.futures_symbol_ticker(symbol=symbol)
+            ticker = get_price_snapshot(self.client).ticker(symbol)
             current_price = float(ticker['price'])
 
             # 计算盈亏
@@ -0,0 +1,116 @@
+"""
+请求合并模块
+多个线程同时发起相同的请求（相同接口和参数）时只执行一次，其余线程等待并共享同一个结果（或异常），
+用于扫描线程、监控线程和入场等待线程并发读取相同行情数据的场景
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class _Call:
+    """一次正在执行的请求"""
+
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    相同键的并发调用只执行一次
+
+    只合并调用时已经在执行中的请求，不缓存已完成的结果，请求结束后的下一次调用会重新执行；
+    结果对象由所有等待者共享，调用方不应修改
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _group_stats(self, group: str) -> Dict[str, int]:
+        if group not in self._stats:
+            self._stats[group] = {"calls": 0, "executions": 0, "deduplicated": 0, "errors": 0}
+        return self._stats[group]
+
+    def do(self, group: str, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        """
+        执行或加入一次调用
+
+        参数:
+            group: 统计分组（例如接口名）
+            key: 请求键，相同 (group, key) 的并发调用会被合并
+            func: 实际执行的函数
+
+        返回:
+            func 的返回值；func 抛出异常时所有等待者收到同一个异常
+        """
+        full_key = (group, key)
+        with self._lock:
+            stats = self._group_stats(group)
+            stats["calls"] += 1
+            call = self._calls.get(full_key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[full_key] = call
+                stats["executions"] += 1
+            else:
+                call.waiters += 1
+                stats["deduplicated"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._group_stats(group)["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[full_key]
+            call.event.set()
+
+    def in_flight(self) -> int:
+        """正在执行的请求数"""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """总调用数/实际执行数/合并数，以及各分组的明细和合并比例"""
+        with self._lock:
+            groups = {}
+            for group, stats in self._stats.items():
+                stats = dict(stats)
+                stats["dedup_rate"] = stats["deduplicated"] / stats["calls"] if stats["calls"] else 0.0
+                groups[group] = stats
+            calls = sum(s["calls"] for s in self._stats.values())
+            deduplicated = sum(s["deduplicated"] for s in self._stats.values())
+            return {
+                "calls": calls,
+                "executions": sum(s["executions"] for s in self._stats.values()),
+                "deduplicated": deduplicated,
+                "dedup_rate": deduplicated / calls if calls else 0.0,
+                "in_flight": len(self._calls),
+                "groups": groups
+            }
+
+
+_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """获取进程内共享的请求合并器"""
+    return _flight
@@ -7,11 +7,12 @@ import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional, Union, Any
 from logger_utils import Colors, print_colored
-from indicators_module import find_swing_points, calculate_fibonacci_retracements, get_smc_trend_and_duration
+from indicators_module import find_swing_points, calculate_fibonacci_retracements, get_smc_trend_and_duration, \
+    detect_swing_points
 
 
-def enhanced_smc_prediction(df: pd.DataFrame, horizon: str = 'medium', config: Optional[Dict[str, Any]] = None) -> Dict[
-    str, Any]:
+def enhanced_smc_prediction(df: pd.DataFrame, horizon: str = 'medium', config: Optional[Dict[str, Any]] = None,
+                            swings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     SMC增强预测方法，提供多时间框架市场预测
 
@@ -19,6 +20,7 @@ def enhanced_smc_prediction(df: pd.DataFrame, horizon: str = 'medium', config: O
         df: 价格数据DataFrame
         horizon: 预测时间范围 ('short', 'medium', 'long')
         config: 配置参数
+        swings: 已由detect_swing_points计算好的摆动点，传入时直接复用
 
     返回:
         包含预测结果的字典
@@ -49,8 +51,10 @@ def enhanced_smc_prediction(df: pd.DataFrame, horizon: str = 'medium', config: O
 
     try:
         # 多维度分析
-        swing_highs, swing_lows = find_swing_points(df)
-        fib_levels = calculate_fibonacci_retracements(df)
+        if swings is None:
+            swings = detect_swing_points(df)
+        swing_highs, swing_lows = find_swing_points(df, swings=swings)
+        fib_levels = calculate_fibonacci_retracements(df, swings=swings)
 
         # 趋势分析
         trend, duration, trend_info = get_smc_trend_and_duration(df, config, None)
@@ -258,14 +262,17 @@ def multi_timeframe_smc_prediction(df: pd.DataFrame, config: Optional[Dict[str,
     print_colored("执行多时间框架SMC预测分析", Colors.BLUE + Colors.BOLD)
 
     try:
+        # 三个时间范围共用同一份摆动点结果
+        swings = detect_swing_points(df)
+
         # 短期预测 (15-30分钟)
-        short_term = enhanced_smc_prediction(df, "short", config)
+        short_term = enhanced_smc_prediction(df, "short", config, swings)
 
         # 中期预测 (4小时)
-        medium_term = enhanced_smc_prediction(df, "medium", config)
+        medium_term = enhanced_smc_prediction(df, "medium", config, swings)
 
         # 长期预测 (24小时)
-        long_term = enhanced_smc_prediction(df, "long", config)
+        long_term = enhanced_smc_prediction(df, "long", config, swings)
 
         # 计算综合趋势和置信度
         trends = {
@@ -380,13 +387,15 @@ def multi_timeframe_smc_prediction(df: pd.DataFrame, config: Optional[Dict[str,
         return {"error": str(e)}
 
 
-def calculate_optimal_holding_time(df: pd.DataFrame, trend_info: Dict[str, Any]) -> int:
+def calculate_optimal_holding_time(df: pd.DataFrame, trend_info: Dict[str, Any],
+                                   swings: Optional[Dict[str, Any]] = None) -> int:
     """
     基于市场结构优化持仓时间
 
     参数:
         df: 价格数据DataFrame
         trend_info: 趋势信息字典
+        swings: 已由detect_swing_points计算好的摆动点，传入时直接复用
 
     返回:
         最佳持仓时间（分钟）
@@ -398,7 +407,7 @@ def calculate_optimal_holding_time(df: pd.DataFrame, trend_info: Dict[str, Any])
     confidence = trend_info.get('confidence', '低')
 
     # 支撑/阻力位分析
-    swing_highs, swing_lows = find_swing_points(df)
+    swing_highs, swing_lows = find_swing_points(df, swings=swings)
 
     # 持仓时间映射
     holding_time_map = {
@@ -0,0 +1,477 @@
+"""
+流式增量指标模块
+为每个 (交易对, 时间框架) 维护一个有状态的 IndicatorState，每根收盘K线以常数时间更新全部指标，
+并支持对未收盘K线做不提交状态的试算
+
+与 calculate_optimized_indicators 的对应关系：
+    把同一段K线逐根喂给 IndicatorState，每根K线的输出与批量函数在该段数据上的对应行一致（浮点误差内），
+    前提是批量数据不少于60根K线（批量函数对较短数据会跳过部分指标）。以下两处按定义无法逐根对齐：
+    - SMMA60 批量实现会把前60根的SMA回填到前59行，流式在第60根之前输出NaN
+    - Market_Sentiment / Panic_Index 批量实现整列取最后一根的值，流式每根输出"若该根为最后一根"时的值（无BTC数据的分支）
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+EPS = float(np.finfo(float).eps)
+NAN = float('nan')
+
+# 流式引擎输出的指标列，与 calculate_optimized_indicators 的列名一致
+STREAMING_COLUMNS = [
+    'VWAP', 'EMA5', 'EMA20', 'EMA24', 'EMA52', 'EMA12', 'EMA26', 'MACD', 'MACD_signal', 'MACD_histogram',
+    'RSI', 'Williams_R', 'Williams_R_Change', 'Williams_R_Acceleration', 'OBV', 'TR', 'ATR',
+    'VI_plus', 'VI_minus', 'VI_diff', 'Vortex_Cross_Up', 'Vortex_Cross_Down', 'Momentum',
+    'BB_Middle', 'BB_Std', 'BB_Upper', 'BB_Lower', 'ROC', 'Plus_DM', 'Minus_DM', 'TR14', 'Plus_DI', 'Minus_DI',
+    'DX', 'ADX', 'CCI', 'Supertrend', 'Supertrend_Direction', 'Supertrend_Stability', 'Supertrend_Strength',
+    'SMMA60', 'Market_Sentiment', 'Panic_Index'
+]
+
+
+def _is_nan(x: float) -> bool:
+    return x != x
+
+
+def _div(a: float, b: float) -> float:
+    """与numpy浮点除法一致的除法：除以0得到±inf或NaN而不是抛出异常"""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a == 0 or _is_nan(a):
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def _nonzero(x: float) -> float:
+    """与 Series.replace(0, eps) 一致"""
+    return EPS if x == 0 else x
+
+
+class _Ema:
+    """指数移动平均，与 ewm(span, adjust=False).mean() 一致"""
+
+    def __init__(self, span: Optional[int] = None, alpha: Optional[float] = None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1)
+        self.value = None
+
+    def update(self, x: float, commit: bool = True) -> float:
+        value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+        if commit:
+            self.value = value
+        return value
+
+
+class _RollingWindow:
+    """
+    滚动窗口统计，忽略NaN，有效值个数不足min_periods时输出NaN（与pandas rolling一致）
+    运行和在每提交window次后按窗口内的值精确重算一次，避免长期运行的累计误差
+    """
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque(maxlen=window)
+        self.shift = None  # 平方和以首个有效值为基准，减少方差计算中的抵消误差
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.count = 0
+        self.commits = 0
+
+    def _next(self, x: float) -> Tuple[float, float, int]:
+        total, total_sq, count = self.total, self.total_sq, self.count
+        shift = self.shift if self.shift is not None else (x if not _is_nan(x) else 0.0)
+        if len(self.values) == self.window:
+            dropped = self.values[0]
+            if not _is_nan(dropped):
+                total -= dropped
+                total_sq -= (dropped - shift) ** 2
+                count -= 1
+        if not _is_nan(x):
+            total += x
+            total_sq += (x - shift) ** 2
+            count += 1
+        return total, total_sq, count
+
+    def update(self, x: float, commit: bool = True) -> Tuple[float, float, int]:
+        """加入新值，返回 (和, 相对基准的平方和, 有效值个数)"""
+        total, total_sq, count = self._next(x)
+        if commit:
+            if self.shift is None and not _is_nan(x):
+                self.shift = x
+            self.values.append(x)
+            self.commits += 1
+            if self.commits % self.window == 0:
+                valid = [v for v in self.values if not _is_nan(v)]
+                total = math.fsum(valid)
+                total_sq = math.fsum((v - self.shift) ** 2 for v in valid) if valid else 0.0
+                count = len(valid)
+            self.total, self.total_sq, self.count = total, total_sq, count
+        return total, total_sq, count
+
+    def sum(self, x: float, commit: bool = True) -> float:
+        total, _, count = self.update(x, commit)
+        return total if count >= self.min_periods and count > 0 else NAN
+
+    def mean(self, x: float, commit: bool = True) -> float:
+        total, _, count = self.update(x, commit)
+        return total / count if count >= self.min_periods and count > 0 else NAN
+
+    def mean_std(self, x: float, commit: bool = True) -> Tuple[float, float]:
+        """均值和样本标准差 (ddof=1)"""
+        total, total_sq, count = self.update(x, commit)
+        if count < self.min_periods or count == 0:
+            return NAN, NAN
+        mean = total / count
+        if count < 2:
+            return mean, NAN
+        shift = self.shift if self.shift is not None else x
+        shifted_mean = mean - shift
+        variance = (total_sq - count * shifted_mean ** 2) / (count - 1)
+        return mean, math.sqrt(max(variance, 0.0))
+
+
+class _RollingExtreme:
+    """单调队列实现的滚动最大/最小值，窗口未满时输出NaN（与 rolling(window).max()/min() 一致）"""
+
+    def __init__(self, window: int, mode: str = 'max'):
+        self.window = window
+        self.is_max = mode == 'max'
+        self.queue = deque()  # (位置, 值)，值单调
+        self.index = 0
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a >= b if self.is_max else a <= b
+
+    def update(self, x: float, commit: bool = True) -> float:
+        start = self.index - self.window + 1
+        if commit:
+            while self.queue and self._dominates(x, self.queue[-1][1]):
+                self.queue.pop()
+            self.queue.append((self.index, x))
+            while self.queue[0][0] < start:
+                self.queue.popleft()
+            self.index += 1
+            result = self.queue[0][1]
+        else:
+            result = x
+            for position, value in self.queue:
+                if position >= start:
+                    if self._dominates(value, result):
+                        result = value
+                    break
+        return result if self.index + (0 if commit else 1) >= self.window else NAN
+
+
+class IndicatorState:
+    """
+    单个 (交易对, 时间框架) 的流式指标状态
+
+    用法:
+        state = IndicatorState.from_frame(df, "BTCUSDT", "15m")   # 用历史K线预热
+        values = state.update(closed_candle)                       # 新K线收盘，提交状态
+        preview = state.update_partial(live_candle)                # 未收盘K线试算，不提交状态
+    """
+
+    def __init__(self, symbol: Optional[str] = None, interval: Optional[str] = None,
+                 supertrend_multiplier: float = 3.0, smma_period: int = 60):
+        self.symbol = symbol
+        self.interval = interval
+        self.bars = 0
+        self.last_time = None
+        self.latest: Dict[str, float] = {}
+
+        self.supertrend_multiplier = supertrend_multiplier
+        self.smma_period = smma_period
+
+        # 价格历史（Momentum需要10根前的收盘价，ROC需要5根前）
+        self.closes = deque(maxlen=10)
+        self.prev_high = NAN
+        self.prev_low = NAN
+
+        self.ema = {span: _Ema(span) for span in (5, 20, 24, 52, 12, 26)}
+        self.macd_signal = _Ema(9)
+
+        self.vwap_pv = _RollingWindow(50, 1)
+        self.vwap_v = _RollingWindow(50, 1)
+
+        self.rsi_gain = _RollingWindow(14, 1)
+        self.rsi_loss = _RollingWindow(14, 1)
+
+        self.williams_high = _RollingExtreme(14, 'max')
+        self.williams_low = _RollingExtreme(14, 'min')
+        self.prev_williams = NAN
+        self.prev_williams_change = NAN
+
+        self.obv = 0.0
+
+        self.atr = _RollingWindow(14, 1)
+        self.atr_panic = _RollingWindow(20)
+
+        self.vortex_tr = _RollingWindow(14)
+        self.vortex_plus = _RollingWindow(14)
+        self.vortex_minus = _RollingWindow(14)
+        self.prev_vi_plus = NAN
+        self.prev_vi_minus = NAN
+
+        self.bb = _RollingWindow(20, 1)
+
+        self.adx_tr = _RollingWindow(14, 1)
+        self.adx_plus = _RollingWindow(14, 1)
+        self.adx_minus = _RollingWindow(14, 1)
+        self.adx_dx = _RollingWindow(14, 1)
+
+        self.cci_tp = _RollingWindow(20, 1)
+        self.cci_dev = _RollingWindow(20, 1)
+
+        self.st_prev_upper = NAN
+        self.st_prev_lower = NAN
+        self.st_prev_value = NAN
+        self.st_directions = deque(maxlen=3)
+
+        self.smma_seed = []
+        self.smma_value = NAN
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, symbol: Optional[str] = None, interval: Optional[str] = None,
+                   **kwargs) -> "IndicatorState":
+        """用已收盘的历史K线预热状态"""
+        state = cls(symbol, interval, **kwargs)
+        state.warm_up(df)
+        return state
+
+    def warm_up(self, df: Union[pd.DataFrame, Mapping[str, np.ndarray]]) -> Dict[str, float]:
+        """依次提交DataFrame（或 CandleRingBuffer.window 返回的数组字典）中的每根K线，返回最后一根的指标值"""
+        fields = df.columns if isinstance(df, pd.DataFrame) else df
+        length = len(df['close'])
+        times = np.asarray(df['time']) if 'time' in fields else [None] * length
+        columns = [np.asarray(df[col], dtype=np.float64) for col in ('open', 'high', 'low', 'close', 'volume')]
+        for row in zip(times, *columns):
+            self._step(row, commit=True)
+        return dict(self.latest)
+
+    def update(self, candle: Any) -> Dict[str, float]:
+        """
+        提交一根已收盘K线并返回全部指标的最新值
+
+        参数:
+            candle: 字典/Series（含open/high/low/close/volume，可选time）或原始K线列表
+
+        返回:
+            指标名到数值的字典；与上一根收盘K线时间相同时直接返回上一次的结果
+        """
+        fields = _candle_fields(candle)
+        if fields[0] is not None and fields[0] == self.last_time:
+            return dict(self.latest)
+        return self._step(fields, commit=True)
+
+    def update_partial(self, candle: Any) -> Dict[str, float]:
+        """按未收盘K线试算全部指标，不修改状态"""
+        return self._step(_candle_fields(candle), commit=False)
+
+    def _step(self, fields: Tuple[Any, float, float, float, float, float], commit: bool) -> Dict[str, float]:
+        candle_time, _, high, low, close, volume = fields
+        t = self.bars
+        prev_close = self.closes[-1] if self.closes else NAN
+        prev_high, prev_low = self.prev_high, self.prev_low
+        out: Dict[str, float] = {}
+
+        # VWAP
+        pv_sum = self.vwap_pv.sum(close * volume, commit)
+        v_sum = self.vwap_v.sum(volume, commit)
+        out['VWAP'] = _div(pv_sum, _nonzero(v_sum))
+
+        # EMA / MACD
+        for span, ema in self.ema.items():
+            out[f'EMA{span}'] = ema.update(close, commit)
+        out['MACD'] = out['EMA12'] - out['EMA26']
+        out['MACD_signal'] = self.macd_signal.update(out['MACD'], commit)
+        out['MACD_histogram'] = out['MACD'] - out['MACD_signal']
+
+        # RSI
+        delta = close - prev_close
+        gain = NAN if _is_nan(delta) else max(delta, 0.0)
+        loss = NAN if _is_nan(delta) else -min(delta, 0.0)
+        avg_gain = self.rsi_gain.mean(gain, commit)
+        avg_loss = self.rsi_loss.mean(loss, commit)
+        rs = _div(avg_gain, _nonzero(avg_loss))
+        out['RSI'] = 100 - _div(100, 1 + rs)
+
+        # 威廉指标
+        highest = self.williams_high.update(high, commit)
+        lowest = self.williams_low.update(low, commit)
+        williams = _div(-100 * (highest - close), highest - lowest)
+        williams_change = williams - self.prev_williams
+        out['Williams_R'] = williams
+        out['Williams_R_Change'] = williams_change
+        out['Williams_R_Acceleration'] = williams_change - self.prev_williams_change
+
+        # OBV
+        obv = self.obv + (0.0 if _is_nan(delta) else float(np.sign(delta)) * volume)
+        out['OBV'] = obv
+
+        # TR / ATR
+        if t == 0:
+            tr = NAN
+        else:
+            tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+        atr = self.atr.mean(tr, commit)
+        out['TR'] = tr
+        out['ATR'] = atr
+
+        # Vortex（沿用批量实现：TR取ATR*14，窗口未满时用当根值）
+        vortex_tr = _nonzero(atr * 14)
+        vm_plus = 0.0 if t == 0 else abs(high - prev_low)
+        vm_minus = 0.0 if t == 0 else abs(low - prev_high)
+        tr_sum = self.vortex_tr.sum(vortex_tr, commit)
+        vm_plus_sum = self.vortex_plus.sum(vm_plus, commit)
+        vm_minus_sum = self.vortex_minus.sum(vm_minus, commit)
+        tr_sum = _nonzero(vortex_tr if _is_nan(tr_sum) else tr_sum)
+        vm_plus_sum = vm_plus if _is_nan(vm_plus_sum) else vm_plus_sum
+        vm_minus_sum = vm_minus if _is_nan(vm_minus_sum) else vm_minus_sum
+        vi_plus = _clip(_div(vm_plus_sum, tr_sum), 0, 5)
+        vi_minus = _clip(_div(vm_minus_sum, tr_sum), 0, 5)
+        out['VI_plus'] = 0.0 if _is_nan(vi_plus) else vi_plus
+        out['VI_minus'] = 0.0 if _is_nan(vi_minus) else vi_minus
+        vi_diff = vi_plus - vi_minus
+        out['VI_diff'] = 0.0 if _is_nan(vi_diff) else vi_diff
+        out['Vortex_Cross_Up'] = int(vi_plus > vi_minus and self.prev_vi_plus <= self.prev_vi_minus)
+        out['Vortex_Cross_Down'] = int(vi_plus < vi_minus and self.prev_vi_plus >= self.prev_vi_minus)
+
+        # 动量 / 变化率
+        close_10 = self.closes[-10] if len(self.closes) >= 10 else NAN
+        close_5 = self.closes[-5] if len(self.closes) >= 5 else NAN
+        out['Momentum'] = close - close_10
+        out['ROC'] = _div(close - close_5, _nonzero(close_5)) * 100
+
+        # 布林带
+        bb_mid, bb_std = self.bb.mean_std(close, commit)
+        out['BB_Middle'] = bb_mid
+        out['BB_Std'] = bb_std
+        out['BB_Upper'] = bb_mid + 2 * bb_std
+        out['BB_Lower'] = bb_mid - 2 * bb_std
+
+        # ADX
+        plus_dm = NAN if t == 0 else max(high - prev_high, 0.0)
+        minus_dm = NAN if t == 0 else max(prev_low - low, 0.0)
+        tr14 = self.adx_tr.sum(tr, commit)
+        tr14_nonzero = _nonzero(tr14)
+        plus_di = 100 * _div(self.adx_plus.sum(plus_dm, commit), tr14_nonzero)
+        minus_di = 100 * _div(self.adx_minus.sum(minus_dm, commit), tr14_nonzero)
+        dx = 100 * _div(abs(plus_di - minus_di), _nonzero(plus_di + minus_di))
+        out['Plus_DM'] = plus_dm
+        out['Minus_DM'] = minus_dm
+        out['TR14'] = tr14
+        out['Plus_DI'] = plus_di
+        out['Minus_DI'] = minus_di
+        out['DX'] = dx
+        out['ADX'] = self.adx_dx.mean(dx, commit)
+
+        # CCI
+        typical_price = (high + low + close) / 3
+        sma_tp = self.cci_tp.mean(typical_price, commit)
+        mean_dev = self.cci_dev.mean(abs(typical_price - sma_tp), commit)
+        out['CCI'] = _div(typical_price - sma_tp, 0.015 * _nonzero(mean_dev))
+
+        # 超级趋势（基于ATR14，与批量流程中已有ATR列时的行为一致）
+        hl2 = (high + low) / 2
+        upper = hl2 + self.supertrend_multiplier * atr
+        lower = hl2 - self.supertrend_multiplier * atr
+        if t == 0:
+            supertrend, direction = lower, 1
+        elif close > self.st_prev_upper:
+            supertrend, direction = lower, 1
+        elif close < self.st_prev_lower:
+            supertrend, direction = upper, -1
+        elif self.st_directions[-1] == 1:
+            prev = self.st_prev_value
+            supertrend, direction = (prev if prev > lower else lower), 1
+        else:
+            prev = self.st_prev_value
+            supertrend, direction = (prev if prev < upper else upper), -1
+        if t < 3:
+            stability = 1.0
+        else:
+            stability = 1.0 if self.st_directions[-1] == direction and self.st_directions[-2] == direction else 0.5
+        out['Supertrend'] = supertrend
+        out['Supertrend_Direction'] = direction
+        out['Supertrend_Stability'] = stability
+        out['Supertrend_Strength'] = _div(abs(close - supertrend), atr)
+
+        # SMMA（前period根K线收集初值）
+        period = self.smma_period
+        smma = NAN
+        smma_seed = self.smma_seed
+        if t < period - 1:
+            if commit:
+                smma_seed.append(close)
+        elif t == period - 1:
+            smma = math.fsum(smma_seed + [close]) / period
+            if commit:
+                smma_seed.clear()
+        else:
+            smma = (self.smma_value * (period - 1) + close) / period
+        out[f'SMMA{period}'] = smma
+
+        # 市场情绪 / 恐慌指数（无BTC数据的分支）
+        atr_mean = self.atr_panic.mean(atr, commit)
+        atr_ratio = _div(atr, atr_mean) if atr_mean != 0 else 1
+        out['Market_Sentiment'] = 0
+        out['Panic_Index'] = min(10, (1 + (atr_ratio - 1) * 5)) if atr_ratio > 1 else 3
+
+        if commit:
+            self.bars += 1
+            self.last_time = candle_time
+            self.closes.append(close)
+            self.prev_high, self.prev_low = high, low
+            self.prev_williams, self.prev_williams_change = williams, williams_change
+            self.obv = obv
+            self.prev_vi_plus, self.prev_vi_minus = vi_plus, vi_minus
+            self.st_prev_upper, self.st_prev_lower, self.st_prev_value = upper, lower, supertrend
+            self.st_directions.append(direction)
+            self.smma_value = smma
+            self.latest = out
+        return dict(out)
+
+
+def _clip(x: float, lower: float, upper: float) -> float:
+    """与 Series.clip 一致，NaN保持为NaN"""
+    if _is_nan(x):
+        return x
+    return min(max(x, lower), upper)
+
+
+def _candle_fields(candle: Any) -> Tuple[Any, float, float, float, float, float]:
+    """把字典/Series/原始K线列表统一为 (time, open, high, low, close, volume)"""
+    if isinstance(candle, (Mapping, pd.Series)):
+        return (candle.get('time'), float(candle['open']), float(candle['high']), float(candle['low']),
+                float(candle['close']), float(candle['volume']))
+    if isinstance(candle, Sequence):
+        # futures_klines 原始格式: [open_time, open, high, low, close, volume, close_time, ...]
+        return (candle[0], float(candle[1]), float(candle[2]), float(candle[3]),
+                float(candle[4]), float(candle[5]))
+    raise TypeError(f"不支持的K线格式: {type(candle)}")
+
+
+_states: Dict[Tuple[str, str], IndicatorState] = {}
+_states_lock = threading.Lock()
+
+
+def get_indicator_state(symbol: str, interval: str, **kwargs) -> IndicatorState:
+    """获取（不存在时创建）进程内共享的 (交易对, 时间框架) 指标状态"""
+    key = (symbol, interval)
+    with _states_lock:
+        state = _states.get(key)
+        if state is None:
+            state = IndicatorState(symbol, interval, **kwargs)
+            _states[key] = state
+        return state
+
+
+def reset_indicator_state(symbol: str, interval: str) -> None:
+    """丢弃指定 (交易对, 时间框架) 的指标状态，例如数据出现缺口需要重新预热时"""
+    with _states_lock:
+        _states.pop((symbol, interval), None)
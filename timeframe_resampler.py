@@ -0,0 +1,215 @@
+"""
+时间框架重采样模块
+由本地维护的1m K线聚合出 5m/15m/1h/4h 等高周期K线，分桶按UTC纪元对齐（与交易所K线边界一致），
+多时间框架刷新只需一次1m增量请求，不再为每个周期单独请求K线
+
+高周期的深度历史只在每个进程首次使用时通过本地K线存储补齐一次，之后新收盘的K线由1m数据聚合后追加到该周期的本地存储，
+未收盘的最后一根K线在读取时由1m数据实时聚合
+"""
+
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+import numpy as np
+
+from candle_store import CandleStore, get_candle_store, interval_to_ms
+from logger_utils import Colors, print_colored
+
+DAY_MS = 86_400_000
+
+# 重采样时各字段的聚合方式（time/close_time 按分桶边界生成）
+_FIRST_FIELDS = ('open',)
+_LAST_FIELDS = ('close',)
+_MAX_FIELDS = ('high',)
+_MIN_FIELDS = ('low',)
+_SUM_FIELDS = ('volume', 'quote_asset_volume', 'trades', 'taker_base_vol', 'taker_quote_vol')
+
+
+def resample_columns(columns: Mapping[str, Any], interval: str, base_interval: str = "1m",
+                     drop_incomplete_head: bool = True) -> Dict[str, np.ndarray]:
+    """
+    把低周期K线数组聚合为高周期K线
+
+    参数:
+        columns: 含 time（毫秒，升序）及 OHLCV 等字段的数组字典，例如 CandleStore.get_arrays 的结果
+        interval: 目标周期，必须能整除一天（5m/15m/1h/4h/1d 等）
+        base_interval: 输入数据的周期
+        drop_incomplete_head: 第一根输入K线不在分桶起点时丢弃第一个分桶（开头数据不完整）
+
+    返回:
+        resampled: 与输入字段相同的数组字典，time为分桶开盘时间，close_time（如有）为分桶结束时间
+    """
+    step = interval_to_ms(interval)
+    base_step = interval_to_ms(base_interval)
+    if step % base_step or DAY_MS % step:
+        raise ValueError(f"无法由 {base_interval} 重采样为 {interval}")
+
+    times = np.asarray(columns['time'], dtype=np.int64)
+    buckets = times - times % step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]]) if len(times) else np.empty(0, np.int64)
+    if drop_incomplete_head and len(starts) and times[0] != buckets[0]:
+        starts = starts[1:]
+    if len(starts) == 0:
+        return {name: np.asarray(values)[:0] for name, values in columns.items()}
+
+    ends = np.r_[starts[1:], len(times)] - 1
+    resampled = {}
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if name == 'time':
+            resampled[name] = buckets[starts]
+        elif name == 'close_time':
+            resampled[name] = buckets[starts] + step - 1
+        elif name in _FIRST_FIELDS:
+            resampled[name] = values[starts]
+        elif name in _LAST_FIELDS:
+            resampled[name] = values[ends]
+        elif name in _MAX_FIELDS:
+            resampled[name] = np.maximum.reduceat(values, starts)
+        elif name in _MIN_FIELDS:
+            resampled[name] = np.minimum.reduceat(values, starts)
+        elif name in _SUM_FIELDS:
+            resampled[name] = np.add.reduceat(values, starts)
+    return resampled
+
+
+class TimeframeResampler:
+    """
+    基于1m本地K线的多周期数据源
+
+    get_arrays 返回的格式与 CandleStore.get_arrays 相同，可直接替换
+    """
+
+    def __init__(self, store: CandleStore, base_interval: str = "1m",
+                 intervals: Sequence[str] = ("5m", "15m", "1h", "4h")):
+        """
+        参数:
+            store: 本地K线存储
+            base_interval: 维护的基础周期
+            intervals: 需要聚合的周期，用于确定基础周期至少保留的K线数量
+        """
+        self.store = store
+        self.base_interval = base_interval
+        self.base_step = interval_to_ms(base_interval)
+        # 基础周期至少覆盖最长周期的一个完整分桶，才能聚合出未收盘的最后一根
+        self.base_bars = max([interval_to_ms(i) // self.base_step for i in intervals] + [1]) + 1
+        self._backfilled = set()
+        self._synced_at: Dict[str, int] = {}
+        self._prefetched_at: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # 统计: 由1m聚合追加的收盘K线数量、无法由1m衔接而回退为直接同步的次数
+        self.derived_bars = 0
+        self.fallback_syncs = 0
+
+    def sync(self, symbol: str, min_bars: int = 0, max_age: float = 0.0) -> int:
+        """
+        增量同步基础周期K线（一次请求覆盖所有高周期）
+
+        参数:
+            symbol: 交易对
+            min_bars: 基础周期至少需要的K线数量
+            max_age: 距上次批量同步（sync_many）不超过该秒数且本地数据足够时跳过
+        """
+        started_ms = int(time.time() * 1000)
+        min_bars = max(min_bars, self.base_bars)
+        prefetched_at = self._prefetched_at.get(symbol)
+        if (max_age > 0 and prefetched_at is not None and started_ms - prefetched_at < max_age * 1000
+                and self.store.stored_count(symbol, self.base_interval) >= min_bars):
+            return 0
+        new_bars = self.store.sync(symbol, self.base_interval, min_bars=min_bars)
+        self._synced_at[symbol] = started_ms
+        return new_bars
+
+    def sync_many(self, symbols: Sequence[str], min_bars: int = 0, market_client=None) -> Dict[str, int]:
+        """并发增量同步多个交易对的基础周期K线（见 CandleStore.sync_many）"""
+        started_ms = int(time.time() * 1000)
+        new_bars = self.store.sync_many(symbols, self.base_interval, max(min_bars, self.base_bars), market_client)
+        for symbol in new_bars:
+            self._synced_at[symbol] = started_ms
+            self._prefetched_at[symbol] = started_ms
+        return new_bars
+
+    def _backfill(self, symbol: str, interval: str, limit: int) -> None:
+        """通过本地K线存储直接同步该周期，补齐深度历史（每个进程每个周期一次，或1m数据无法衔接时）"""
+        self.store.sync(symbol, interval, min_bars=limit)
+        with self._lock:
+            self._backfilled.add((symbol, interval))
+
+    def get_arrays(self, symbol: str, interval: str, limit: int = 200, sync: bool = True) -> Dict[str, np.ndarray]:
+        """
+        获取最近limit根K线的各字段数组，末尾为由1m数据聚合的未收盘K线
+
+        参数:
+            symbol: 交易对
+            interval: K线周期
+            limit: K线数量（含未收盘K线）
+            sync: 读取前是否先增量同步基础周期（同一交易对多个周期连续读取时，先调用一次sync再传False）
+
+        返回:
+            columns: {字段: 数组}
+        """
+        if interval == self.base_interval:
+            return self.store.get_arrays(symbol, interval, limit=limit, sync=sync)
+
+        step = interval_to_ms(interval)
+        if sync:
+            self.sync(symbol)
+        # 只有在上次同步开始前已经结束的分桶才算收盘，之后收盘的1m K线还没有写入本地
+        now_ms = self._synced_at.get(symbol, int(time.time() * 1000))
+        if (symbol, interval) not in self._backfilled:
+            self._backfill(symbol, interval, limit)
+
+        stored = self.store.get_arrays(symbol, interval, limit=1, include_open=False, sync=False)
+        next_start = int(stored['time'][-1]) + step if len(stored['time']) else now_ms - now_ms % step
+        needed = (now_ms - next_start) // self.base_step + 1
+        base = self.store.get_arrays(symbol, self.base_interval, limit=max(needed, 1), sync=False)
+        if len(base['time']) == 0 or int(base['time'][0]) > next_start or needed > self.store.max_fetch:
+            # 1m数据无法衔接（例如长时间停机或1m数据被重建），直接同步该周期
+            self.fallback_syncs += 1
+            self._backfill(symbol, interval, limit)
+            stored = self.store.get_arrays(symbol, interval, limit=1, include_open=False, sync=False)
+            next_start = int(stored['time'][-1]) + step if len(stored['time']) else now_ms - now_ms % step
+            base = {name: values[base['time'] >= next_start] for name, values in base.items()}
+
+        derived = resample_columns(base, interval, self.base_interval)
+        keep = derived['time'] >= next_start
+        derived = {name: values[keep] for name, values in derived.items()}
+
+        # 已结束的分桶追加到该周期的本地存储；分桶必须从next_start连续开始，否则中间会留下缺口
+        closed = derived['close_time'] < now_ms
+        if closed.any():
+            if int(derived['time'][0]) == next_start:
+                self.derived_bars += self.store.append_closed(
+                    symbol, interval, {name: values[closed] for name, values in derived.items()})
+            else:
+                print_colored(f"⚠️ {symbol} {interval} 1m数据有缺口，回退为直接同步", Colors.WARNING)
+                self.fallback_syncs += 1
+                self._backfill(symbol, interval, limit)
+
+        columns = self.store.get_arrays(symbol, interval, limit=limit, include_open=False, sync=False)
+        if len(derived['time']) and not closed[-1]:
+            closed_limit = max(limit - 1, 0)
+            columns = {
+                name: np.concatenate((values[-closed_limit:] if closed_limit else values[:0], derived[name][-1:]))
+                for name, values in columns.items()
+            }
+        return columns
+
+    def stats(self) -> Dict[str, int]:
+        """聚合追加的K线数量和回退同步次数"""
+        return {"derived_bars": self.derived_bars, "fallback_syncs": self.fallback_syncs}
+
+
+_resampler: Optional[TimeframeResampler] = None
+_resampler_lock = threading.Lock()
+
+
+def get_timeframe_resampler(client=None) -> TimeframeResampler:
+    """获取进程内共享的重采样器，使用共享的本地K线存储"""
+    global _resampler
+    store = get_candle_store(client)
+    with _resampler_lock:
+        if _resampler is None:
+            _resampler = TimeframeResampler(store)
+        return _resampler
@@ -3,6 +3,8 @@ import time
 import numpy as np
 import pandas as pd
 from binance.exceptions import BinanceAPIException
+from exchange_metadata import get_exchange_metadata
+from market_snapshot import get_price_snapshot
 
 
 def get_max_leverage(client, symbol, max_allowed=20):
@@ -18,7 +20,14 @@ def get_max_leverage(client, symbol, max_allowed=20):
         最大可用杠杆
     """
     try:
-        # 获取杠杆分层信息
+        # 优先使用交易所元数据索引中缓存的杠杆分层
+        max_leverage = get_exchange_metadata(client).max_leverage(symbol)
+        if max_leverage is not None:
+            capped_leverage = min(max_leverage, max_allowed)
+            print(f"🔍 {symbol} 最大杠杆: {max_leverage}倍，限制后: {capped_leverage}倍")
+            return capped_leverage
+
+        # 索引中没有杠杆信息时直接查询杠杆分层
         leverage_brackets = client.futures_leverage_bracket(symbol=symbol)
         if not leverage_brackets:
             print(f"⚠️ {symbol} 无法获取杠杆分层信息，使用默认杠杆5倍")
@@ -128,25 +137,13 @@ def get_precise_quantity(client, symbol, quantity):
         调整后的精确数量
     """
     try:
-        # 获取交易所信息
-        info = client.futures_exchange_info()
-
-        # 查找该交易对的数量精度
-        for item in info['symbols']:
-            if item['symbol'] == symbol:
-                for f in item['filters']:
-                    if f['filterType'] == 'LOT_SIZE':
-                        min_qty = float(f['minQty'])
-                        max_qty = float(f['maxQty'])
-                        step_size = float(f['stepSize'])
-
-                        # 调整数量到步长的整数倍
-                        quantity = max(min_qty, min(max_qty, quantity))
-                        precision = int(round(-math.log(step_size, 10), 0))
-                        quantity = round(math.floor(quantity * 10 ** precision) / 10 ** precision, precision)
-
-                        print(f"🔢 {symbol} 调整数量: {quantity} (最小:{min_qty}, 最大:{max_qty}, 步长:{step_size})")
-                        return quantity
+        # 从交易所元数据索引查找该交易对的数量规则
+        meta = get_exchange_metadata(client).get(symbol)
+        if meta is not None and meta.step_size:
+            # 调整数量到步长的整数倍，并限制在最小/最大数量之间
+            quantity = meta.floor_quantity(quantity)
+            print(f"🔢 {symbol} 调整数量: {quantity} (最小:{meta.min_qty}, 最大:{meta.max_qty}, 步长:{meta.step_size})")
+            return quantity
 
         # 如果没有找到精度信息，返回原始数量
         print(f"⚠️ {symbol} 无法获取数量精度信息")
@@ -168,20 +165,9 @@ def format_quantity(self, symbol, quantity):
         格式化后的数量字符串
     """
     try:
-        # 获取交易对信息
-        info = self.client.futures_exchange_info()
-
-        # 默认精度（如果无法获取特定交易对信息）
-        precision = 3
-
-        # 查找该交易对的精度信息
-        for item in info['symbols']:
-            if item['symbol'] == symbol:
-                for f in item['filters']:
-                    if f['filterType'] == 'LOT_SIZE':
-                        step_size = float(f['stepSize'])
-                        precision = int(round(-math.log(step_size, 10), 0)) if step_size < 1 else 0
-                break
+        # 从交易所元数据索引查找精度（无法获取特定交易对信息时默认3位）
+        meta = get_exchange_metadata(self.client).get(symbol)
+        precision = meta.quantity_precision if meta is not None and meta.quantity_precision is not None else 3
 
         # 四舍五入到适当精度
         formatted_quantity = round(float(quantity), precision)
@@ -304,7 +290,7 @@ def place_dual_orders(client, symbol, primary_side, quality_score, account_balan
         print(f"🔄 {symbol} 尝试下双向订单 - 主方向: {primary_side}, 杠杆: {leverage}倍")
 
         # 获取当前价格
-        ticker = client.futures_symbol_ticker(symbol=symbol)
+        ticker = get_price_snapshot(client).ticker(symbol)
         current_price = float(ticker['price'])
 
         # 计算主订单数量
@@ -349,9 +335,6 @@ def place_dual_orders(client, symbol, primary_side, quality_score, account_balan
 
         print(f"✅ {symbol} {primary_side} 主订单执行成功, 数量: {main_quantity}")
 
-        # 等待一秒避免API速率限制
-        time.sleep(1)
-
         # 执行次订单
         secondary_order = client.futures_create_order(
             symbol=symbol,
@@ -407,7 +390,7 @@ def place_smart_order(client, symbol, side, quantity, leverage=5, current_price=
     try:
         # 获取当前价格（如果未提供）
         if current_price is None:
-            ticker = client.futures_symbol_ticker(symbol=symbol)
+            ticker = get_price_snapshot(client).ticker(symbol)
             current_price = float(ticker['price'])
 
         # 分析订单簿深度